@@ -0,0 +1,74 @@
+"""
+The implementations the benchmarks measure against, as they were before the
+change that replaced them. Benchmarks import them from here, so each old
+version exists once and the speed-ups are timed on identical input.
+"""
+import statistics
+from src.threats import SUSPICIOUS_OUIS, SUSPICIOUS_SSIDS
+
+# --- THREAT CLASSIFIER (before the compiled OUI dict / SSID regex) ---
+
+def classify_threat(ssid, bssid):
+    """Linear OUI prefix scan, then substring tests per keyword."""
+    if not ssid and not bssid:
+        return False, "", "NONE"
+
+    if bssid:
+        mac_clean = bssid.upper().replace("-", ":")
+        for oui, (vendor, dev_type) in SUSPICIOUS_OUIS.items():
+            if mac_clean.startswith(oui):
+                return True, f"[{vendor}: {dev_type}]", "HIGH"
+
+    if ssid:
+        s_lower = ssid.lower()
+        if "axon" in s_lower: return True, "[AXON BODYCAM]", "HIGH"
+        if "watchguard" in s_lower: return True, "[WATCHGUARD]", "HIGH"
+        if "lpr" in s_lower or "alpr" in s_lower: return True, "[ALPR SYSTEM]", "HIGH"
+        if "ibr" in s_lower and "-" in s_lower:
+            return True, "[CRADLEPOINT]", "MED"
+        if "airlink" in s_lower:
+            return True, "[SIERRA WIRELESS]", "MED"
+        for kw in SUSPICIOUS_SSIDS:
+            if kw in s_lower:
+                return True, f"[{kw.upper()}]", "LOW"
+
+    return False, "", "NONE"
+
+# --- MOBILITY HISTORY (before the ring buffer and batch analyzers) ---
+
+def decide(sig_variance, gps_variance, avg_signal, duration, my_speed):
+    """The mobility/pacing rules of analyze_mobility(); unchanged, so the new code is checked with them too."""
+    is_moving = False
+    if gps_variance < 0.1 and sig_variance > 20:
+        is_moving = True
+    elif gps_variance > 1.0 and sig_variance < 10:
+        is_moving = True
+    pacing = my_speed > 4.5 and avg_signal > 60 and duration > 15
+    return is_moving, pacing
+
+def mobility_step(history, now, signal, lat, my_speed, max_len=20):
+    """Per-target list history; variances recomputed with statistics.variance on every scan."""
+    history.append((now, signal, lat, None))
+    if len(history) > max_len: # scanner.HISTORY_MAX_LEN
+        history.pop(0)
+    if len(history) < 5:
+        return None
+    signals = [x[1] for x in history]
+    lats = [x[2] for x in history if x[2] is not None]
+    sig_variance = statistics.variance(signals) if len(signals) > 1 else 0
+    gps_variance = 0
+    if len(lats) > 1:
+        gps_variance = statistics.variance(lats) * 100000
+    duration = now - history[0][0]
+    avg_signal = sum(signals) / len(signals)
+    return decide(sig_variance, gps_variance, avg_signal, duration, my_speed)
+
+# --- WHITELIST (before the compiled Whitelist) ---
+
+def is_whitelisted(whitelist, ssid, bssid):
+    """List membership on the parsed JSON, which was re-read every scan."""
+    if ssid in whitelist.get("ignore_ssids", []):
+        return True
+    if bssid in whitelist.get("ignore_macs", []):
+        return True
+    return False
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark: compiled classify_threat() vs the original linear scan.
+
+    python benchmarks/bench_classifier.py [--count 10000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src import threats
+from src.threats import SUSPICIOUS_OUIS, SUSPICIOUS_SSIDS, classify_threat
+from benchmarks import baseline
+
+def make_corpus(count, rng):
+    """Mostly benign home/office SSIDs with a sprinkling of keyword and OUI hits."""
+    words = ["home", "net", "linksys", "netgear", "xfinity", "att", "guest", "office",
+             "starbucks", "wifi", "tplink", "dlink", "printer", "tv", "5g", "mesh"]
+    ouis = list(SUSPICIOUS_OUIS)
+    corpus = []
+    for _ in range(count):
+        parts = [rng.choice(words) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.15:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(SUSPICIOUS_SSIDS))
+        sep = rng.choice(["", "_", "-", " "])
+        ssid = sep.join(parts) + str(rng.randint(0, 999))
+        if rng.random() < 0.5:
+            ssid = ssid.upper()
+
+        if rng.random() < 0.05:
+            bssid = rng.choice(ouis) + ":%02X:%02X:%02X" % tuple(rng.randrange(256) for _ in range(3))
+        else:
+            bssid = ":".join("%02X" % rng.randrange(256) for _ in range(6))
+        corpus.append((ssid, bssid))
+    return corpus
+
+def timed(fn, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for ssid, bssid in corpus:
+            fn(ssid, bssid)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.count, random.Random(args.seed))
+
+    mismatches = [(s, b) for s, b in corpus if classify_threat(s, b) != baseline.classify_threat(s, b)]
+    if mismatches:
+        print(f"MISMATCH on {len(mismatches)} inputs, e.g. {mismatches[:3]}")
+        return 1
+
+    uncached = classify_threat.__wrapped__
+    legacy = timed(baseline.classify_threat, corpus, args.repeat)
+    compiled = timed(uncached, corpus, args.repeat)
+
+    threats.classify_threat.cache_clear()
+    for ssid, bssid in corpus:
+        classify_threat(ssid, bssid)
+    cached = timed(classify_threat, corpus[:threats.CLASSIFY_CACHE_SIZE], args.repeat)
+    cached *= len(corpus) / min(len(corpus), threats.CLASSIFY_CACHE_SIZE)
+
+    print(f"{len(corpus)} SSIDs, results identical")
+    print(f"  legacy   : {legacy * 1000:8.2f} ms")
+    print(f"  compiled : {compiled * 1000:8.2f} ms  ({legacy / compiled:5.1f}x)")
+    print(f"  cached   : {cached * 1000:8.2f} ms  ({legacy / cached:5.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
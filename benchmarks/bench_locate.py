@@ -0,0 +1,133 @@
+"""
+Accuracy + update cost of the incremental AP position estimator.
+
+    python benchmarks/bench_locate.py [--trials 300] [--seed 7]
+
+Simulates drives past fixed APs with log-normal shadowing on the RSSI
+(sigma in dB, through the same path-loss exponent as calculate_distance).
+For each route/noise pair it reports the median position error, how often
+the AP lies inside the reported radius, and how often the estimate is at
+least as close as the plain weighted centroid of the same sightings.
+Then times update()+position() against re-solving from the full sighting
+history as it grows. Correctness is tested in tests/test_locate.py.
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.locate import APEstimator, offset_m, _solve3, M_PER_DEG_LAT, M_PER_DEG_LON
+
+LAT0, LON0 = 40.0, -75.0
+PATH_LOSS_N = 2.5 # calculate_distance's 2.4 GHz exponent
+MAX_RANGE = 300.0
+
+def to_latlon(x, y):
+    return LAT0 + y / M_PER_DEG_LAT, LON0 + x / (M_PER_DEG_LON * math.cos(math.radians(LAT0)))
+
+def route(kind, step=15):
+    if kind == "straight":
+        return [(x, 0) for x in range(-400, 401, step)]
+    if kind == "corner":
+        return [(x, 0) for x in range(-400, 1, step)] + [(0, y) for y in range(step, 401, step)]
+    # loop: out along y=0, back along y=200
+    return ([(x, 0) for x in range(-400, 401, step)] + [(400, y) for y in range(step, 200, step)] +
+            [(x, 200) for x in range(400, -401, -step)])
+
+def sightings(ap, points, sigma, rng):
+    for x, y in points:
+        d = math.hypot(ap[0] - x, ap[1] - y)
+        if d > MAX_RANGE:
+            continue
+        r = d * 10 ** (rng.gauss(0, sigma) / (10 * PATH_LOSS_N))
+        yield x, y, r
+
+def batch_least_squares(history):
+    """Reference: normal equations rebuilt from every sighting."""
+    m = [[0.0] * 3 for _ in range(3)]
+    v = [0.0] * 3
+    for x, y, r in history:
+        w = 1.0 / max(1.0, r) ** 2
+        a = (-2 * x, -2 * y, 1.0)
+        b = max(1.0, r) ** 2 - x * x - y * y
+        for i in range(3):
+            v[i] += w * a[i] * b
+            for j in range(3):
+                m[i][j] += w * a[i] * a[j]
+    return _solve3(m, v)[0]
+
+def batch_centroid(history):
+    sw = sx = sy = 0.0
+    for x, y, r in history:
+        w = 1.0 / max(1.0, r) ** 2
+        sw += w
+        sx += w * x
+        sy += w * y
+    return sx / sw, sy / sw
+
+def accuracy(kind, sigma, trials, rng):
+    errors, inside, beats, reported = [], 0, 0, 0
+    for _ in range(trials):
+        ap = (rng.uniform(-200, 200), rng.uniform(20, 150))
+        est, history = None, []
+        for x, y, r in sightings(ap, route(kind), sigma, rng):
+            lat, lon = to_latlon(x, y)
+            if est is None:
+                est = APEstimator(lat, lon)
+            est.update(lat, lon, r)
+            history.append((x, y, r))
+        pos = est.position() if est is not None else None
+        if pos is None:
+            continue
+        reported += 1
+        ex, ny = offset_m(LAT0, LON0, pos.lat, pos.lon)
+        err = math.hypot(ex - ap[0], ny - ap[1])
+        cx, cy = batch_centroid(history)
+        errors.append(err)
+        inside += err <= pos.radius
+        beats += err <= math.hypot(cx - ap[0], cy - ap[1]) + 0.5 # ties: the centroid itself
+    return statistics.median(errors), inside / reported, beats / reported, reported
+
+def update_cost(sightings_count, rng):
+    est = APEstimator(LAT0, LON0)
+    history = []
+    incremental = rebuild = 0.0
+    for i in range(sightings_count):
+        x, y, r = rng.uniform(-300, 300), rng.uniform(-300, 300), rng.uniform(5, 200)
+        lat, lon = to_latlon(x, y)
+        start = time.perf_counter()
+        est.update(lat, lon, r)
+        est.position()
+        incremental += time.perf_counter() - start
+        history.append((x, y, r))
+        if i % 50 == 0: # sampled, the full re-solve is O(n)
+            start = time.perf_counter()
+            batch_least_squares(history)
+            rebuild += (time.perf_counter() - start) * 50
+    return incremental / sightings_count, rebuild / sightings_count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"  {'route':<9} {'sigma':>5}  {'median err':>10}  {'in radius':>9}  {'<= centroid':>11}")
+    for kind in ("straight", "corner", "loop"):
+        for sigma in (2, 4, 6):
+            err, inside, beats, reported = accuracy(kind, sigma, args.trials, rng)
+            print(f"  {kind:<9} {sigma:>4}dB  {err:>9.0f}m  {inside:>8.0%}  {beats:>10.0%}")
+
+    for count in (100, 1000, 5000):
+        inc, full = update_cost(count, rng)
+        print(f"{count:>5} sightings: update+position {inc * 1e6:.1f} us, re-solve from history {full * 1e6:.0f} us")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
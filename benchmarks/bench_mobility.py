@@ -0,0 +1,121 @@
+"""
+Micro-benchmark: MobilityWindow and the batch analyzers (WindowHistory, and
+ArrayHistory when NumPy is installed) vs the original list/statistics.variance
+history used by analyze_mobility(). Equivalence is covered by tests/test_mobility.py.
+
+    python benchmarks/bench_mobility.py [--targets 500] [--scans 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.mobility import MobilityWindow, WindowHistory, ArrayHistory, np
+from src.scanner import HISTORY_MAX_LEN
+from benchmarks import baseline
+from benchmarks.baseline import decide
+
+def window_step(window, now, signal, lat, my_speed):
+    window.push(now, signal, lat)
+    if len(window) < 5:
+        return None
+    gps_variance = 0
+    if window.lat_count() > 1:
+        gps_variance = window.lat_variance() * 100000
+    return decide(window.signal_variance(), gps_variance, window.signal_mean(),
+                  now - window.oldest_time(), my_speed)
+
+def make_drive(targets, scans, rng):
+    """Per-scan (time, speed, lat) plus per-target signal traces in mixed regimes."""
+    frames = []
+    t, lat, speed = 1700000000.0, 40.0, 0.0
+    for _ in range(scans):
+        t += rng.uniform(1.8, 2.6)
+        speed = max(0.0, speed + rng.uniform(-3, 3))
+        if speed > 1:
+            lat += rng.uniform(0, 4e-4)
+        fix = None if rng.random() < 0.1 else lat
+        frames.append((t, speed, fix))
+
+    traces = []
+    for _ in range(targets):
+        regime = rng.choice(["steady", "noisy", "strong", "fading"])
+        base = rng.randint(10, 95)
+        trace = []
+        for i in range(scans):
+            if regime == "steady":
+                sig = base + rng.randint(-2, 2)
+            elif regime == "noisy":
+                sig = base + rng.randint(-15, 15)
+            elif regime == "strong":
+                sig = rng.randint(55, 80)
+            else:
+                sig = base - i // 3
+            trace.append(max(0, min(100, sig)))
+        traces.append(trace)
+    return frames, traces
+
+def run(step, make_state, frames, traces):
+    states = [make_state() for _ in traces]
+    decisions = []
+    start = time.perf_counter()
+    for i, (now, speed, lat) in enumerate(frames):
+        for state, trace in zip(states, traces):
+            decisions.append(step(state, now, trace[i], lat, speed))
+    return time.perf_counter() - start, decisions
+
+class FakeTarget:
+    __slots__ = ("bssid", "signal", "lat")
+
+    def __init__(self, bssid):
+        self.bssid = bssid
+        self.signal = 0
+        self.lat = None
+
+def run_batch(history, frames, traces):
+    """One analyze() call per scan; decisions flattened in the same order as run()."""
+    targets = [FakeTarget(f"02:00:00:00:{i // 256:02X}:{i % 256:02X}") for i in range(len(traces))]
+    decisions = []
+    elapsed = 0.0
+    for i, (now, speed, lat) in enumerate(frames):
+        for t, trace in zip(targets, traces):
+            t.signal = trace[i]
+            t.lat = lat
+        start = time.perf_counter()
+        enough, moving, pacing = history.analyze(targets, now, speed)
+        elapsed += time.perf_counter() - start
+        decisions.extend((bool(m), bool(p)) if e else None for e, m, p in zip(enough, moving, pacing))
+    return elapsed, decisions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", type=int, default=500)
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    frames, traces = make_drive(args.targets, args.scans, random.Random(args.seed))
+
+    legacy_time, _ = run(partial(baseline.mobility_step, max_len=HISTORY_MAX_LEN), list, frames, traces)
+    window_time, windowed = run(window_step, lambda: MobilityWindow(HISTORY_MAX_LEN), frames, traces)
+
+    results = [("ring", window_time, windowed),
+               ("batch-py", *run_batch(WindowHistory(HISTORY_MAX_LEN), frames, traces))]
+    if np is not None:
+        results.append(("batch-np", *run_batch(ArrayHistory(HISTORY_MAX_LEN), frames, traces)))
+
+    total = args.targets * args.scans
+    print(f"{args.targets} targets x {args.scans} scans = {total} updates")
+    if np is None:
+        print("  (NumPy not installed: batch-np skipped)")
+    print(f"  legacy   : {legacy_time * 1000:8.1f} ms  ({legacy_time / total * 1e6:.2f} us/update)")
+    for name, elapsed, _ in results:
+        print(f"  {name:<9}: {elapsed * 1000:8.1f} ms  ({elapsed / total * 1e6:.2f} us/update, {legacy_time / elapsed:.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
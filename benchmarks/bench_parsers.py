@@ -0,0 +1,61 @@
+"""
+Throughput benchmark for src/parsers.py (correctness lives in tests/test_parsers.py).
+
+    python benchmarks/bench_parsers.py [--lines 5000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.parsers import parse_nmcli, parse_termux, parse_iw
+
+def nmcli_escape(value):
+    return value.replace("\\", "\\\\").replace(":", "\\:")
+
+def make_captures(lines, rng):
+    nets = []
+    for i in range(lines):
+        ssid = rng.choice(["Home", "Cafe: Free", "xfinitywifi", "IBR900-", "DIRECT-xy", "guest\\net"]) + str(i)
+        bssid = ":".join("%02X" % rng.randrange(256) for _ in range(6))
+        freq = rng.choice([2412, 2437, 2462, 5180, 5500, 5745, 5975])
+        nets.append((ssid, bssid, rng.randint(0, 100), freq, rng.choice(["WPA2", "WPA2 WPA3", "", "WPA1"])))
+
+    nmcli = "".join(f"{nmcli_escape(s)}:{nmcli_escape(b)}:{sig}:{f} MHz:{sec}\n" for s, b, sig, f, sec in nets)
+    termux = json.dumps([{"bssid": b.lower(), "frequency_mhz": f, "rssi": sig // 2 - 100, "ssid": s,
+                          "timestamp": 0, "channel_bandwidth_mhz": "20"} for s, b, sig, f, _ in nets])
+    iw = "".join(f"BSS {b.lower()}(on wlan0)\n\tfreq: {f}\n\tsignal: {sig // 2 - 100}.00 dBm\n\tSSID: {s}\n\tRSN:\t * Version: 1\n"
+                 for s, b, sig, f, _ in nets)
+    return nmcli, termux, iw
+
+def timed(parser, text, repeat):
+    best, count = None, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in parser(text))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    nmcli, termux, iw = make_captures(args.lines, random.Random(args.seed))
+    for name, fn, text in [("nmcli", parse_nmcli, nmcli), ("termux", parse_termux, termux), ("iw", parse_iw, iw)]:
+        elapsed, count = timed(fn, text, args.repeat)
+        if count != args.lines:
+            print(f"{name}: parsed {count} of {args.lines} networks")
+            return 1
+        print(f"  {name:7}: {elapsed * 1000:7.2f} ms for {count} networks ({count / elapsed / 1000:7.1f}k/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Scan-to-render pipeline benchmark on synthetic scenarios.
+
+    python benchmarks/bench_pipeline.py [--sizes 10,100,1000,10000] [--hours 1] [--json out.json]
+
+Times each stage separately per scan cycle (parse, Target registry,
+classify_threat, analyze_batch, log_threats, snapshot publish, ui.draw
+against a fake curses screen), then simulates hours of scanning to report memory growth.
+Results are printed and optionally written as JSON for comparing versions.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.config import CONFIG
+
+# Keep the benchmark away from the real log DB and radios
+_TMP = tempfile.mkdtemp(prefix="civops-bench-")
+CONFIG["log_file"] = os.path.join(_TMP, "bench.db")
+CONFIG["gps_enabled"] = False
+CONFIG["target_expiry"] = 300
+CONFIG["alert_sinks"] = []
+
+from src import scanner, ui, threats, db, alerts
+from src.state import SnapshotBus
+from src.parsers import parse_nmcli
+
+class FakeScreen:
+    """Just enough of a curses window for ui.draw(); counts the calls it receives."""
+
+    def __init__(self, h=50, w=160):
+        self.h, self.w = h, w
+        self.calls = 0
+
+    def getmaxyx(self):
+        return self.h, self.w
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+
+    clear = erase = refresh = noutrefresh = border = attron = attroff = addstr = addch = _call
+
+def install_fake_curses():
+    """ui.draw() talks to the curses module directly; make that work without a terminal."""
+    curses = ui.curses
+    curses.init_pair = lambda *args: None
+    curses.color_pair = lambda n: n << 8
+    curses.doupdate = lambda: None
+
+def nmcli_escape(value):
+    return value.replace("\\", "\\\\").replace(":", "\\:")
+
+def make_networks(count, rng):
+    words = ["home", "net", "linksys", "xfinity", "guest", "office", "printer", "police", "IBR900-", "axon"]
+    nets = []
+    for i in range(count):
+        ssid = rng.choice(words) + str(i)
+        bssid = ":".join("%02X" % rng.randrange(256) for _ in range(6))
+        nets.append([ssid, bssid, rng.randint(5, 95), rng.choice([2437, 5180]), "WPA2"])
+    return nets
+
+def nmcli_output(nets, rng):
+    lines = []
+    for ssid, bssid, sig, freq, sec in nets:
+        sig = max(0, min(100, sig + rng.randint(-5, 5)))
+        lines.append(f"{nmcli_escape(ssid)}:{nmcli_escape(bssid)}:{sig}:{freq} MHz:{sec}")
+    return "\n".join(lines) + "\n"
+
+def reset_state():
+    scanner.REGISTRY.targets.clear()
+    scanner.MOBILITY.clear()
+    if alerts.DISPATCHER is not None:
+        alerts.DISPATCHER.clear()
+    threats.classify_threat.cache_clear()
+
+def time_scenario(count, scans, rng):
+    """Average per-cycle time of every stage for `count` visible networks."""
+    reset_state()
+    nets = make_networks(count, rng)
+    outputs = [nmcli_output(nets, rng) for _ in range(scans)]
+    screen = FakeScreen()
+    writer = db.get_writer()
+    bus = SnapshotBus()
+    totals = dict.fromkeys(["parse", "targets", "classify", "mobility", "log", "publish", "draw"], 0.0)
+    now = time.time()
+
+    for i, out in enumerate(outputs):
+        now += 2.0
+
+        start = time.perf_counter()
+        parsed = list(parse_nmcli(out))
+        totals["parse"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = [scanner.REGISTRY.observe(s, b, sig, f, e, 40.0, -75.0, now) for s, b, sig, f, e in parsed]
+        totals["targets"] += time.perf_counter() - start
+
+        # Cold cache on the first cycle, warm afterwards, as in a real session
+        start = time.perf_counter()
+        for s, b, _, _, _ in parsed:
+            threats.classify_threat(s, b)
+        totals["classify"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanner.analyze_batch(current, 0.0, now)
+        totals["mobility"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanner.log_threats(current, now)
+        writer.flush(timeout=60)
+        totals["log"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot = bus.publish(current, now)
+        totals["publish"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        ui.draw(screen, snapshot, (i * 0.1) % 6.28)
+        totals["draw"] += time.perf_counter() - start
+
+    per_cycle = {stage: round(total / scans * 1000, 4) for stage, total in totals.items()}
+    per_cycle["total"] = round(sum(per_cycle.values()), 4)
+    return per_cycle
+
+def simulate_hours(count, hours, churn, rng):
+    """Scans every 2 simulated seconds with `churn` of the networks replaced per minute."""
+    reset_state()
+    nets = make_networks(count, rng)
+    scans = int(hours * 3600 / 2)
+    now = time.time()
+    samples = []
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(scans):
+        now += 2.0
+        if i % 30 == 0:
+            for _ in range(int(count * churn)):
+                nets[rng.randrange(count)] = make_networks(1, rng)[0]
+        current = [scanner.REGISTRY.observe(s, b, sig, f, e, 40.0, -75.0, now) for s, b, sig, f, e in parse_nmcli(nmcli_output(nets, rng))]
+        scanner.analyze_batch(current, 0.0, now)
+        scanner.REGISTRY.expire(CONFIG["target_expiry"], now)
+        if i % 300 == 0 or i == scans - 1:
+            samples.append({"sim_minutes": round(i * 2 / 60, 1),
+                            "kib": round((tracemalloc.get_traced_memory()[0] - base) / 1024, 1),
+                            "tracked": len(scanner.REGISTRY)})
+    tracemalloc.stop()
+    return samples
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--scans", type=int, default=20, help="scan cycles timed per scenario")
+    parser.add_argument("--hours", type=float, default=1.0, help="simulated hours for the memory run")
+    parser.add_argument("--memory-size", type=int, default=200, help="visible networks in the memory run")
+    parser.add_argument("--churn", type=float, default=0.05, help="fraction of networks replaced per minute")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="FILE", help="write machine-readable results to FILE")
+    args = parser.parse_args()
+
+    install_fake_curses()
+    rng = random.Random(args.seed)
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scans_per_scenario": args.scans,
+        "stages_ms_per_cycle": {},
+    }
+
+    print(f"{'BSSIDs':>7} " + " ".join(f"{s:>9}" for s in ["parse", "targets", "classify", "mobility", "log", "publish", "draw", "total"]) + "   (ms/cycle)")
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        scans = max(3, args.scans if size <= 1000 else args.scans // 4)
+        stages = time_scenario(size, scans, rng)
+        results["stages_ms_per_cycle"][str(size)] = stages
+        print(f"{size:>7} " + " ".join(f"{stages[k]:>9.3f}" for k in ["parse", "targets", "classify", "mobility", "log", "publish", "draw", "total"]))
+
+    if args.hours > 0:
+        samples = simulate_hours(args.memory_size, args.hours, args.churn, rng)
+        results["memory"] = {"networks": args.memory_size, "hours": args.hours, "churn": args.churn, "samples": samples}
+        print(f"\nMemory over {args.hours}h simulated ({args.memory_size} visible, {args.churn:.0%}/min churn):")
+        for s in samples:
+            print(f"  t+{s['sim_minutes']:>6.1f} min: {s['kib']:>9.1f} KiB  ({s['tracked']} tracked)")
+
+    db.shutdown_writer()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
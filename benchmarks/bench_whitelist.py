@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: compiled Whitelist vs the original per-scan list lookups.
+
+    python benchmarks/bench_whitelist.py [--rules 5000] [--count 10000] [--seed 7]
+
+Times matching against a naive reference (list membership, fnmatch for
+SSID wildcards, startswith for MAC prefixes) on a mixed corpus, and the
+per-scan reload: the old code re-parsed the JSON every scan, refresh()
+only stats the file. Matching rules are tested in tests/test_whitelist.py.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.whitelist import Whitelist
+from benchmarks import baseline
+
+def reference_match(data, ssid, bssid):
+    """Naive linear version of the full rule set (wildcards and prefixes included)."""
+    for entry in data["ignore_ssids"]:
+        if any(ch in entry for ch in "*?["):
+            if fnmatch.fnmatchcase(ssid, entry):
+                return True
+        elif ssid == entry:
+            return True
+    flat = bssid.replace(":", "")
+    for entry in data["ignore_macs"]:
+        digits = entry.rstrip("*").replace(":", "").replace("-", "").upper()
+        if entry.endswith("*") or len(digits) < 12:
+            if flat.startswith(digits):
+                return True
+        elif flat == digits:
+            return True
+    return False
+
+def random_mac(rng):
+    return ":".join("%02X" % rng.randrange(256) for _ in range(6))
+
+def make_rules(count, rng):
+    ssids = [f"home{i}" for i in range(count // 2)]
+    ssids += [f"FLEET-{i:03d}-*" for i in range(count // 20)] + ["Office-??", "Guest*"]
+    macs = [random_mac(rng) for _ in range(count // 2)]
+    macs += ["%02X:%02X:%02X" % tuple(rng.randrange(256) for _ in range(3)) for _ in range(count // 20)]
+    macs += ["%02X%02X%02X%X*" % tuple(rng.randrange(256) for _ in range(4)) for _ in range(count // 50)]
+    return {"ignore_ssids": ssids, "ignore_macs": macs}
+
+def make_corpus(data, count, rng):
+    exact_macs = [m for m in data["ignore_macs"] if len(m) == 17]
+    corpus = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            ssid = rng.choice(data["ignore_ssids"][:len(data["ignore_ssids"]) // 2])
+        elif roll < 0.10:
+            ssid = f"FLEET-{rng.randrange(len(data['ignore_ssids']) // 10):03d}-{rng.randrange(99)}"
+        elif roll < 0.12:
+            ssid = f"Office-{rng.randrange(100):02d}"
+        else:
+            ssid = f"net{rng.randrange(10 ** 6)}"
+        roll = rng.random()
+        if roll < 0.05:
+            bssid = rng.choice(exact_macs)
+        elif roll < 0.10:
+            bssid = rng.choice([m for m in data["ignore_macs"] if len(m) == 8]) + random_mac(rng)[8:]
+        else:
+            bssid = random_mac(rng)
+        corpus.append((ssid, bssid))
+    return corpus
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data = make_rules(args.rules, rng)
+    corpus = make_corpus(data, args.count, rng)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="civops-whitelist-"), "whitelist.json")
+    with open(path, "w") as f:
+        json.dump(data, f)
+    whitelist = Whitelist(path)
+    whitelist.refresh()
+    hits = sum(whitelist.match(s, b) for s, b in corpus)
+
+    # Same exact-only rules both ways, so the old list lookups are a fair baseline
+    exact = {"ignore_ssids": [s for s in data["ignore_ssids"] if "*" not in s and "?" not in s],
+             "ignore_macs": [m for m in data["ignore_macs"] if len(m) == 17]}
+    exact_only = Whitelist(path)
+    exact_only.compile(exact)
+
+    legacy = timed(lambda: [baseline.is_whitelisted(exact, s, b) for s, b in corpus], args.repeat)
+    compiled = timed(lambda: [exact_only.match(s, b) for s, b in corpus], args.repeat)
+    full = timed(lambda: [whitelist.match(s, b) for s, b in corpus], args.repeat)
+    naive = timed(lambda: [reference_match(data, s, b) for s, b in corpus[:max(1, len(corpus) // 20)]], 1)
+    naive *= len(corpus) / max(1, len(corpus) // 20)
+
+    def reparse():
+        with open(path, "r") as f:
+            json.load(f)
+    reload_legacy = timed(reparse, args.repeat * 4)
+    reload_stat = timed(whitelist.refresh, args.repeat * 4)
+
+    print(f"{whitelist.rules} rules, {len(corpus)} networks, {hits} whitelisted")
+    print(f"  exact rules, legacy lists : {legacy * 1000:8.2f} ms")
+    print(f"  exact rules, compiled     : {compiled * 1000:8.2f} ms  ({legacy / compiled:7.1f}x)")
+    print(f"  all rules, naive loop     : {naive * 1000:8.2f} ms  (extrapolated)")
+    print(f"  all rules, compiled       : {full * 1000:8.2f} ms  ({naive / full:7.1f}x)")
+    print(f"  per-scan reload: json.load {reload_legacy * 1e6:.0f} us, unchanged refresh() {reload_stat * 1e6:.0f} us")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
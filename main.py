@@ -3,35 +3,88 @@ import time
 import math
 import threading
 import argparse
+import select
 import sys
 import signal
-from src.scanner import scan
-from src.ui import draw
+from src.scanner import scan, request_rescan, preload_watchlist, get_gps_location
+from src.ui import draw, invalidate
 from src.config import CONFIG
 from src.kml import export_kml
+from src.db import flush_writer, shutdown_writer, compact_db
+from src.gps import stop_gps
+from src.replay import ReplaySession, start_recording, stop_recording
+from src.state import BUS
+from src.api import start_api, stop_api
+from src.aggregator import make_aggregator
+from src.analyze import run_analysis
+from src.scheduler import make_scheduler, stop_battery
+from src.alerts import stop_alerts
 
-# Shared state for thread communication
-targets = []
+# Shared state for thread communication (targets travel as state.BUS snapshots)
 scanning_active = True
 seek_history = []
 CAR_MODE = False
+REPLAY = None # ReplaySession when started with --replay
+AGGREGATOR = None # Aggregator when scan_sources / node_listen are configured
+SCHEDULER = None # ScanScheduler driving scan_loop()
+
+def replay_loop():
+    def publish(new_data, filtered):
+        if new_data:
+            BUS.publish(new_data, new_data[0].last_seen, filtered) # stamp with the recorded scan time
+        return scanning_active
+    
+    try:
+        REPLAY.run(publish)
+    except Exception as e:
+        pass
 
 def scan_loop():
-    global targets, scanning_active
-    interval = CONFIG.get("scan_interval", 2.0)
+    global scanning_active
+    
+    if REPLAY is not None:
+        replay_loop()
+        return
+    
+    scan_once = scan
+    if AGGREGATOR is not None:
+        AGGREGATOR.scheduler = SCHEDULER
+        scan_once = AGGREGATOR.start().scan
     
     while scanning_active:
+        started = time.time()
         try:
-            new_data = scan()
-            if new_data:
-                targets = new_data
-            time.sleep(interval)
+            new_data, filtered = scan_once()
+            # Every scan re-picks the interval, so an empty one doesn't leave a
+            # PACING or PARKED interval (and its reason on the HUD) in place
+            schedule = SCHEDULER.update(new_data, get_gps_location()[2])
+            if new_data or filtered:
+                BUS.publish(new_data, filtered=filtered, schedule=schedule)
+            else:
+                BUS.reschedule(schedule)
         except Exception as e:
             # In headless mode, we might want to log this error
             pass
+        SCHEDULER.wait(started)
+
+def schedule_text(schedule):
+    return f" | Next scan: {schedule.interval:.1f}s ({schedule.reason})" if schedule else ""
+
+def key_watch(consumed):
+    """Pokes the UI as soon as a key is pending; curses itself is only touched by the UI thread."""
+    fd = sys.stdin.fileno()
+    while scanning_active:
+        try:
+            ready, _, _ = select.select([fd], [], [], 0.5)
+        except:
+            return
+        if ready:
+            BUS.poke()
+            consumed.wait(0.1) # give the UI a moment to drain the keys before re-checking
+            consumed.clear()
 
 def main(stdscr):
-    global targets, scanning_active, seek_history, CAR_MODE
+    global scanning_active, seek_history, CAR_MODE
     
     curses.curs_set(0)
     curses.start_color()
@@ -39,101 +92,187 @@ def main(stdscr):
     stdscr.nodelay(1)
     
     angle = 0.0
-    seek_index = None # None = Radar Mode, Int = Index of target to seek
+    seek_bssid = None  # None = Radar Mode, otherwise the BSSID locked onto
+    seek_target = None # Latest view of the locked target (kept if it drops out of range)
     
     # Start scanning thread
     scan_thread = threading.Thread(target=scan_loop, daemon=True)
     scan_thread.start()
+    keys_consumed = threading.Event()
+    threading.Thread(target=key_watch, args=(keys_consumed,), daemon=True).start()
     
     rotation_speed = CONFIG.get("ui_rotation_speed", 0.1)
+    frame_interval = 1.0 / max(1, CONFIG.get("ui_max_fps", 20))
+    
+    snapshot = BUS.latest()
+    pokes = 0
+    seen_version = snapshot.version
+    running = True
     
     try:
-        while True:
-            try:
-                c = stdscr.getch()
-            except KeyboardInterrupt:
+        while running:
+            while True:
+                try:
+                    c = stdscr.getch()
+                except KeyboardInterrupt:
+                    c = ord('q')
+                if c == -1:
+                    break
+                
+                if c == ord('q'):
+                    running = False
+                    break
+                
+                # K for KML Export
+                if c == ord('k'):
+                    flush_writer()
+                    success, msg = export_kml(CONFIG.get("kml_path", "logs/map.kml"),
+                                              incremental=CONFIG.get("kml_incremental", False),
+                                              aggregate=CONFIG.get("kml_aggregate", False),
+                                              heat_cell=CONFIG.get("kml_heat_cell", 0))
+                    stdscr.attron(curses.A_REVERSE)
+                    stdscr.addstr(0, 0, f" KML: {msg} "[:40])
+                    stdscr.attroff(curses.A_REVERSE)
+                    stdscr.refresh()
+                    time.sleep(1.0)
+                    invalidate()
+                
+                # R forces an active radio sweep on the next scan
+                if c == ord('r'):
+                    request_rescan()
+                    if AGGREGATOR is not None:
+                        AGGREGATOR.request_rescan()
+                    if SCHEDULER is not None:
+                        SCHEDULER.wake()
+                
+                # S key toggles Seek Mode (Locks onto strongest threat or first item)
+                if c == ord('s'):
+                    if seek_bssid is None:
+                        best = snapshot.threats or snapshot.targets
+                        if best:
+                            seek_target = best[0]
+                            seek_bssid = seek_target.bssid
+                            seek_history = [seek_target.signal] # Reset history
+                    else:
+                        seek_bssid = seek_target = None # Back to Radar
+            keys_consumed.set()
+            if not running:
                 break
-
-            if c == ord('q'): break
-            
-            # K for KML Export
-            if c == ord('k'):
-                success, msg = export_kml()
-                stdscr.attron(curses.A_REVERSE)
-                stdscr.addstr(0, 0, f" KML: {msg} "[:40])
-                stdscr.attroff(curses.A_REVERSE)
-                stdscr.refresh()
-                time.sleep(1.0)
-            
-            # S key toggles Seek Mode (Locks onto strongest threat or first item)
-            if c == ord('s'):
-                if seek_index is None:
-                    # Find best target (Threat first, then strongest)
-                    if targets:
-                        seek_index = 0 
-                        seek_history = [] # Reset history
-                else:
-                    seek_index = None # Back to Radar
             
-            angle += rotation_speed
-            if angle > 6.28: angle = 0
+            # Update history for the locked target once per new scan, not per frame
+            if snapshot.version != seen_version:
+                seen_version = snapshot.version
+                if seek_bssid is not None:
+                    for t in snapshot.targets:
+                        if t.bssid == seek_bssid:
+                            seek_target = t
+                            seek_history.append(t.signal)
+                            if len(seek_history) > 60: seek_history.pop(0)
+                            break
             
-            # Pass copy of targets to avoid modification during draw if scan updates
-            current_targets = list(targets)
+            animating = not CAR_MODE # sweep / geiger clicks move every frame
+            if animating:
+                angle += rotation_speed
+                if angle > 6.28: angle = 0
             
-            # Update history for the active target
-            if seek_index is not None:
-                # Replicate sort logic from UI to find the correct target
-                sorted_targets = sorted(current_targets, key=lambda x: x.signal, reverse=True)
-                if seek_index < len(sorted_targets):
-                    t = sorted_targets[seek_index]
-                    seek_history.append(t.signal)
-                    if len(seek_history) > 60: seek_history.pop(0)
+            frame_start = time.monotonic()
+            draw(stdscr, snapshot, angle, seek_target, seek_history, car_mode=CAR_MODE)
             
-            draw(stdscr, current_targets, angle, seek_index, seek_history, car_mode=CAR_MODE)
-            time.sleep(0.05)
+            # Sleep until new data or a key press (or the next animation frame),
+            # then hold the frame rate to ui_max_fps
+            snapshot, pokes = BUS.wait(snapshot.version, pokes, frame_interval if animating else 1.0)
+            remaining = frame_interval - (time.monotonic() - frame_start)
+            if remaining > 0:
+                time.sleep(remaining)
             
     finally:
         scanning_active = False
+        if SCHEDULER is not None:
+            SCHEDULER.wake()
         scan_thread.join(timeout=1.0)
+        if AGGREGATOR is not None:
+            AGGREGATOR.stop()
+        shutdown_writer()
+        stop_gps()
+        stop_battery()
+        stop_alerts()
 
-def headless_mode():
+def headless_mode(daemon=False):
     global scanning_active
-    print("Starting CivOps in HEADLESS MODE...")
+    print("Starting CivOps in DAEMON MODE..." if daemon else "Starting CivOps in HEADLESS MODE...")
+    if daemon:
+        try:
+            print(f"Streaming API on {start_api().address()} (/snapshot, /stream)")
+        except Exception as e:
+            print(f"API failed to start: {e}")
+            return
     print("Press Ctrl+C to stop.")
     
     scan_thread = threading.Thread(target=scan_loop, daemon=True)
     scan_thread.start()
     
     try:
-        while scanning_active:
+        while scanning_active and scan_thread.is_alive():
             time.sleep(1)
-            # Optional: Print status every few seconds
-            if targets:
-                threat_count = sum(1 for t in targets if t.is_threat)
-                mobile_count = sum(1 for t in targets if t.is_mobile)
-                pacing_count = sum(1 for t in targets if getattr(t, 'is_pacing', False))
-                print(f"\r[Status] Targets: {len(targets)} | Threats: {threat_count} | Mobile: {mobile_count} | Pacing: {pacing_count}", end="")
+            # Optional: Print status every few seconds (clients get the details in daemon mode)
+            snapshot = BUS.latest()
+            if (snapshot.targets or snapshot.filtered) and not daemon:
+                mobile_count = sum(1 for t in snapshot.targets if t.is_mobile)
+                print(f"\r[Status] Targets: {len(snapshot.targets)} | Threats: {len(snapshot.threats)} | Mobile: {mobile_count} | Pacing: {len(snapshot.pacing)} | Filtered: {snapshot.filtered}{schedule_text(snapshot.schedule)}", end="")
     except KeyboardInterrupt:
         print("\nStopping...")
     finally:
         scanning_active = False
+        if SCHEDULER is not None:
+            SCHEDULER.wake()
         scan_thread.join(timeout=2.0)
+        if AGGREGATOR is not None:
+            AGGREGATOR.stop()
+        stop_api()
+        shutdown_writer()
+        stop_gps()
+        stop_battery()
+        stop_alerts()
+        if REPLAY is not None:
+            print("\n" + REPLAY.summary())
         print("Clean exit.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="CivOps Wifi Scanner")
     parser.add_argument("--headless", action="store_true", help="Run without UI (logging only)")
+    parser.add_argument("--daemon", action="store_true", help="Headless, serving live snapshots/events on a local API")
+    parser.add_argument("--analyze", action="store_true", help="Rank likely followers across all logged sessions, then exit")
+    parser.add_argument("--vacuum", action="store_true", help="Convert an older log DB to incremental vacuum (rewrites it), then exit")
     parser.add_argument("--car", action="store_true", help="Run in High-Contrast Car Mode")
+    parser.add_argument("--record", metavar="FILE", help="Record raw scans and GPS fixes to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="Replay a recorded session instead of scanning")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (0 = as fast as possible)")
     args = parser.parse_args()
 
+    if args.analyze:
+        sys.exit(run_analysis())
+    if args.vacuum:
+        sys.exit(compact_db())
+    
     CAR_MODE = args.car
+    if CONFIG.get("watchlist_preload", False):
+        preload_watchlist()
+    if args.replay:
+        REPLAY = ReplaySession(args.replay, args.speed)
+    elif args.record:
+        start_recording(args.record)
+    if not args.replay:
+        AGGREGATOR = make_aggregator()
+        SCHEDULER = make_scheduler()
 
-    if args.headless:
-        headless_mode()
-    else:
-        try:
-            curses.wrapper(main)
-        except KeyboardInterrupt:
-            # Handle Ctrl+C during curses initialization/wrapper
-            pass
+    try:
+        if args.headless or args.daemon:
+            headless_mode(daemon=args.daemon)
+        else:
+            try:
+                curses.wrapper(main)
+            except KeyboardInterrupt:
+                # Handle Ctrl+C during curses initialization/wrapper
+                pass
+    finally:
+        stop_recording()
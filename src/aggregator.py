@@ -0,0 +1,215 @@
+import json
+import os
+import socketserver
+import threading
+import time
+from . import scanner
+from .config import CONFIG
+from .backends import BACKENDS, RescanPolicy
+
+# --- MULTI-SOURCE AGGREGATION ---
+# Several radios (and remote nodes) scan concurrently, each in its own
+# worker. Every worker queues its parsed scans in the Aggregator; once per
+# scan cycle each source's latest scans are merged by BSSID (strongest
+# reading wins, every source's reading is kept on Target.sources) and the
+# merged set goes through the normal registry -> mobility -> log path. A
+# source that scanned more than once since the last cycle has its earlier
+# scans ingested first, one by one at their own time, so none of its
+# sightings or mobility samples are lost. At most `source_backlog` scans are
+# kept per source.
+#
+# Configured with:
+#   "scan_sources": [{"name": "usb24", "backend": "iw", "interface": "wlan1"},
+#                    {"name": "usb5", "backend": "iw", "interface": "wlan2"}]
+#   "node_listen": "127.0.0.1:8766" or "unix:/path/to/socket"
+#
+# Remote nodes push one JSON object per line, either raw backend output
+#   {"node": "rear", "b": "termux", "o": "<termux-wifi-scaninfo output>"}
+# or already parsed networks
+#   {"node": "rear", "nets": [["ssid", "AA:BB:CC:DD:EE:FF", 72, "5G", "WPA2"], ...]}
+# Scans are stamped with the local arrival time; node clocks are not trusted.
+
+class SourceWorker(threading.Thread):
+    """Scans one local backend on its own interval, or the shared scheduler's if it has none."""
+
+    def __init__(self, name, backend, aggregator, interval):
+        threading.Thread.__init__(self, daemon=True)
+        self.source = name
+        self.backend = backend
+        self.aggregator = aggregator
+        self.interval = interval
+        self.policy = RescanPolicy(CONFIG.get("active_rescan_every", 5))
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            started = time.time()
+            active = self.policy.due()
+            out = self.backend.read(active=active)
+            finished = time.time()
+            if out:
+                if scanner.RECORDER is not None:
+                    scanner.RECORDER.scan(self.backend.name, active, out, finished)
+                try:
+                    self.aggregator.submit(self.source, list(self.backend.parse(out)), finished)
+                except:
+                    pass
+            interval = self.interval
+            if interval is None:
+                scheduler = self.aggregator.scheduler
+                interval = scheduler.current.interval if scheduler is not None else CONFIG.get("scan_interval", 2.0)
+            self.stopped.wait(max(0.0, interval - (time.time() - started)))
+
+    def stop(self):
+        self.stopped.set()
+
+class NodeHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        aggregator = self.server.aggregator
+        peer = self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+        for line in self.rfile:
+            try:
+                msg = json.loads(line)
+                source = "node:" + str(msg.get("node") or peer)
+                if "nets" in msg:
+                    nets = [(str(n[0]), str(n[1]).upper(), int(n[2]), str(n[3]), str(n[4])) for n in msg["nets"]]
+                elif msg.get("b") in BACKENDS and msg.get("o"):
+                    nets = list(BACKENDS[msg["b"]]().parse(msg["o"]))
+                else:
+                    continue
+            except:
+                continue # one bad line must not drop the node
+            aggregator.submit(source, nets, time.time())
+
+class TCPNodeServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class UnixNodeServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+class Aggregator:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {} # source -> [(time, [(ssid, bssid, signal, band, encryption), ...]), ...]
+        self.backlog = max(1, CONFIG.get("source_backlog", 10))
+        self.workers = []
+        self.server = None
+        self.socket_path = None
+        self.scheduler = None # ScanScheduler pacing sources without an "interval"
+
+    def add_source(self, name, backend, interval):
+        self.workers.append(SourceWorker(name, backend, self, interval))
+
+    def listen(self, spec):
+        """Accepts remote node scans on "host:port" or "unix:/path"."""
+        if spec.startswith("unix:"):
+            self.socket_path = spec[5:]
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.server = UnixNodeServer(self.socket_path, NodeHandler)
+        else:
+            host, _, port = spec.rpartition(":")
+            self.server = TCPNodeServer((host or "127.0.0.1", int(port)), NodeHandler)
+        self.server.aggregator = self
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        if self.server is not None:
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            if self.socket_path:
+                try:
+                    os.unlink(self.socket_path)
+                except OSError:
+                    pass
+
+    def request_rescan(self):
+        for worker in self.workers:
+            worker.policy.request()
+
+    def submit(self, source, nets, ts):
+        """Called from worker/node threads; queues the scan until the next cycle."""
+        with self.lock:
+            scans = self.pending.setdefault(source, [])
+            scans.append((ts, nets))
+            if len(scans) > self.backlog:
+                del scans[0]
+
+    def _merge(self, scans):
+        """Merges (source, time, nets) scans by BSSID. Returns (networks, sources, scanned_at)."""
+        merged = {}  # bssid -> (ssid, bssid, signal, band, encryption)
+        sources = {} # bssid -> [(source, signal, time), ...]
+        scanned_at = 0.0
+        for source, ts, nets in scans:
+            scanned_at = max(scanned_at, ts)
+            for net in nets:
+                bssid = net[1]
+                best = merged.get(bssid)
+                if best is None or net[2] > best[2]:
+                    if best is not None and not net[0]:
+                        net = (best[0],) + tuple(net[1:]) # keep an SSID a weaker radio decoded
+                    merged[bssid] = net
+                sources.setdefault(bssid, []).append((source, net[2], ts))
+        return list(merged.values()), {b: tuple(r) for b, r in sources.items()}, scanned_at
+
+    def collect(self):
+        """
+        Takes the scans received since the last call. Returns a list of
+        (networks, sources, scanned_at), oldest first: the earlier scans of
+        each source on their own, then every source's latest scan merged.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        earlier = sorted(((ts, source, nets) for source, scans in pending.items() for ts, nets in scans[:-1]),
+                         key=lambda scan: scan[0])
+        batches = [self._merge([(source, ts, nets)]) for ts, source, nets in earlier]
+        latest = [(source, scans[-1][0], scans[-1][1]) for source, scans in pending.items() if scans]
+        if latest:
+            batches.append(self._merge(latest))
+        return batches
+
+    def scan(self):
+        """
+        One aggregated scan cycle, the multi-source counterpart of scanner.scan().
+        Returns the merged latest scan's (targets, number whitelisted); ([], 0)
+        when nothing arrived, which the scheduler takes as no data.
+        """
+        scanner.load_whitelist()
+        targets, filtered = [], 0
+        for nets, sources, scanned_at in self.collect():
+            if not nets:
+                targets, filtered = [], 0
+                continue
+            targets, filtered = scanner.ingest(nets, scanned_at, sources)
+            targets = scanner.finish_scan(targets, scanned_at)
+        return targets, filtered
+
+def make_aggregator():
+    """Builds an Aggregator from scan_sources / node_listen, or returns None if neither is set."""
+    specs = CONFIG.get("scan_sources") or []
+    listen = CONFIG.get("node_listen") or ""
+    if not specs and not listen:
+        return None
+    aggregator = Aggregator()
+    for i, spec in enumerate(specs):
+        cls = BACKENDS.get(spec.get("backend"))
+        if cls is None:
+            continue
+        backend = cls()
+        if spec.get("interface") and hasattr(backend, "interface"):
+            backend.interface = spec["interface"]
+        if not backend.available():
+            continue
+        aggregator.add_source(spec.get("name") or f"{backend.name}{i}", backend, spec.get("interval"))
+    if listen:
+        aggregator.listen(listen)
+    return aggregator
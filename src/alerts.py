@@ -0,0 +1,291 @@
+import heapq
+import json
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from .config import CONFIG
+
+# --- ALERT DISPATCH ---
+# The scan thread only calls raise_alert(), which files the alert in a
+# priority queue and returns. A worker thread drains the queue, merges what
+# piled up into one message per kind ("3 threats nearby"), and hands the
+# messages to the sinks, most urgent first. Each (kind, key) stays quiet for
+# alert_rearm seconds after it fired, then can fire again.
+#
+#   "alert_sinks": ["tts", "log", "socket"]
+#   "alert_socket": "unix:/path/to/socket" or "127.0.0.1:8767" (JSON datagrams)
+
+PRIORITY_PACING = 0
+PRIORITY_HIGH = 1
+PRIORITY_OTHER = 2
+
+Alert = namedtuple("Alert", ["priority", "seq", "kind", "key", "text", "time"])
+Message = namedtuple("Message", ["priority", "kind", "text", "count", "keys", "time"])
+
+def coalesce(alerts):
+    """Folds pending alerts into one Message per kind, most urgent first."""
+    groups = {}
+    for alert in sorted(alerts):
+        groups.setdefault(alert.kind, []).append(alert)
+    messages = []
+    for kind, group in groups.items():
+        n = len(group)
+        if n == 1:
+            text = group[0].text
+        elif kind == "pacing":
+            text = f"Alert. Pacing detected. {n} vehicles following."
+        elif kind == "threat":
+            text = f"Caution: {n} threats nearby."
+        else:
+            text = f"{group[0].text} And {n - 1} more."
+        messages.append(Message(group[0].priority, kind, text, n,
+                                tuple(a.key for a in group), group[-1].time))
+    messages.sort(key=lambda m: m.priority)
+    return messages
+
+# --- SINKS ---
+# emit(message) is called from the dispatcher thread only.
+
+class TTSSink:
+    """Speaks through termux-tts-speak (or espeak); waits for and reaps each child."""
+
+    name = "tts"
+
+    def __init__(self, timeout=20.0):
+        self.timeout = timeout
+        self.cmd = None
+        for cmd in ("termux-tts-speak", "espeak-ng", "espeak"):
+            if shutil.which(cmd):
+                self.cmd = cmd
+                break
+        self.proc = None
+
+    def emit(self, message):
+        if self.cmd is None:
+            return
+        try:
+            self.proc = subprocess.Popen([self.cmd, message.text],
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.proc.wait(self.timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+        except:
+            pass
+        self.proc = None
+
+    def kill(self):
+        proc = self.proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            try:
+                proc.wait(2)
+            except:
+                pass
+
+    def close(self):
+        self.kill()
+
+class LogSink:
+    """Appends one tab-separated line per message."""
+
+    name = "log"
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def emit(self, message):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(message.time))
+        try:
+            with open(self.path, "a") as f:
+                f.write(f"{stamp}\t{message.kind}\t{message.count}\t{message.text}\t{','.join(message.keys)}\n")
+        except:
+            pass
+
+    def close(self):
+        pass
+
+class SocketSink:
+    """Sends each message as a JSON datagram; nobody listening is not an error."""
+
+    name = "socket"
+
+    def __init__(self, spec):
+        if spec.startswith("unix:"):
+            self.address = spec[5:]
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        else:
+            host, _, port = spec.rpartition(":")
+            self.address = (host or "127.0.0.1", int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def emit(self, message):
+        payload = json.dumps({"time": message.time, "kind": message.kind, "priority": message.priority,
+                              "count": message.count, "text": message.text, "keys": list(message.keys)})
+        try:
+            self.sock.sendto(payload.encode(), self.address)
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+# --- DISPATCHER ---
+
+class AlertDispatcher(threading.Thread):
+    def __init__(self, sinks, rearm=600.0, coalesce_delay=0.2, queue_size=64):
+        threading.Thread.__init__(self, name="civops-alerts", daemon=True)
+        # Quick sinks first, so a long utterance doesn't hold up the log/socket
+        self.sinks = sorted(sinks, key=lambda s: s.name == "tts")
+        self.rearm = rearm
+        self.coalesce_delay = coalesce_delay
+        self.queue_size = queue_size
+        self.cond = threading.Condition()
+        self.pending = [] # heap of Alert
+        self.fired = {}   # (kind, key) -> time it last fired
+        self.pruned_at = 0.0
+        self.seq = 0
+        self.stopping = False
+        self.raised = self.suppressed = self.dropped = self.sent = 0
+
+    def raise_alert(self, kind, key, text, priority=PRIORITY_OTHER, now=None):
+        """
+        Queues an alert unless (kind, key) fired within the re-arm timeout.
+        Returns False if it was suppressed or the full queue dropped it. Never blocks on sinks.
+        """
+        now = now if now is not None else time.time()
+        with self.cond:
+            last = self.fired.get((kind, key))
+            if last is not None and now - last < self.rearm:
+                self.suppressed += 1
+                return False
+            self.fired[(kind, key)] = now
+            if now - self.pruned_at > self.rearm:
+                self.pruned_at = now
+                self.fired = {k: t for k, t in self.fired.items() if now - t < self.rearm}
+            self.seq += 1
+            alert = Alert(priority, self.seq, kind, key, text, now)
+            heapq.heappush(self.pending, alert)
+            if len(self.pending) > self.queue_size:
+                # Full: the least urgent, newest alert goes, and is armed again
+                # since it was never sent
+                dropped = max(self.pending)
+                self.pending.remove(dropped)
+                heapq.heapify(self.pending)
+                if self.fired.get((dropped.kind, dropped.key)) == dropped.time:
+                    del self.fired[(dropped.kind, dropped.key)]
+                self.dropped += 1
+                if dropped is alert:
+                    return False
+            self.raised += 1
+            self.cond.notify()
+        return True
+
+    def take(self):
+        """Waits for alerts and returns everything pending (None when stopping)."""
+        with self.cond:
+            waited = False
+            while not self.pending and not self.stopping:
+                self.cond.wait()
+                waited = True
+            if waited:
+                # A scan raises its alerts back to back; give the rest of the burst a moment
+                deadline = time.monotonic() + self.coalesce_delay
+                while not self.stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+            if self.stopping:
+                return None
+            pending, self.pending = self.pending, []
+        return pending
+
+    def run(self):
+        while True:
+            pending = self.take()
+            if pending is None:
+                break
+            # Send only the most urgent message; the rest go back in the queue so
+            # anything raised while it plays can overtake or join them
+            message = coalesce(pending)[0]
+            with self.cond:
+                for alert in pending:
+                    if alert.kind != message.kind:
+                        heapq.heappush(self.pending, alert)
+            for sink in self.sinks:
+                if self.stopping:
+                    break
+                try:
+                    sink.emit(message)
+                except:
+                    pass
+            self.sent += 1
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except:
+                pass
+
+    def clear(self):
+        """Forgets pending alerts and re-arms everything."""
+        with self.cond:
+            self.pending = []
+            self.fired = {}
+
+    def stop(self, timeout=2.0):
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+        for sink in self.sinks:
+            if sink.name == "tts":
+                sink.kill() # cut a long utterance short
+        if self.is_alive():
+            self.join(timeout)
+
+def make_sinks():
+    sinks = []
+    for name in CONFIG.get("alert_sinks", ["tts", "log"]):
+        try:
+            if name == "tts":
+                sinks.append(TTSSink(CONFIG.get("alert_tts_timeout", 20.0)))
+            elif name == "log":
+                sinks.append(LogSink(CONFIG.get("alert_log", "logs/alerts.log")))
+            elif name == "socket" and CONFIG.get("alert_socket"):
+                sinks.append(SocketSink(CONFIG["alert_socket"]))
+        except:
+            pass # a sink that cannot start must not stop the others
+    return sinks
+
+DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+def get_dispatcher():
+    """Returns the shared dispatcher thread, starting it on first use."""
+    global DISPATCHER
+    with _DISPATCHER_LOCK:
+        if DISPATCHER is None or not DISPATCHER.is_alive():
+            DISPATCHER = AlertDispatcher(make_sinks(),
+                                         rearm=CONFIG.get("alert_rearm", 600.0),
+                                         coalesce_delay=CONFIG.get("alert_coalesce", 0.2),
+                                         queue_size=CONFIG.get("alert_queue", 64))
+            DISPATCHER.start()
+        return DISPATCHER
+
+def raise_alert(kind, key, text, priority=PRIORITY_OTHER, now=None):
+    return get_dispatcher().raise_alert(kind, key, text, priority, now)
+
+def stop_alerts(timeout=2.0):
+    """Stops the shared dispatcher. Safe to call if it never started."""
+    global DISPATCHER
+    with _DISPATCHER_LOCK:
+        dispatcher, DISPATCHER = DISPATCHER, None
+    if dispatcher is not None:
+        dispatcher.stop(timeout)
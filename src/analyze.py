@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import time
+from .config import CONFIG
+from .db import db_path as get_db_path, COORD_SCALE, NO_CELL
+
+# --- CROSS-SESSION FOLLOWER ANALYSIS ---
+# analyze_mobility() only sees the last few samples of one drive. Here the
+# whole log is scanned for networks that keep turning up in different
+# places and on different days: a fixed AP stays in one or two grid cells,
+# something that travels with (or after) you does not.
+#
+# Raw sightings and hourly roll-ups are both read in rowid chunks, so each
+# query is a short sequential range scan; only the distinct
+# (network, day, cell) triples come back and are folded into per-network sets.
+
+CELL_SPAN = 1 << 32 # cell key = lat_index * CELL_SPAN + lon_index
+
+def _index_sql(col, step):
+    """Grid index of a fixed-point column (floor division; NULL stays NULL)."""
+    return f"(({col}) - ((({col}) % {step}) + {step}) % {step}) / {step}"
+
+class FollowerAnalysis:
+    def __init__(self, path=None, cell_deg=0.01, chunk=200000):
+        self.path = path or get_db_path()
+        self.step = max(1, int(round(cell_deg * COORD_SCALE)))
+        self.chunk = chunk
+        self.days = {}  # network_id -> set of UTC day numbers
+        self.cells = {} # network_id -> set of cell keys
+        self.counts = {}
+        self.sightings = 0 # raw sightings, plus those folded into hourly roll-ups
+        self.elapsed = 0.0
+
+    def _fold(self, rows):
+        days, cells, counts = self.days, self.cells, self.counts
+        total = 0
+        for network_id, day, cell, n in rows:
+            if network_id not in days:
+                days[network_id] = set()
+                cells[network_id] = set()
+                counts[network_id] = 0
+            days[network_id].add(day)
+            if cell is not None:
+                cells[network_id].add(cell)
+            counts[network_id] += n
+            total += n
+        self.sightings += total
+
+    def _scan(self, conn, table, select):
+        lo, hi = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+        if lo is None:
+            return
+        sql = f"{select} WHERE rowid BETWEEN ? AND ? GROUP BY 1, 2, 3"
+        start = lo
+        while start <= hi:
+            end = start + self.chunk - 1
+            self._fold(conn.execute(sql, (start, end)))
+            start = end + 1
+
+    def run(self):
+        started = time.perf_counter()
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            step = self.step
+            cell = f"{_index_sql('lat', step)} * {CELL_SPAN} + {_index_sql('lon', step)}"
+            self._scan(conn, "sightings",
+                       f"SELECT network_id, time / 86400, {cell}, COUNT(*) FROM sightings")
+            has_hourly = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sightings_hourly'").fetchone()
+            if has_hourly:
+                lat, lon = f"NULLIF(cell_lat, {NO_CELL})", f"NULLIF(cell_lon, {NO_CELL})"
+                cell = f"{_index_sql(lat, step)} * {CELL_SPAN} + {_index_sql(lon, step)}"
+                self._scan(conn, "sightings_hourly",
+                           f"SELECT network_id, hour / 24, {cell}, SUM(count) FROM sightings_hourly")
+            self.networks = self._load_networks(conn)
+        finally:
+            conn.close()
+        self.elapsed = time.perf_counter() - started
+        return self
+
+    def _load_networks(self, conn):
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT id, bssid, ssid, vendor, first_seen, last_seen FROM networks")}
+
+    def rank(self, min_cells=4, min_days=3, top=25):
+        """Networks seen in at least `min_cells` cells and on `min_days` days, most suspicious first."""
+        ranked = []
+        for network_id, days in self.days.items():
+            n_cells, n_days = len(self.cells[network_id]), len(days)
+            # A fixed AP passed every day (home, a neighbour) stays in one or two
+            # cells however many days it is seen on
+            if n_cells < min_cells or n_days < min_days:
+                continue
+            bssid, ssid, vendor, first_seen, last_seen = self.networks.get(network_id, (None,) * 5)
+            if bssid is None:
+                continue
+            ranked.append({"bssid": bssid, "ssid": ssid, "vendor": vendor,
+                           "cells": n_cells, "days": n_days, "sightings": self.counts[network_id],
+                           "first_seen": first_seen, "last_seen": last_seen,
+                           # Travelling with you *and* across days marks a follower; places count most
+                           "score": n_cells * n_cells * n_days})
+        ranked.sort(key=lambda r: (r["score"], r["cells"], r["sightings"]), reverse=True)
+        return ranked[:top] if top else ranked
+
+def save_watchlist(ranked, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"generated": int(time.time()), "followers": ranked}, f, indent=2)
+    os.replace(tmp, path)
+
+def load_watchlist(path):
+    """Returns {bssid: entry} from a saved analysis (empty if missing or unreadable)."""
+    try:
+        with open(path, "r") as f:
+            return {e["bssid"].upper(): e for e in json.load(f).get("followers", []) if e.get("bssid")}
+    except:
+        return {}
+
+def _day(ts):
+    return time.strftime("%Y-%m-%d", time.gmtime(ts)) if ts else "?"
+
+def run_analysis():
+    """Entry point for `main.py --analyze`: prints the ranking and writes the watchlist file."""
+    path = get_db_path()
+    if not os.path.exists(path):
+        print(f"No database at {path}")
+        return 1
+    analysis = FollowerAnalysis(path, CONFIG.get("retention_cell_deg", 0.01),
+                                CONFIG.get("analyze_chunk", 200000)).run()
+    ranked = analysis.rank(CONFIG.get("analyze_min_cells", 4), CONFIG.get("analyze_min_days", 3),
+                           CONFIG.get("analyze_top", 25))
+    print(f"Scanned {analysis.sightings} sightings / {len(analysis.days)} networks in {analysis.elapsed:.2f}s")
+    if not ranked:
+        print("No likely followers.")
+    else:
+        print(f"{'#':>3}  {'BSSID':<17}  {'SSID':<20}  {'CELLS':>5}  {'DAYS':>4}  {'SEEN':>7}  FIRST       LAST")
+        for i, r in enumerate(ranked, 1):
+            print(f"{i:>3}  {r['bssid']:<17}  {(r['ssid'] or '')[:20]:<20}  {r['cells']:>5}  {r['days']:>4}  "
+                  f"{r['sightings']:>7}  {_day(r['first_seen'])}  {_day(r['last_seen'])}")
+    watchlist_file = CONFIG.get("watchlist_file", "logs/watchlist.json")
+    save_watchlist(ranked, watchlist_file)
+    print(f"Watchlist written to {watchlist_file}")
+    return 0
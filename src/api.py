@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import threading
+from .config import CONFIG
+from .state import BUS
+
+# --- LOCAL STREAMING API ---
+# A small HTTP server (localhost TCP or a Unix socket) for dashboards/loggers:
+#   GET /snapshot  latest snapshot as JSON
+#   GET /stream    Server-Sent Events: one "snapshot" event, then
+#                  "new" / "updated" / "expired" / "alert" events as scans land
+# The scan thread never waits on clients: a watcher thread diffs snapshots
+# and hands pre-encoded events to the asyncio loop, which fans them out into
+# bounded per-client queues. A client that falls behind loses its oldest
+# events and gets an "overflow" event telling it how many were dropped.
+
+# Fields whose change makes a target "updated" (last_seen alone does not)
+WATCHED = ("signal", "freq", "encryption", "lat", "lon", "vendor", "dist_m",
+           "is_threat", "threat_label", "confidence", "is_mobile", "is_pacing")
+
+def view_dict(v):
+    d = v._asdict()
+    if v.ap is not None:
+        d["ap"] = v.ap._asdict()
+    return d
+
+def snapshot_dict(snapshot):
+    return {"version": snapshot.version, "time": snapshot.time,
+            "threats": len(snapshot.threats), "pacing": len(snapshot.pacing),
+            "filtered": snapshot.filtered,
+            "schedule": snapshot.schedule._asdict() if snapshot.schedule else None,
+            "targets": [view_dict(v) for v in snapshot.targets]}
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+class SnapshotDiffer:
+    """Turns consecutive snapshots into (event, data) pairs, expiring targets like the registry does."""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.known = {} # bssid -> last TargetView
+
+    def diff(self, snapshot):
+        events = []
+        known = self.known
+        for v in snapshot.targets:
+            old = known.get(v.bssid)
+            if old is None:
+                events.append(("new", view_dict(v)))
+            elif any(getattr(old, f) != getattr(v, f) for f in WATCHED):
+                events.append(("updated", view_dict(v)))
+            if v.is_pacing and not (old is not None and old.is_pacing):
+                events.append(("alert", {"level": "pacing", "bssid": v.bssid, "ssid": v.ssid,
+                                         "label": v.threat_label, "time": snapshot.time}))
+            elif v.is_threat and not (old is not None and old.is_threat):
+                events.append(("alert", {"level": "threat", "bssid": v.bssid, "ssid": v.ssid,
+                                         "label": v.threat_label, "confidence": v.confidence,
+                                         "time": snapshot.time}))
+            known[v.bssid] = v
+        stale = [b for b, v in known.items() if snapshot.time - v.last_seen > self.max_age]
+        for bssid in stale:
+            del known[bssid]
+            events.append(("expired", {"bssid": bssid, "time": snapshot.time}))
+        return events
+
+class Client:
+    __slots__ = ("writer", "queue", "dropped")
+
+    def __init__(self, writer, size):
+        self.writer = writer
+        self.queue = asyncio.Queue(size)
+        self.dropped = 0
+
+    def offer(self, data):
+        """Never blocks: a full queue loses its oldest event."""
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(data)
+            self.dropped += 1
+
+class ApiServer:
+    def __init__(self, host="127.0.0.1", port=8765, socket_path="", queue_size=256, bus=BUS):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.queue_size = queue_size
+        self.bus = bus
+        self.clients = set()
+        self.handlers = set() # connection tasks, awaited on shutdown
+        self.loop = None
+        self.stopping = None
+        self.ready = threading.Event()
+        self.error = None
+        self.thread = None
+        self.running = False
+
+    def address(self):
+        return f"unix:{self.socket_path}" if self.socket_path else f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Starts the server thread; returns once it is listening (or failed to)."""
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        threading.Thread(target=self._watch, daemon=True).start()
+        self.ready.wait(5.0)
+        if self.error is not None:
+            self.running = False
+            raise self.error
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None and self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        self.bus.poke()
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+
+    # --- snapshot watcher (plain thread, off both the scan thread and the loop) ---
+
+    def _watch(self):
+        self.ready.wait()
+        if self.error is not None:
+            return
+        differ = SnapshotDiffer(CONFIG.get("target_expiry", 300))
+        snapshot, pokes = self.bus.latest(), 0
+        if snapshot.version:
+            differ.diff(snapshot)
+        while self.running:
+            version = snapshot.version
+            snapshot, pokes = self.bus.wait(version, pokes, 1.0)
+            if snapshot.version == version or not self.running:
+                continue
+            encoded = [sse(event, data) for event, data in differ.diff(snapshot)]
+            if encoded:
+                try:
+                    self.loop.call_soon_threadsafe(self._fanout, encoded)
+                except RuntimeError:
+                    return # loop closed
+
+    def _fanout(self, encoded):
+        for client in self.clients:
+            for data in encoded:
+                client.offer(data)
+
+    # --- asyncio side ---
+
+    def _serve(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            server = await asyncio.start_unix_server(self._handle, self.socket_path)
+        else:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.ready.set()
+        async with server:
+            await self.stopping.wait()
+            for client in list(self.clients):
+                client.offer(None) # ends its stream loop
+            if self.handlers:
+                await asyncio.wait(list(self.handlers), timeout=1.0)
+        if self.socket_path:
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            request = await asyncio.wait_for(reader.readline(), 10)
+            while True: # skip headers
+                line = await asyncio.wait_for(reader.readline(), 10)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            parts = request.decode("latin-1").split()
+            path = parts[1].split("?", 1)[0] if len(parts) > 1 else ""
+            if len(parts) < 2 or parts[0] != "GET":
+                await self._respond(writer, "405 Method Not Allowed", {"error": "GET only"})
+            elif path == "/snapshot":
+                await self._respond(writer, "200 OK", snapshot_dict(self.bus.latest()))
+            elif path == "/stream":
+                await self._stream(writer)
+            else:
+                await self._respond(writer, "404 Not Found", {"error": "try /snapshot or /stream"})
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.handlers.discard(task)
+            writer.close()
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _stream(self, writer):
+        client = Client(writer, self.queue_size)
+        self.clients.add(client)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                         b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+            writer.write(sse("snapshot", snapshot_dict(self.bus.latest())))
+            await writer.drain()
+            while True:
+                try:
+                    data = await asyncio.wait_for(client.queue.get(), 15)
+                except asyncio.TimeoutError:
+                    data = b": keepalive\n\n"
+                if data is None:
+                    break
+                if client.dropped:
+                    writer.write(sse("overflow", {"dropped": client.dropped}))
+                    client.dropped = 0
+                writer.write(data)
+                await writer.drain()
+        finally:
+            self.clients.discard(client)
+
+SERVER = None
+
+def start_api():
+    """Starts the API configured by api_host/api_port/api_socket."""
+    global SERVER
+    if SERVER is None:
+        SERVER = ApiServer(CONFIG.get("api_host", "127.0.0.1"), CONFIG.get("api_port", 8765),
+                           CONFIG.get("api_socket", ""), CONFIG.get("api_client_queue", 256)).start()
+    return SERVER
+
+def stop_api():
+    global SERVER
+    server, SERVER = SERVER, None
+    if server is not None:
+        server.stop()
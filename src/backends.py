@@ -0,0 +1,170 @@
+import subprocess
+import shutil
+import random
+from .config import CONFIG
+from .parsers import parse_termux, parse_nmcli, parse_iw, NMCLI_FIELDS
+
+# --- SCANNER BACKENDS ---
+# Each backend knows how to read raw scan output, either "active" (ask the
+# radio for a fresh sweep) or "passive" (return what the driver already has
+# cached), and how to turn that output into network tuples:
+#   (ssid, bssid, signal_percent, band, encryption)
+
+BACKENDS = {}
+
+def register_backend(cls):
+    """Class decorator: makes a backend selectable by its `name`."""
+    BACKENDS[cls.name] = cls
+    return cls
+
+class ScanBackend:
+    name = None
+    # Lower runs first when CONFIG["scan_backend"] is "auto" (but see select_backend)
+    priority = 100
+
+    def available(self):
+        return False
+
+    def read(self, active=True):
+        """Returns raw scan output, or None on failure (a failed read is no data, not an empty scan)."""
+        return None
+
+    def parse(self, out):
+        """Yields (ssid, bssid, signal_percent, band, encryption) from read() output."""
+        return iter(())
+
+    def _run(self, cmd, active=False):
+        # A radio sweep takes seconds; cached reads should come back at once
+        timeout = CONFIG.get("scan_timeout_active", 10) if active else CONFIG.get("scan_timeout", 2)
+        try:
+            return subprocess.check_output(cmd, timeout=timeout,
+                                           stderr=subprocess.DEVNULL).decode(errors="replace")
+        except:
+            return None
+
+@register_backend
+class TermuxBackend(ScanBackend):
+    """termux-wifi-scaninfo. Android decides when to sweep, so active and passive are the same read."""
+
+    name = "termux"
+    priority = 10
+
+    def available(self):
+        return shutil.which("termux-wifi-scaninfo") is not None
+
+    def read(self, active=True):
+        return self._run(["termux-wifi-scaninfo"])
+
+    def parse(self, out):
+        return parse_termux(out)
+
+@register_backend
+class NmcliBackend(ScanBackend):
+    """NetworkManager. Passive reads list NM's cached results with --rescan no."""
+
+    name = "nmcli"
+    priority = 20
+
+    def available(self):
+        return shutil.which("nmcli") is not None
+
+    def read(self, active=True):
+        return self._run(["nmcli", "-t", "-e", "yes", "-f", NMCLI_FIELDS, "device", "wifi", "list",
+                          "--rescan", "yes" if active else "no"], active)
+
+    def parse(self, out):
+        return parse_nmcli(out)
+
+@register_backend
+class IwBackend(ScanBackend):
+    """
+    iw (nl80211). Passive reads use `iw dev <if> scan dump`, which returns the
+    kernel's cached BSS list without touching the radio; active reads run a
+    full `scan` (root required), falling back to the dump when that fails.
+    """
+
+    name = "iw"
+    priority = 30
+
+    def __init__(self):
+        self.interface = CONFIG.get("scan_interface") or None
+
+    def available(self):
+        if not shutil.which("iw"):
+            return False
+        if not self.interface:
+            self.interface = self._detect_interface()
+        return self.interface is not None
+
+    def _detect_interface(self):
+        out = self._run(["iw", "dev"])
+        for line in (out or "").splitlines():
+            line = line.strip()
+            if line.startswith("Interface "):
+                return line.split(None, 1)[1]
+        return None
+
+    def read(self, active=True):
+        if active:
+            out = self._run(["iw", "dev", self.interface, "scan"], active)
+            if out is not None:
+                return out
+        return self._run(["iw", "dev", self.interface, "scan", "dump"])
+
+    def parse(self, out):
+        return parse_iw(out)
+
+@register_backend
+class DemoBackend(ScanBackend):
+    """Synthetic networks for demos and for machines without a usable radio."""
+
+    name = "demo"
+    priority = 1000
+
+    def available(self):
+        return True
+
+    def read(self, active=True):
+        return "demo"
+
+    def parse(self, out):
+        for n in random.sample(range(100, 110), 5):
+            yield f"DEMO_{n}", f"02:00:00:00:00:{n - 100:02X}", random.randint(20,90), "2.4", "WPA"
+
+def select_backend(name=None):
+    """
+    Returns a backend instance for `name`, or the first available one for "auto".
+    "auto" tries iw first when scan_interface is set (only iw can pick the
+    radio), then the others by priority.
+    """
+    name = name or CONFIG.get("scan_backend", "auto")
+    if CONFIG.get("demo_mode", False):
+        name = "demo"
+    elif name == "auto" and CONFIG.get("scan_interface"):
+        name = "iw"
+    if name != "auto" and name in BACKENDS:
+        backend = BACKENDS[name]()
+        if backend.available():
+            return backend
+    for cls in sorted(BACKENDS.values(), key=lambda c: c.priority):
+        backend = cls()
+        if backend.available():
+            return backend
+    return DemoBackend()
+
+class RescanPolicy:
+    """Active sweep every `every` cycles (1 = always) or when requested; cached reads otherwise."""
+
+    def __init__(self, every=1):
+        self.every = max(1, int(every))
+        self.cycle = 0
+        self.forced = False
+
+    def request(self):
+        self.forced = True
+
+    def due(self):
+        due = self.forced or self.cycle % self.every == 0
+        self.cycle += 1
+        self.forced = False
+        return due
@@ -12,10 +12,65 @@ def load_config():
         return {
             "scan_interval": 2.0,
             "scan_timeout": 2,
+            "scan_timeout_active": 10,
+            "scan_backend": "auto",
+            "scan_interface": "",
+            "scan_adaptive": True,
+            "scan_interval_min": 1.0,
+            "scan_interval_max": 15.0,
+            "scan_fast_speed": 13.4,
+            "scan_churn_high": 0.3,
+            "battery_low": 20,
+            "battery_poll": 60.0,
+            "active_rescan_every": 5,
+            "scan_sources": [],
+            "node_listen": "",
+            "source_backlog": 10,
             "log_file": "logs/intercepts.csv",
             "gps_enabled": True,
+            "gps_source": "auto",
+            "gps_max_age": 10.0,
+            "gps_replay_file": "logs/gps.jsonl",
+            "gps_replay_speed": 1.0,
+            "gps_replay_interval": 1.0,
+            "replay_log_file": "logs/replay.db",
+            "replay_alert_log": "logs/replay_alerts.log",
             "ui_rotation_speed": 0.1,
-            "demo_mode": False
+            "ui_max_fps": 20,
+            "demo_mode": False,
+            "db_batch_size": 500,
+            "db_commit_interval": 5.0,
+            "db_queue_size": 256,
+            "db_max_mb": 500,
+            "retention_raw_hours": 72,
+            "retention_cell_deg": 0.01,
+            "retention_chunk": 5000,
+            "retention_interval": 60.0,
+            "retention_vacuum_pages": 256,
+            "analyze_min_cells": 4,
+            "analyze_min_days": 3,
+            "analyze_top": 25,
+            "analyze_chunk": 200000,
+            "watchlist_file": "logs/watchlist.json",
+            "watchlist_preload": False,
+            "kml_path": "logs/map.kmz",
+            "kml_incremental": False,
+            "kml_aggregate": False,
+            "kml_heat_cell": 0,
+            "target_expiry": 300,
+            "locate_max": 50000,
+            "mobility_backend": "auto",
+            "alert_sinks": ["tts", "log"],
+            "alert_log": "logs/alerts.log",
+            "alert_socket": "",
+            "alert_rearm": 600.0,
+            "alert_coalesce": 0.2,
+            "alert_queue": 64,
+            "alert_tts_timeout": 20.0,
+            "api_host": "127.0.0.1",
+            "api_port": 8765,
+            "api_socket": "",
+            "api_client_queue": 256
         }
 
 CONFIG = load_config()
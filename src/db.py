@@ -0,0 +1,554 @@
+import sqlite3
+import threading
+import queue
+import time
+import os
+from .config import CONFIG
+
+# --- SCHEMA ---
+# v1: single denormalized `intercepts` table (ISO timestamps, text on every row)
+# v2: `networks` (one row per BSSID) + compact `sightings` (epoch ints, fixed-point coords)
+# v3: `sightings_hourly` roll-ups for retention, auto_vacuum=INCREMENTAL
+# v4: estimated AP position on `networks` (est_lat/est_lon fixed-point, radius in m)
+# v5: BSSIDs upper-case (termux reports lower-case and was logged as-is before)
+SCHEMA_VERSION = 5
+
+# Sighting flags
+FLAG_MOBILE = 1
+FLAG_THREAT = 2
+FLAG_PACING = 4
+
+# Coordinates are stored as integer degrees * 1e7 (~1cm resolution)
+COORD_SCALE = 10000000
+
+SCHEMA_V2 = [
+    """CREATE TABLE IF NOT EXISTS networks
+       (id INTEGER PRIMARY KEY,
+        bssid TEXT NOT NULL UNIQUE,
+        ssid TEXT,
+        vendor TEXT,
+        freq TEXT,
+        encryption TEXT,
+        threat_label TEXT,
+        confidence TEXT,
+        first_seen INTEGER,
+        last_seen INTEGER)""",
+    """CREATE TABLE IF NOT EXISTS sightings
+       (id INTEGER PRIMARY KEY,
+        time INTEGER NOT NULL,
+        network_id INTEGER NOT NULL REFERENCES networks(id),
+        signal INTEGER,
+        lat INTEGER,
+        lon INTEGER,
+        flags INTEGER NOT NULL DEFAULT 0)""",
+    "CREATE INDEX IF NOT EXISTS idx_sightings_network_time ON sightings (network_id, time)",
+    "CREATE INDEX IF NOT EXISTS idx_sightings_time ON sightings (time)",
+]
+
+# Sightings older than the raw window are folded into one row per network,
+# hour (epoch // 3600) and geo cell. A cell is identified by its south-west
+# corner in fixed-point units; sightings without a fix go to NO_CELL.
+NO_CELL = -2147483648
+
+SCHEMA_V3 = [
+    """CREATE TABLE IF NOT EXISTS sightings_hourly
+       (network_id INTEGER NOT NULL REFERENCES networks(id),
+        hour INTEGER NOT NULL,
+        cell_lat INTEGER NOT NULL,
+        cell_lon INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        min_signal INTEGER,
+        max_signal INTEGER,
+        sum_signal INTEGER,
+        PRIMARY KEY (network_id, hour, cell_lat, cell_lon))""",
+    "CREATE INDEX IF NOT EXISTS idx_sightings_hourly_hour ON sightings_hourly (hour)",
+]
+
+SCHEMA_V4_COLUMNS = [
+    ("networks", "est_lat", "INTEGER"),
+    ("networks", "est_lon", "INTEGER"),
+    ("networks", "est_radius", "INTEGER"),
+    ("networks", "est_samples", "INTEGER"),
+]
+
+def _add_columns(conn, columns):
+    """ALTER TABLE ADD COLUMN for every (table, column, type) not there yet."""
+    existing = {}
+    for table, column, kind in columns:
+        if table not in existing:
+            existing[table] = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in existing[table]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+def to_fixed(deg):
+    """Degrees -> fixed-point integer (None stays None)."""
+    if deg is None:
+        return None
+    return int(round(deg * COORD_SCALE))
+
+def from_fixed(val):
+    """Fixed-point integer -> degrees (None stays None)."""
+    if val is None:
+        return None
+    return val / COORD_SCALE
+
+def db_path():
+    """Returns the configured database path, mapping legacy .csv names to .db."""
+    log_file = CONFIG.get("log_file", "logs/intercepts.csv")
+    if log_file.endswith(".csv"):
+        log_file = log_file.replace(".csv", ".db")
+        CONFIG["log_file"] = log_file
+    return log_file
+
+def _migrate_v1(conn):
+    """Moves rows from the legacy `intercepts` table into networks + sightings."""
+    epoch = "CAST(strftime('%s', timestamp, 'utc') AS INTEGER)"
+    conn.execute(f"""INSERT OR IGNORE INTO networks
+                     (bssid, ssid, vendor, freq, encryption, threat_label, confidence, last_seen)
+                     SELECT bssid, ssid, vendor, freq, encryption, threat_label, confidence, ts FROM
+                       (SELECT bssid, ssid, vendor, freq, encryption, threat_label, confidence,
+                               {epoch} AS ts, MAX(id)
+                        FROM intercepts WHERE bssid IS NOT NULL GROUP BY bssid)""")
+    conn.execute(f"""INSERT INTO sightings (time, network_id, signal, lat, lon, flags)
+                     SELECT {epoch}, n.id, i.signal,
+                            CAST(ROUND(i.lat * {COORD_SCALE}) AS INTEGER),
+                            CAST(ROUND(i.lon * {COORD_SCALE}) AS INTEGER),
+                            (CASE WHEN i.is_mobile = 'YES' THEN {FLAG_MOBILE} ELSE 0 END) |
+                            (CASE WHEN i.threat_label IS NOT NULL AND i.threat_label NOT IN ('', 'UNK') THEN {FLAG_THREAT} ELSE 0 END) |
+                            (CASE WHEN i.threat_label = '[PACING]' THEN {FLAG_PACING} ELSE 0 END)
+                     FROM intercepts i JOIN networks n ON n.bssid = i.bssid
+                     ORDER BY i.id""")
+    conn.execute("""UPDATE networks SET first_seen =
+                    (SELECT MIN(time) FROM sightings WHERE network_id = networks.id)""")
+    conn.execute("DROP TABLE intercepts")
+
+def _normalize_bssids(conn):
+    """
+    Upper-cases every BSSID. Rows that then collide (the same AP logged by
+    termux in lower case and by nmcli/iw in upper case) are merged into the
+    oldest one, sightings and roll-ups included.
+    """
+    if conn.execute("SELECT 1 FROM networks WHERE bssid != UPPER(bssid) LIMIT 1").fetchone() is None:
+        return
+    groups = conn.execute("SELECT GROUP_CONCAT(id) FROM networks GROUP BY UPPER(bssid) HAVING COUNT(*) > 1").fetchall()
+    for (ids,) in groups:
+        keep, *merged = sorted(int(i) for i in ids.split(","))
+        for old in merged:
+            conn.execute("UPDATE sightings SET network_id = ? WHERE network_id = ?", (keep, old))
+            conn.execute("""INSERT INTO sightings_hourly
+                            (network_id, hour, cell_lat, cell_lon, count, min_signal, max_signal, sum_signal)
+                            SELECT ?, hour, cell_lat, cell_lon, count, min_signal, max_signal, sum_signal
+                            FROM sightings_hourly WHERE network_id = ?
+                            ON CONFLICT(network_id, hour, cell_lat, cell_lon) DO UPDATE SET
+                              count = count + excluded.count,
+                              min_signal = MIN(min_signal, excluded.min_signal),
+                              max_signal = MAX(max_signal, excluded.max_signal),
+                              sum_signal = sum_signal + excluded.sum_signal""", (keep, old))
+            conn.execute("DELETE FROM sightings_hourly WHERE network_id = ?", (old,))
+            # Keep the better-founded position estimate and the full seen range
+            better = "COALESCE(o.est_samples, 0) > COALESCE(networks.est_samples, 0)"
+            conn.execute(f"""UPDATE networks SET
+                               first_seen = COALESCE(MIN(networks.first_seen, o.first_seen), networks.first_seen, o.first_seen),
+                               last_seen = COALESCE(MAX(networks.last_seen, o.last_seen), networks.last_seen, o.last_seen),
+                               est_lat = CASE WHEN {better} THEN o.est_lat ELSE networks.est_lat END,
+                               est_lon = CASE WHEN {better} THEN o.est_lon ELSE networks.est_lon END,
+                               est_radius = CASE WHEN {better} THEN o.est_radius ELSE networks.est_radius END,
+                               est_samples = CASE WHEN {better} THEN o.est_samples ELSE networks.est_samples END
+                             FROM (SELECT * FROM networks WHERE id = ?) AS o
+                             WHERE networks.id = ?""", (old, keep))
+            conn.execute("DELETE FROM networks WHERE id = ?", (old,))
+    conn.execute("UPDATE networks SET bssid = UPPER(bssid) WHERE bssid != UPPER(bssid)")
+
+def init_db(path=None):
+    """Creates or upgrades the logging database to the current schema version."""
+    path = path or db_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return path
+
+        if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            # New file: free pages can be handed back a few at a time from day one
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='intercepts'").fetchone()
+        with conn:
+            for stmt in SCHEMA_V2 + SCHEMA_V3:
+                conn.execute(stmt)
+            _add_columns(conn, SCHEMA_V4_COLUMNS)
+            if legacy:
+                _migrate_v1(conn)
+            _normalize_bssids(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        # Older files keep their auto_vacuum mode, and a migrated v1 file keeps the
+        # space of its old text-heavy table: both need a full VACUUM, which on a big
+        # log would block startup for minutes, so it is left to compact_db()
+    finally:
+        conn.close()
+    return path
+
+def compact_db(path=None):
+    """
+    Entry point for `main.py --vacuum`: switches a file created before v3 to
+    incremental auto_vacuum, so retention can hand freed pages back. Needs a
+    full VACUUM, which rewrites the whole file.
+    """
+    path = path or db_path()
+    if not os.path.exists(path):
+        print(f"No database at {path}")
+        return 1
+    conn = sqlite3.connect(path)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            print(f"{path} already uses incremental vacuum")
+            return 0
+        size = os.path.getsize(path)
+        print(f"Rewriting {path} ({size / 1e6:.1f} MB); this can take a while on a large log...")
+        started = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    print(f"Done in {time.perf_counter() - started:.1f}s, now {os.path.getsize(path) / 1e6:.1f} MB")
+    return 0
+
+# --- RETENTION ---
+# Runs on the writer's own connection, one small step at a time while the
+# writer is idle, so it never competes with logging for the write lock:
+#   1. roll raw sightings older than the raw window into sightings_hourly
+#   2. over the size cap, drop the oldest hour of roll-ups (or, with none
+#      left, the oldest raw sightings)
+#   3. hand free pages back to the filesystem with incremental_vacuum
+
+def _cell_sql(col, step):
+    """SQL for the south-west corner of `col`'s cell (floor, also for negatives)."""
+    return f"COALESCE({col} - (({col} % {step}) + {step}) % {step}, {NO_CELL})"
+
+class Retention:
+    def __init__(self, raw_hours=72, cell_deg=0.01, max_mb=0, chunk=5000, vacuum_pages=256):
+        self.raw_seconds = int(raw_hours * 3600)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.chunk = max(1, int(chunk))
+        self.vacuum_pages = max(1, int(vacuum_pages))
+        step = max(1, int(round(cell_deg * COORD_SCALE)))
+        self.rollup_sql = f"""INSERT INTO sightings_hourly
+                              (network_id, hour, cell_lat, cell_lon, count, min_signal, max_signal, sum_signal)
+                              SELECT network_id, time / 3600, {_cell_sql("lat", step)}, {_cell_sql("lon", step)},
+                                     COUNT(*), MIN(signal), MAX(signal), SUM(signal)
+                              FROM sightings WHERE time <= ?
+                              GROUP BY 1, 2, 3, 4
+                              ON CONFLICT(network_id, hour, cell_lat, cell_lon) DO UPDATE SET
+                                count = count + excluded.count,
+                                min_signal = MIN(min_signal, excluded.min_signal),
+                                max_signal = MAX(max_signal, excluded.max_signal),
+                                sum_signal = sum_signal + excluded.sum_signal"""
+        self.rows_rolled_up = 0
+        self.rows_evicted = 0
+        self.pages_vacuumed = 0
+        self.incremental = None # auto_vacuum=INCREMENTAL on the file, checked on first use
+
+    def _rollup(self, conn, now):
+        if self.raw_seconds <= 0:
+            return False
+        cutoff = int(now) - self.raw_seconds
+        # Bound the step to ~chunk rows via the time index
+        row = conn.execute("SELECT time FROM sightings WHERE time < ? ORDER BY time LIMIT 1 OFFSET ?",
+                           (cutoff, self.chunk - 1)).fetchone()
+        upto = row[0] if row else cutoff - 1
+        conn.execute(self.rollup_sql, (upto,))
+        cur = conn.execute("DELETE FROM sightings WHERE time <= ?", (upto,))
+        conn.commit()
+        self.rows_rolled_up += cur.rowcount
+        return row is not None
+
+    def used_bytes(self, conn):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def _evict(self, conn):
+        if self.max_bytes <= 0 or self.used_bytes(conn) <= self.max_bytes:
+            return False
+        cur = conn.execute("DELETE FROM sightings_hourly WHERE hour = (SELECT MIN(hour) FROM sightings_hourly)")
+        if cur.rowcount <= 0:
+            row = conn.execute("SELECT time FROM sightings ORDER BY time LIMIT 1 OFFSET ?",
+                               (self.chunk - 1,)).fetchone()
+            if row is None:
+                row = conn.execute("SELECT MAX(time) FROM sightings").fetchone()
+            cur = conn.execute("DELETE FROM sightings WHERE time <= ?", (row[0],))
+        conn.commit()
+        self.rows_evicted += max(0, cur.rowcount)
+        return cur.rowcount > 0
+
+    def _vacuum(self, conn):
+        if self.incremental is None:
+            self.incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        if not self.incremental:
+            return False # a pre-v3 file not converted with --vacuum; free pages get reused instead
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free == 0:
+            return False
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+        self.pages_vacuumed += min(free, self.vacuum_pages)
+        return True
+
+    def step(self, conn, now=None):
+        """Does one bounded unit of work. Returns True if there is more to do right away."""
+        now = now if now is not None else time.time()
+        return self._rollup(conn, now) or self._evict(conn) or self._vacuum(conn)
+
+def make_retention():
+    return Retention(raw_hours=CONFIG.get("retention_raw_hours", 72),
+                     cell_deg=CONFIG.get("retention_cell_deg", 0.01),
+                     max_mb=CONFIG.get("db_max_mb", 0),
+                     chunk=CONFIG.get("retention_chunk", 5000),
+                     vacuum_pages=CONFIG.get("retention_vacuum_pages", 256))
+
+# --- BACKGROUND LOG WRITER ---
+# The scan thread only builds rows and hands them over; a single writer
+# thread owns the long-lived connection and group-commits in batches.
+#
+# Row format: (time, bssid, ssid, vendor, freq, encryption, threat_label,
+#              confidence, signal, lat, lon, flags,
+#              est_lat, est_lon, est_radius, est_samples)
+# The est_* fields are None until the target has a position estimate. A
+# stored estimate is only replaced by one from more sightings, so a fresh
+# estimate (after a restart) does not overwrite a better one.
+
+_EST_BETTER = "COALESCE(excluded.est_samples, 0) > COALESCE(est_samples, 0)"
+
+UPSERT_NETWORK = f"""INSERT INTO networks
+                    (bssid, ssid, vendor, freq, encryption, threat_label, confidence, first_seen, last_seen,
+                     est_lat, est_lon, est_radius, est_samples)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(bssid) DO UPDATE SET
+                      ssid = excluded.ssid,
+                      freq = excluded.freq,
+                      encryption = excluded.encryption,
+                      threat_label = excluded.threat_label,
+                      confidence = excluded.confidence,
+                      last_seen = MAX(last_seen, excluded.last_seen),
+                      est_lat = CASE WHEN {_EST_BETTER} THEN excluded.est_lat ELSE est_lat END,
+                      est_lon = CASE WHEN {_EST_BETTER} THEN excluded.est_lon ELSE est_lon END,
+                      est_radius = CASE WHEN {_EST_BETTER} THEN excluded.est_radius ELSE est_radius END,
+                      est_samples = CASE WHEN {_EST_BETTER} THEN excluded.est_samples ELSE est_samples END"""
+
+INSERT_SIGHTING = "INSERT INTO sightings (time, network_id, signal, lat, lon, flags) VALUES (?, ?, ?, ?, ?, ?)"
+
+_STOP = object()
+
+class LogWriter(threading.Thread):
+    """Drains a bounded queue of row batches into SQLite with group commits."""
+
+    def __init__(self, db_path, batch_size=500, commit_interval=5.0, queue_size=256,
+                 retention=None, retention_interval=60.0):
+        super().__init__(name="civops-db-writer", daemon=True)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.last_error = None
+        self.network_ids = {}
+        self.retention = retention
+        self.retention_interval = retention_interval
+
+    def submit(self, rows):
+        """Queues a batch of rows. Never blocks the caller; drops the batch if the queue is full."""
+        if not rows:
+            return False
+        try:
+            self.queue.put_nowait(rows)
+            return True
+        except queue.Full:
+            self.rows_dropped += len(rows)
+            return False
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything queued so far has been committed."""
+        if not self.is_alive():
+            return False
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def write_now(self, rows):
+        """Commits `rows` on the calling thread, for when no writer thread may run."""
+        if not rows:
+            return False
+        conn = self._connect()
+        try:
+            self._commit(conn, rows)
+        finally:
+            conn.close()
+        return self.last_error is None
+
+    def stop(self, timeout=5.0):
+        """Commits pending rows, closes the connection and ends the thread."""
+        if not self.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.join(timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _resolve_ids(self, conn, bssids):
+        """Fills the bssid -> networks.id cache for any BSSIDs not seen before."""
+        for bssid in bssids:
+            if bssid not in self.network_ids:
+                row = conn.execute("SELECT id FROM networks WHERE bssid = ?", (bssid,)).fetchone()
+                if row:
+                    self.network_ids[bssid] = row[0]
+
+    def _commit(self, conn, pending):
+        try:
+            # One upsert per network per batch (latest row wins), not per sighting
+            latest = {}
+            for r in pending:
+                latest[r[1]] = r
+            conn.executemany(UPSERT_NETWORK,
+                             [(r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[0], r[0]) + tuple(r[12:16])
+                              for r in latest.values()])
+            self._resolve_ids(conn, latest)
+
+            ids = self.network_ids
+            conn.executemany(INSERT_SIGHTING,
+                             [(r[0], ids[r[1]], r[8], r[9], r[10], r[11]) for r in pending if r[1] in ids])
+            conn.commit()
+            self.rows_written += len(pending)
+        except Exception as e:
+            self.last_error = str(e)
+            self.rows_dropped += len(pending)
+            self.network_ids.clear() # may hold ids from the rolled-back batch
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+
+    def run(self):
+        conn = self._connect()
+        pending = []
+        last_commit = time.time()
+        running = True
+        next_retention = time.time() + 5.0 # let startup settle first
+
+        try:
+            while running:
+                wait = self.commit_interval - (time.time() - last_commit)
+                if self.retention is not None:
+                    wait = min(wait, next_retention - time.time())
+                waiters = []
+                try:
+                    item = self.queue.get(timeout=max(0.05, wait))
+                except queue.Empty:
+                    item = None
+
+                # Drain whatever else is already queued without blocking again
+                while item is not None:
+                    if item is _STOP:
+                        running = False
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        pending.extend(item)
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+
+                due = time.time() - last_commit >= self.commit_interval
+                if pending and (len(pending) >= self.batch_size or due or waiters or not running):
+                    self._commit(conn, pending)
+                    pending = []
+                    last_commit = time.time()
+                elif due:
+                    last_commit = time.time()
+
+                for w in waiters:
+                    w.set()
+
+                # Retention only ever gets the writer when nothing is waiting to be logged
+                if (self.retention is not None and running and not pending
+                        and time.time() >= next_retention and self.queue.empty()):
+                    try:
+                        more = self.retention.step(conn)
+                    except Exception as e:
+                        self.last_error = str(e)
+                        more = False
+                        try:
+                            conn.rollback()
+                        except Exception:
+                            pass
+                    next_retention = time.time() + (0.0 if more else self.retention_interval)
+        finally:
+            if pending:
+                self._commit(conn, pending)
+            conn.close()
+
+WRITER = None
+_WRITER_LOCK = threading.Lock()
+# Set by a final shutdown_writer(): no writer thread is started after it, so
+# a scan that finishes late cannot leave one running (and unflushed) at exit
+CLOSED = False
+
+def get_writer():
+    """Returns the shared writer thread, starting it on first use (None once closed)."""
+    global WRITER
+    with _WRITER_LOCK:
+        if CLOSED:
+            return None
+        if WRITER is None or not WRITER.is_alive():
+            WRITER = LogWriter(
+                db_path(),
+                batch_size=CONFIG.get("db_batch_size", 500),
+                commit_interval=CONFIG.get("db_commit_interval", 5.0),
+                queue_size=CONFIG.get("db_queue_size", 256),
+                retention=make_retention(),
+                retention_interval=CONFIG.get("retention_interval", 60.0),
+            )
+            WRITER.start()
+        return WRITER
+
+def submit_rows(rows):
+    """Queues rows for the writer thread; after shutdown_writer() commits them synchronously instead."""
+    writer = get_writer()
+    if writer is not None:
+        return writer.submit(rows)
+    return LogWriter(db_path()).write_now(rows)
+
+def flush_writer(timeout=5.0):
+    """Waits for queued rows to be committed, e.g. before an export reads the DB."""
+    writer = WRITER
+    if writer is not None:
+        return writer.flush(timeout)
+    return True
+
+def shutdown_writer(timeout=5.0, final=True):
+    """
+    Flushes and stops the shared writer. Safe to call if it never started.
+    With final=False the next get_writer() starts a new one (e.g. after
+    switching log_file); otherwise later rows are written synchronously.
+    """
+    global WRITER, CLOSED
+    with _WRITER_LOCK:
+        writer, WRITER = WRITER, None
+        CLOSED = CLOSED or final
+    if writer is not None:
+        writer.stop(timeout)
@@ -0,0 +1,266 @@
+import subprocess
+import threading
+import shutil
+import socket
+import json
+import time
+from collections import deque
+from .config import CONFIG
+
+# --- BACKGROUND GPS PROVIDERS ---
+# One long-running source per process keeps the latest fix in memory, so a
+# scan reads its position without spawning anything or waiting for a fix.
+
+# Callables invoked as listener(ts, lat, lon, speed) for every fix (e.g. the recorder)
+FIX_LISTENERS = []
+
+class GPSProvider(threading.Thread):
+    """Base provider: subclasses implement feed() and call publish() per fix."""
+
+    source = "none"
+
+    def __init__(self, history=64):
+        super().__init__(name=f"civops-gps-{self.source}", daemon=True)
+        self.fixes = deque(maxlen=history) # (timestamp, lat, lon, speed), newest last
+        self.stopping = threading.Event()
+        self.last_error = None
+
+    def publish(self, lat, lon, speed=0.0, ts=None):
+        if lat is None or lon is None:
+            return
+        fix = (ts if ts is not None else time.time(), lat, lon, speed or 0.0)
+        self.fixes.append(fix)
+        for listener in FIX_LISTENERS:
+            try:
+                listener(*fix)
+            except Exception:
+                pass
+
+    def latest(self):
+        """Returns (lat, lon, speed, age_seconds); all None/0.0 before the first fix."""
+        if not self.fixes:
+            return None, None, 0.0, None
+        ts, lat, lon, speed = self.fixes[-1]
+        return lat, lon, speed, time.time() - ts
+
+    def closest(self, ts, max_age=30.0):
+        """Returns (lat, lon, speed) of the fix nearest in time to `ts`."""
+        best = None
+        for fix in list(self.fixes):
+            if best is None or abs(fix[0] - ts) < abs(best[0] - ts):
+                best = fix
+        if best is None or abs(best[0] - ts) > max_age:
+            return None, None, 0.0
+        return best[1], best[2], best[3]
+
+    def run(self):
+        backoff = 1.0
+        while not self.stopping.is_set():
+            try:
+                self.feed()
+                backoff = 1.0
+            except Exception as e:
+                self.last_error = str(e)
+            # Source ended or failed: retry with a capped backoff
+            if self.stopping.wait(backoff):
+                break
+            backoff = min(backoff * 2, 30.0)
+
+    def feed(self):
+        self.stopping.wait()
+
+    def stop(self, timeout=2.0):
+        self.stopping.set()
+        if self.is_alive():
+            self.join(timeout)
+
+class TermuxGPSProvider(GPSProvider):
+    """
+    Keeps a single `termux-location -r updates` stream open. termux-location
+    takes no update interval (only -p and -r), so fixes arriving less than
+    `interval_ms` after the last one kept are dropped here.
+    """
+
+    source = "termux"
+
+    def __init__(self, provider="gps", interval_ms=1000):
+        super().__init__()
+        self.cmd = ["termux-location", "-p", provider, "-r", "updates"]
+        self.min_interval = interval_ms / 1000.0
+        self.proc = None
+
+    def feed(self):
+        self.proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        kept = None
+        try:
+            for obj in iter_json_objects(self.proc.stdout):
+                if self.stopping.is_set():
+                    break
+                now = time.monotonic()
+                if kept is not None and now - kept < self.min_interval:
+                    continue
+                kept = now
+                self.publish(obj.get("latitude"), obj.get("longitude"), obj.get("speed", 0.0))
+        finally:
+            self._kill()
+
+    def _kill(self):
+        proc, self.proc = self.proc, None
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def stop(self, timeout=2.0):
+        self.stopping.set()
+        self._kill()
+        super().stop(timeout)
+
+class GpsdProvider(GPSProvider):
+    """Reads TPV reports from a local gpsd in JSON watch mode."""
+
+    source = "gpsd"
+
+    def __init__(self, host="127.0.0.1", port=2947):
+        super().__init__()
+        self.address = (host, port)
+        self.sock = None
+
+    def feed(self):
+        self.sock = socket.create_connection(self.address, timeout=5)
+        try:
+            self.sock.sendall(b'?WATCH={"enable":true,"json":true}\n')
+            self.sock.settimeout(None)
+            for line in self.sock.makefile("r", encoding="utf-8", errors="replace"):
+                if self.stopping.is_set():
+                    break
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    continue
+                if msg.get("class") == "TPV" and msg.get("mode", 0) >= 2:
+                    self.publish(msg.get("lat"), msg.get("lon"), msg.get("speed", 0.0))
+        finally:
+            self._close()
+
+    def _close(self):
+        sock, self.sock = self.sock, None
+        if sock:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def stop(self, timeout=2.0):
+        self.stopping.set()
+        self._close()
+        super().stop(timeout)
+
+class ReplayGPSProvider(GPSProvider):
+    """
+    Replays fixes from a file of JSON objects (termux-location output, one
+    object per line or pretty-printed). A "time" field paces playback at
+    `speed` x real time; fixes without one (termux-location has none) are
+    spaced `interval` seconds apart, as is the wrap-around of a looped file.
+    Fixes are re-stamped with the current clock.
+    """
+
+    source = "replay"
+
+    def __init__(self, path, speed=1.0, loop=False, interval=1.0):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.interval = interval
+
+    def feed(self):
+        started = False
+        while not self.stopping.is_set():
+            prev = None
+            with open(self.path, "r", encoding="utf-8") as f:
+                for obj in iter_json_objects(f):
+                    ts = obj.get("time")
+                    if started:
+                        if prev is not None and ts is not None and ts > prev and self.speed > 0:
+                            delay = (ts - prev) / self.speed
+                        else:
+                            delay = self.interval
+                        if self.stopping.wait(delay):
+                            return
+                    started = True
+                    prev = ts
+                    self.publish(obj.get("latitude"), obj.get("longitude"), obj.get("speed", 0.0))
+            if not self.loop:
+                self.stopping.wait()
+
+def iter_json_objects(stream):
+    """Yields JSON objects from a text stream, whether one per line or pretty-printed."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    for line in stream:
+        buf += line
+        while True:
+            buf = buf.lstrip()
+            if not buf:
+                break
+            try:
+                obj, end = decoder.raw_decode(buf)
+            except ValueError:
+                break # incomplete, wait for more lines
+            buf = buf[end:]
+            if isinstance(obj, dict):
+                yield obj
+
+def _gpsd_available(host="127.0.0.1", port=2947):
+    try:
+        with socket.create_connection((host, port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+def make_provider():
+    """Picks a provider from CONFIG["gps_source"]: auto, termux, gpsd, replay or none."""
+    if not CONFIG.get("gps_enabled", False):
+        return None
+    source = CONFIG.get("gps_source", "auto")
+    if source == "replay":
+        return ReplayGPSProvider(CONFIG.get("gps_replay_file", "logs/gps.jsonl"),
+                                 speed=CONFIG.get("gps_replay_speed", 1.0), loop=True,
+                                 interval=CONFIG.get("gps_replay_interval", 1.0))
+    if source in ("auto", "termux") and shutil.which("termux-location"):
+        return TermuxGPSProvider()
+    if source == "gpsd" or (source == "auto" and _gpsd_available()):
+        return GpsdProvider()
+    return None
+
+PROVIDER = None
+_PROVIDER_LOCK = threading.Lock()
+
+def get_provider():
+    """Returns the shared provider, starting it on first use (an idle one if no source is available)."""
+    global PROVIDER
+    with _PROVIDER_LOCK:
+        if PROVIDER is None:
+            PROVIDER = make_provider() or GPSProvider()
+            PROVIDER.start()
+        return PROVIDER
+
+def set_provider(provider):
+    """Replaces the shared provider (e.g. with a replay), stopping the old one."""
+    global PROVIDER
+    with _PROVIDER_LOCK:
+        old, PROVIDER = PROVIDER, provider
+    if old is not None:
+        old.stop()
+    if provider is not None and not provider.is_alive():
+        provider.start()
+
+def stop_gps():
+    global PROVIDER
+    with _PROVIDER_LOCK:
+        provider, PROVIDER = PROVIDER, None
+    if provider is not None:
+        provider.stop()
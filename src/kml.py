@@ -1,18 +1,16 @@
 import sqlite3
+import math
 import os
+import io
+import json
+import zipfile
 from datetime import datetime
+from xml.sax.saxutils import escape
 from .config import CONFIG
+from .db import db_path as get_db_path, to_fixed, from_fixed, FLAG_MOBILE, FLAG_THREAT, NO_CELL
+from .locate import M_PER_DEG_LAT, M_PER_DEG_LON
 
-def export_kml(kml_path="logs/map.kml"):
-    """
-    Converts the intercepts SQLite DB to a Google Earth KML file.
-    """
-    db_path = CONFIG.get("log_file", "logs/civops.db").replace(".csv", ".db")
-    
-    if not os.path.exists(db_path):
-        return False, "Database not found"
-
-    kml_header = """<?xml version="1.0" encoding="UTF-8"?>
+KML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
 <kml xmlns="http://www.opengis.net/kml/2.2">
 <Document>
     <name>CivOps Intercepts</name>
@@ -34,6 +32,15 @@ def export_kml(kml_path="logs/map.kml"):
             </Icon>
         </IconStyle>
     </Style>
+    <Style id="uncertainty">
+        <LineStyle>
+            <color>a0ffffff</color>
+            <width>1</width>
+        </LineStyle>
+        <PolyStyle>
+            <color>20ffffff</color>
+        </PolyStyle>
+    </Style>
     <Style id="normal">
         <IconStyle>
             <color>ff00ff00</color>
@@ -44,38 +51,28 @@ def export_kml(kml_path="logs/map.kml"):
         </IconStyle>
     </Style>
 """
-    kml_footer = """</Document>
+
+# Heat layer cell fills, coolest to hottest (KML colors are aabbggrr)
+HEAT_COLORS = ["4000ff00", "6000ffff", "8000a5ff", "a00000ff", "c0ff00ff"]
+
+HEAT_STYLES = "".join(f"""    <Style id="heat{i}">
+        <LineStyle>
+            <width>0</width>
+        </LineStyle>
+        <PolyStyle>
+            <color>{color}</color>
+            <outline>0</outline>
+        </PolyStyle>
+    </Style>
+""" for i, color in enumerate(HEAT_COLORS))
+
+KML_FOOTER = """</Document>
 </kml>
 """
-    
-    placemarks = ""
-    
-    try:
-        conn = sqlite3.connect(db_path)
-        c = conn.cursor()
-        # id, timestamp, ssid, bssid, vendor, signal, freq, encryption, lat, lon, threat_label, confidence, is_mobile
-        c.execute("SELECT timestamp, ssid, bssid, vendor, signal, freq, lat, lon, threat_label, is_mobile FROM intercepts WHERE lat IS NOT NULL AND lon IS NOT NULL")
-        rows = c.fetchall()
-        conn.close()
-        
-        for row in rows:
-            ts, ssid, bssid, vendor, signal, freq, lat, lon, threat_label, is_mobile = row
-            
-            if not lat or not lon: continue
-            
-            style = "#normal"
-            desc = f"SSID: {ssid}\nBSSID: {bssid}\nVendor: {vendor}\nSignal: {signal}%\nFreq: {freq}\nTime: {ts}"
-            
-            if threat_label and threat_label != "UNK":
-                style = "#threat"
-                desc = f"THREAT: {threat_label}\n{desc}"
-            elif is_mobile == "YES":
-                style = "#mobile"
-                desc = f"MOBILE TARGET\n{desc}"
-            
-            placemarks += f"""
+
+PLACEMARK = """
     <Placemark>
-        <name>{ssid}</name>
+        <name>{name}</name>
         <description>{desc}</description>
         <styleUrl>{style}</styleUrl>
         <Point>
@@ -83,11 +80,268 @@ def export_kml(kml_path="logs/map.kml"):
         </Point>
     </Placemark>
 """
-        
-        with open(kml_path, 'w') as f:
-            f.write(kml_header + placemarks + kml_footer)
-            
-        return True, f"Exported {len(rows)} points to {kml_path}"
-        
+
+HEAT_CELL = """
+    <Placemark>
+        <name>{count}</name>
+        <description>Sightings: {count}\nAvg Signal: {avg}%</description>
+        <styleUrl>#heat{level}</styleUrl>
+        <Polygon>
+            <outerBoundaryIs>
+                <LinearRing>
+                    <coordinates>{w},{s},0 {e},{s},0 {e},{n},0 {w},{n},0 {w},{s},0</coordinates>
+                </LinearRing>
+            </outerBoundaryIs>
+        </Polygon>
+    </Placemark>
+"""
+
+# Uncertainty circle drawn under an estimated AP position
+UNCERTAINTY_RING = """
+    <Placemark>
+        <name>{name}</name>
+        <styleUrl>#uncertainty</styleUrl>
+        <Polygon>
+            <outerBoundaryIs>
+                <LinearRing>
+                    <coordinates>{ring}</coordinates>
+                </LinearRing>
+            </outerBoundaryIs>
+        </Polygon>
+    </Placemark>
+"""
+
+def _ring(lat, lon, radius_m, points=24):
+    """KML coordinates of a closed circle of `radius_m` metres around (lat, lon)."""
+    dlat = radius_m / M_PER_DEG_LAT
+    dlon = radius_m / (M_PER_DEG_LON * math.cos(math.radians(lat)))
+    coords = []
+    for i in range(points + 1):
+        a = 2 * math.pi * i / points
+        coords.append(f"{lon + dlon * math.cos(a):.7f},{lat + dlat * math.sin(a):.7f},0")
+    return " ".join(coords)
+
+# Sidecar file holding the last exported sightings.id per database and output
+# path: {db_path: {kml_path: id}}, so a replay DB and the live DB (whose ids
+# overlap) each keep their own watermark
+STATE_PATH = "logs/export_state.json"
+
+def _load_watermarks():
+    try:
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_watermarks(marks):
+    directory = os.path.dirname(STATE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(marks, f)
+    os.replace(tmp, STATE_PATH)
+
+def _open_output(path, zipped):
+    """Opens a text stream for `path`; zipped output gets a single doc.kml entry (KMZ)."""
+    if zipped:
+        zf = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        stream = io.TextIOWrapper(zf.open("doc.kml", "w"), encoding="utf-8")
+        return stream, zf
+    return open(path, "w", encoding="utf-8"), None
+
+def _increment_path(kml_path):
+    """map.kml -> map-20240101-120000.kml, so each incremental export is kept."""
+    base, ext = os.path.splitext(kml_path)
+    return f"{base}-{datetime.now().strftime('%Y%m%d-%H%M%S')}{ext}"
+
+def _write_sightings(f, c, since):
+    """
+    One placemark per logged sighting. Returns (count, last sightings.id).
+    Only raw sightings have a point each: rolled-up history is in the
+    aggregate and heat layers.
+    """
+    c.execute("""SELECT s.id, s.time, n.ssid, n.bssid, n.vendor, s.signal, n.freq, s.lat, s.lon, n.threat_label, s.flags
+                 FROM sightings s JOIN networks n ON n.id = s.network_id
+                 WHERE s.id > ? AND s.lat IS NOT NULL AND s.lon IS NOT NULL
+                 ORDER BY s.id""", (since,))
+
+    count = 0
+    last_id = since
+    # Rows go straight from the cursor to the file; nothing is accumulated
+    for row in c:
+        sid, ts, ssid, bssid, vendor, signal, freq, lat, lon, threat_label, flags = row
+        last_id = sid
+
+        if not lat or not lon: continue
+
+        style = "#normal"
+        desc = f"SSID: {ssid}\nBSSID: {bssid}\nVendor: {vendor}\nSignal: {signal}%\nFreq: {freq}\nTime: {datetime.fromtimestamp(ts).isoformat()}"
+
+        if flags & FLAG_THREAT:
+            style = "#threat"
+            desc = f"THREAT: {threat_label}\n{desc}"
+        elif flags & FLAG_MOBILE:
+            style = "#mobile"
+            desc = f"MOBILE TARGET\n{desc}"
+
+        f.write(PLACEMARK.format(name=escape(ssid or ""), desc=escape(desc), style=style,
+                                 lon=from_fixed(lon), lat=from_fixed(lat)))
+        count += 1
+    return count, last_id
+
+# Raw sightings plus the hourly roll-ups retention folds them into, as one
+# set of weighted observations: (network_id, lat, lon, first, last, count,
+# sum_signal, max_signal, flags). A roll-up sits at the centre of its cell;
+# it keeps no per-sighting flags, so threats come from the network's label.
+def _observations_sql():
+    half = max(1, to_fixed(CONFIG.get("retention_cell_deg", 0.01))) // 2
+    return f"""SELECT network_id, lat, lon, time AS first, time AS last, 1 AS n,
+                      signal AS sum_signal, signal AS max_signal, flags
+               FROM sightings
+               WHERE lat IS NOT NULL AND lon IS NOT NULL
+               UNION ALL
+               SELECT h.network_id, h.cell_lat + {half}, h.cell_lon + {half}, h.hour * 3600, h.hour * 3600 + 3599,
+                      h.count, h.sum_signal, h.max_signal,
+                      CASE WHEN nn.threat_label IS NOT NULL AND nn.threat_label NOT IN ('', 'UNK')
+                           THEN {FLAG_THREAT} ELSE 0 END
+               FROM sightings_hourly h JOIN networks nn ON nn.id = h.network_id
+               WHERE h.cell_lat != {NO_CELL} AND h.cell_lon != {NO_CELL}"""
+
+def _write_networks(f, c):
+    """
+    One placemark per BSSID: at its estimated AP position (with the
+    uncertainty circle) when the scanner stored one, else at the
+    signal-weighted centroid of its sightings and roll-ups, grouped in SQL.
+    """
+    # +1 keeps 0% sightings from zeroing the weight sum
+    c.execute(f"""SELECT n.ssid, n.bssid, n.vendor, n.freq, n.threat_label,
+                         SUM((o.sum_signal + o.n) * o.lat) * 1.0 / SUM(o.sum_signal + o.n),
+                         SUM((o.sum_signal + o.n) * o.lon) * 1.0 / SUM(o.sum_signal + o.n),
+                         MIN(o.first), MAX(o.last), MAX(o.max_signal), SUM(o.n),
+                         MAX(o.flags & {FLAG_THREAT}), MAX(o.flags & {FLAG_MOBILE}),
+                         n.est_lat, n.est_lon, n.est_radius, n.est_samples
+                  FROM ({_observations_sql()}) o JOIN networks n ON n.id = o.network_id
+                  GROUP BY o.network_id""")
+
+    count = 0
+    for row in c:
+        (ssid, bssid, vendor, freq, threat_label, lat, lon, first, last, max_sig, seen, threat, mobile,
+         est_lat, est_lon, est_radius, est_samples) = row
+
+        style = "#normal"
+        desc = (f"SSID: {ssid}\nBSSID: {bssid}\nVendor: {vendor}\nFreq: {freq}\n"
+                f"Max Signal: {max_sig}%\nSightings: {seen}\n"
+                f"First Seen: {datetime.fromtimestamp(first).isoformat()}\n"
+                f"Last Seen: {datetime.fromtimestamp(last).isoformat()}")
+
+        if threat:
+            style = "#threat"
+            desc = f"THREAT: {threat_label}\n{desc}"
+        elif mobile:
+            style = "#mobile"
+            desc = f"MOBILE TARGET\n{desc}"
+
+        lat, lon = from_fixed(lat), from_fixed(lon)
+        if est_lat is not None and est_lon is not None:
+            lat, lon = from_fixed(est_lat), from_fixed(est_lon)
+            desc = f"{desc}\nEstimated AP position: +/-{est_radius}m from {est_samples} fixes"
+            f.write(UNCERTAINTY_RING.format(name=escape(f"{ssid or ''} +/-{est_radius}m"),
+                                            ring=_ring(lat, lon, est_radius or 0)))
+        f.write(PLACEMARK.format(name=escape(ssid or ""), desc=escape(desc), style=style, lon=lon, lat=lat))
+        count += 1
+    return count
+
+def _write_heat(f, c, cell_deg):
+    """Gridded sighting-density layer (raw sightings and roll-ups) with `cell_deg` sized square cells."""
+    cell = max(1, to_fixed(cell_deg))
+    # Offsets keep the integer division flooring the same way on both sides of 0
+    c.execute(f"""SELECT (o.lat + 900000000) / {cell} AS gy, (o.lon + 1800000000) / {cell} AS gx,
+                         SUM(o.n), SUM(o.sum_signal) * 1.0 / SUM(o.n)
+                  FROM ({_observations_sql()}) o
+                  GROUP BY gy, gx""")
+    cells = c.fetchall() # one row per occupied cell, far smaller than the sightings
+    if not cells:
+        return 0
+
+    peak = max(row[2] for row in cells)
+    f.write("    <Folder>\n        <name>Heat</name>\n")
+    for gy, gx, seen, avg in cells:
+        south = from_fixed(gy * cell - 900000000)
+        west = from_fixed(gx * cell - 1800000000)
+        level = min(len(HEAT_COLORS) - 1, int(seen * len(HEAT_COLORS) / (peak + 1)))
+        f.write(HEAT_CELL.format(count=seen, avg=int(avg or 0), level=level,
+                                 s=south, n=south + cell_deg, w=west, e=west + cell_deg))
+    f.write("    </Folder>\n")
+    return len(cells)
+
+def export_kml(kml_path="logs/map.kml", incremental=False, aggregate=False, heat_cell=None):
+    """
+    Streams the sightings DB into a Google Earth KML (or zipped .kmz) file.
+    With incremental=True only rows logged since the previous incremental
+    export of the same path from the same database are written, to a new
+    timestamped file next to `kml_path`, which itself is left untouched.
+    With aggregate=True each BSSID gets a single placemark instead (always a
+    full export), and heat_cell (degrees) adds a gridded density layer.
+    """
+    db_path = get_db_path()
+
+    if not os.path.exists(db_path):
+        return False, "Database not found"
+
+    incremental = incremental and not aggregate
+    marks = _load_watermarks() if incremental else {}
+    db_key = os.path.abspath(db_path)
+    db_marks = marks.get(db_key)
+    if not isinstance(db_marks, dict):
+        db_marks = {}
+    since = db_marks.get(kml_path, 0)
+    out_path = _increment_path(kml_path) if incremental else kml_path
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = out_path + ".tmp"
+
+    count = 0
+    last_id = since
+
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            c = conn.cursor()
+            f, zf = _open_output(tmp_path, out_path.endswith(".kmz"))
+            try:
+                f.write(KML_HEADER)
+                if heat_cell:
+                    f.write(HEAT_STYLES)
+                if aggregate:
+                    count = _write_networks(f, c)
+                else:
+                    count, last_id = _write_sightings(f, c, since)
+                if heat_cell:
+                    _write_heat(f, c, heat_cell)
+                f.write(KML_FOOTER)
+            finally:
+                f.close()
+                if zf is not None:
+                    zf.close()
+        finally:
+            conn.close()
+
+        if incremental and count == 0:
+            os.remove(tmp_path)
+            return True, "No new points since last export"
+
+        os.replace(tmp_path, out_path)
+        if incremental:
+            db_marks[kml_path] = last_id
+            marks[db_key] = db_marks
+            _save_watermarks(marks)
+
+        unit = "networks" if aggregate else "points"
+        return True, f"Exported {count} {unit} to {out_path}"
+
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return False, str(e)
@@ -0,0 +1,131 @@
+import math
+from collections import namedtuple
+
+# --- INCREMENTAL AP POSITION ESTIMATE ---
+# Every GPS-tagged sighting of a fixed AP gives an observer position p_i and
+# a range r_i from the path-loss model (calculate_distance). Two estimates
+# are kept as running sums, so a sighting costs O(1) and nothing is re-read:
+#
+#   centroid       observer positions weighted by 1/r^2 (near sightings
+#                  count most); radius = weighted RMS range
+#   least squares  |x - p_i|^2 = r_i^2 is linear in (x, y, |x|^2):
+#                  -2 p_i . x + |x|^2 = r_i^2 - |p_i|^2
+#                  the 3x3 normal equations are accumulated with the same
+#                  1/r^2 weights and solved on demand; the radius is twice
+#                  the standard error from the fit's residual and covariance.
+#
+# The one with the smaller radius wins. Driving in a straight line leaves the
+# least-squares fit mirror-ambiguous, its covariance blows up, and the
+# centroid is used until the AP has been seen from more than one side.
+# Positions are metres east/north of the first sighting.
+
+APPosition = namedtuple("APPosition", ["lat", "lon", "radius", "samples"])
+
+MIN_SAMPLES = 3     # before anything is reported
+MIN_LSQ_SAMPLES = 6 # before the least-squares fit is trusted
+MIN_RADIUS = 5.0    # metres; RSSI ranging is never better than this
+M_PER_DEG_LAT = 110540.0
+M_PER_DEG_LON = 111320.0
+
+def offset_m(lat0, lon0, lat, lon):
+    """(east, north) metres from (lat0, lon0) to (lat, lon); flat-earth, fine over a few km."""
+    return ((lon - lon0) * M_PER_DEG_LON * math.cos(math.radians(lat0)),
+            (lat - lat0) * M_PER_DEG_LAT)
+
+def bearing_text(east, north):
+    points = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
+    return points[int((math.degrees(math.atan2(east, north)) + 22.5) % 360 // 45)]
+
+def radar_angle(lat, lon, ap):
+    """Screen angle of an estimated AP seen from (lat, lon): 0 = east, north up (curses y grows down)."""
+    east, north = offset_m(lat, lon, ap.lat, ap.lon)
+    return math.atan2(-north, east)
+
+def _solve3(m, v):
+    """Solves the symmetric 3x3 system m . x = v. Returns (x, inverse) or (None, None) if singular."""
+    (a, b, c), (_, d, e), (_, _, f) = m
+    c00 = d * f - e * e
+    c01 = c * e - b * f
+    c02 = b * e - c * d
+    det = a * c00 + b * c01 + c * c02
+    if abs(det) <= 1e-12 * abs(a * d * f):
+        return None, None
+    c11 = a * f - c * c
+    c12 = b * c - a * e
+    c22 = a * d - b * b
+    inv = ((c00 / det, c01 / det, c02 / det),
+           (c01 / det, c11 / det, c12 / det),
+           (c02 / det, c12 / det, c22 / det))
+    x = tuple(inv[i][0] * v[0] + inv[i][1] * v[1] + inv[i][2] * v[2] for i in range(3))
+    return x, inv
+
+class APEstimator:
+    """Running sums for one BSSID; update() is O(1), position() solves a 3x3 at most."""
+
+    __slots__ = ("lat0", "lon0", "n", "cw", "cx", "cy", "cr2",
+                 "m00", "m01", "m02", "m11", "m12", "m22", "v0", "v1", "v2", "bb", "cached")
+
+    def __init__(self, lat, lon):
+        self.lat0 = lat
+        self.lon0 = lon
+        self.n = 0
+        self.cw = self.cx = self.cy = self.cr2 = 0.0
+        self.m00 = self.m01 = self.m02 = self.m11 = self.m12 = self.m22 = 0.0
+        self.v0 = self.v1 = self.v2 = self.bb = 0.0
+        self.cached = None
+
+    def update(self, lat, lon, range_m):
+        x, y = offset_m(self.lat0, self.lon0, lat, lon)
+        r = max(1.0, range_m)
+        r2 = r * r
+        self.n += 1
+
+        w = 1.0 / r2
+        self.cw += w
+        self.cx += w * x
+        self.cy += w * y
+        self.cr2 += w * r2
+
+        # Row a = (-2x, -2y, 1), b = r^2 - x^2 - y^2
+        ax, ay = -2.0 * x, -2.0 * y
+        b = r2 - x * x - y * y
+        self.m00 += w * ax * ax
+        self.m01 += w * ax * ay
+        self.m02 += w * ax
+        self.m11 += w * ay * ay
+        self.m12 += w * ay
+        self.m22 += w
+        self.v0 += w * ax * b
+        self.v1 += w * ay * b
+        self.v2 += w * b
+        self.bb += w * b * b
+        self.cached = None
+
+    def _least_squares(self):
+        m = ((self.m00, self.m01, self.m02), (self.m01, self.m11, self.m12), (self.m02, self.m12, self.m22))
+        v = (self.v0, self.v1, self.v2)
+        sol, inv = _solve3(m, v)
+        if sol is None:
+            return None
+        ssr = max(0.0, self.bb - (sol[0] * v[0] + sol[1] * v[1] + sol[2] * v[2]))
+        scale = ssr / (self.n - 3)
+        var = scale * (inv[0][0] + inv[1][1])
+        if not var >= 0.0:
+            return None
+        return sol[0], sol[1], 2.0 * math.sqrt(var)
+
+    def position(self):
+        """APPosition, or None with fewer than MIN_SAMPLES sightings."""
+        if self.n < MIN_SAMPLES:
+            return None
+        if self.cached is None:
+            x, y = self.cx / self.cw, self.cy / self.cw
+            radius = math.sqrt(self.cr2 / self.cw)
+            if self.n >= MIN_LSQ_SAMPLES:
+                fit = self._least_squares()
+                if fit is not None and fit[2] < radius:
+                    x, y, radius = fit
+            lat = self.lat0 + y / M_PER_DEG_LAT
+            lon = self.lon0 + x / (M_PER_DEG_LON * math.cos(math.radians(self.lat0)))
+            self.cached = APPosition(lat, lon, max(MIN_RADIUS, radius), self.n)
+        return self.cached
@@ -0,0 +1,273 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- RING-BUFFER HISTORY ---
+# One fixed-size window per BSSID. Statistics are kept as running totals that
+# are updated on every push/evict, so analysis costs O(1) per target per scan.
+
+class MobilityWindow:
+    """Last `size` (time, signal, lat) samples with windowed mean/variance."""
+
+    __slots__ = ("size", "times", "signals", "lats", "has_lat", "head", "count",
+                 "sig_sum", "sig_sq", "lat_n", "lat_mean", "lat_m2", "evictions")
+
+    def __init__(self, size):
+        self.size = size
+        self.times = array("d", bytes(8 * size))
+        self.signals = array("q", bytes(8 * size))
+        self.lats = array("d", bytes(8 * size))
+        self.has_lat = bytearray(size)
+        self.head = 0 # next slot to write
+        self.count = 0
+
+        # Signals are integers: exact running sums give the same variance as
+        # statistics.variance, bit for bit.
+        self.sig_sum = 0
+        self.sig_sq = 0
+
+        # Latitudes are floats: Welford with removal
+        self.lat_n = 0
+        self.lat_mean = 0.0
+        self.lat_m2 = 0.0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.count
+
+    def _lat_add(self, x):
+        self.lat_n += 1
+        delta = x - self.lat_mean
+        self.lat_mean += delta / self.lat_n
+        self.lat_m2 += delta * (x - self.lat_mean)
+
+    def _lat_remove(self, x):
+        if self.lat_n <= 1:
+            self.lat_n = 0
+            self.lat_mean = 0.0
+            self.lat_m2 = 0.0
+            return
+        self.lat_n -= 1
+        old_mean = self.lat_mean
+        self.lat_mean -= (x - old_mean) / self.lat_n
+        self.lat_m2 -= (x - old_mean) * (x - self.lat_mean)
+        if self.lat_m2 < 0.0:
+            self.lat_m2 = 0.0
+
+    def _lat_reseed(self):
+        """Recomputes the Welford state from the buffer to shed accumulated rounding."""
+        self.lat_n = 0
+        self.lat_mean = 0.0
+        self.lat_m2 = 0.0
+        start = (self.head - self.count) % self.size
+        for i in range(self.count):
+            slot = (start + i) % self.size
+            if self.has_lat[slot]:
+                self._lat_add(self.lats[slot])
+
+    def push(self, t, signal, lat):
+        """Adds a sample, evicting the oldest one once the window is full."""
+        slot = self.head
+        if self.count == self.size:
+            old = self.signals[slot]
+            self.sig_sum -= old
+            self.sig_sq -= old * old
+            if self.has_lat[slot]:
+                self._lat_remove(self.lats[slot])
+            self.evictions += 1
+        else:
+            self.count += 1
+
+        signal = int(signal)
+        self.times[slot] = t
+        self.signals[slot] = signal
+        self.sig_sum += signal
+        self.sig_sq += signal * signal
+        if lat is None:
+            self.has_lat[slot] = 0
+        else:
+            self.has_lat[slot] = 1
+            self.lats[slot] = lat
+            self._lat_add(lat)
+
+        self.head = (slot + 1) % self.size
+
+        # Once per full turn of the ring: amortized O(1)
+        if self.evictions >= self.size:
+            self.evictions = 0
+            self._lat_reseed()
+
+    def oldest_time(self):
+        return self.times[(self.head - self.count) % self.size]
+
+    def signal_mean(self):
+        return self.sig_sum / self.count if self.count else 0
+
+    def signal_variance(self):
+        """Sample variance of the windowed signals (0 with fewer than 2 samples)."""
+        n = self.count
+        if n < 2:
+            return 0
+        return (n * self.sig_sq - self.sig_sum * self.sig_sum) / (n * (n - 1))
+
+    def lat_count(self):
+        return self.lat_n
+
+    def lat_variance(self):
+        """Sample variance of the windowed latitudes (0 with fewer than 2 fixes)."""
+        if self.lat_n < 2:
+            return 0
+        return self.lat_m2 / (self.lat_n - 1)
+
+# --- MOBILITY RULES ---
+# Written with & and | so the same expression works element-wise on NumPy
+# arrays and on plain Python numbers/bools.
+
+MIN_SAMPLES = 5 # ~10-15s of history before any verdict
+
+def mobility_rules(n, sig_variance, gps_variance, avg_signal, duration, my_speed):
+    """Returns (enough, moving, pacing)."""
+    enough = n >= MIN_SAMPLES
+    # Still + fluctuating signal, or moving + steady signal
+    moving = enough & (((gps_variance < 0.1) & (sig_variance > 20)) |
+                       ((gps_variance > 1.0) & (sig_variance < 10)))
+    # My Speed > 10mph (4.5 m/s) AND Target Signal > 60% AND Duration > 15s
+    pacing = enough & (my_speed > 4.5) & (avg_signal > 60) & (duration > 15)
+    return enough, moving, pacing
+
+# --- BATCH HISTORY ---
+# Both classes take a whole scan at once: analyze(targets, now, my_speed)
+# records one sample per target and returns (enough, moving, pacing)
+# sequences aligned with `targets`; forget(bssids) drops expired histories.
+
+class WindowHistory:
+    """Pure-Python fallback: one MobilityWindow per BSSID in `store`."""
+
+    def __init__(self, size, store=None):
+        self.size = size
+        self.windows = store if store is not None else {}
+
+    def analyze(self, targets, now, my_speed):
+        enough, moving, pacing = [], [], []
+        windows = self.windows
+        for t in targets:
+            w = windows.get(t.bssid)
+            if w is None:
+                w = windows[t.bssid] = MobilityWindow(self.size)
+            w.push(now, t.signal, t.lat)
+            gps_variance = w.lat_variance() * 100000 if w.lat_count() > 1 else 0 # Scale up for small deg changes
+            e, m, p = mobility_rules(len(w), w.signal_variance(), gps_variance,
+                                     w.signal_mean(), now - w.oldest_time(), my_speed)
+            enough.append(e)
+            moving.append(m)
+            pacing.append(p)
+        return enough, moving, pacing
+
+    def forget(self, bssids):
+        for bssid in bssids:
+            self.windows.pop(bssid, None)
+
+    def clear(self):
+        self.windows.clear()
+
+    def __len__(self):
+        return len(self.windows)
+
+class ArrayHistory:
+    """
+    Every BSSID's ring buffer is a row of shared (rows x size) arrays, with
+    NaN marking empty slots / missing fixes, so a scan's statistics are a
+    handful of whole-array operations. Rows of expired BSSIDs are reused.
+    """
+
+    def __init__(self, size, capacity=256):
+        self.size = size
+        self.rows = {} # bssid -> row
+        self.free = []
+        self.used = 0
+        self.capacity = 0
+        self.times = self.signals = self.lats = self.head = self.count = None
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        def grown(old, shape, fill, dtype):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+        matrix = (capacity, self.size)
+        self.times = grown(self.times, matrix, np.nan, np.float64)
+        self.signals = grown(self.signals, matrix, np.nan, np.float64)
+        self.lats = grown(self.lats, matrix, np.nan, np.float64)
+        self.head = grown(self.head, capacity, 0, np.intp)
+        self.count = grown(self.count, capacity, 0, np.intp)
+        self.capacity = capacity
+
+    def _row(self, bssid):
+        row = self.rows.get(bssid)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                if self.used == self.capacity:
+                    self._grow(self.capacity * 2)
+                row = self.used
+                self.used += 1
+            self.rows[bssid] = row
+        return row
+
+    def analyze(self, targets, now, my_speed):
+        k = len(targets)
+        idx = np.fromiter((self._row(t.bssid) for t in targets), dtype=np.intp, count=k)
+        signal = np.fromiter((t.signal for t in targets), dtype=np.float64, count=k)
+        lat = np.fromiter((np.nan if t.lat is None else t.lat for t in targets), dtype=np.float64, count=k)
+
+        # Push: one sample per row at its head slot
+        slot = self.head[idx]
+        self.times[idx, slot] = now
+        self.signals[idx, slot] = signal
+        self.lats[idx, slot] = lat
+        self.head[idx] = (slot + 1) % self.size
+        self.count[idx] = np.minimum(self.count[idx] + 1, self.size)
+
+        n = self.count[idx]
+        sig = self.signals[idx]
+        filled = ~np.isnan(sig)
+        avg_signal = np.where(filled, sig, 0.0).sum(axis=1) / n
+        sig_dev = np.where(filled, sig - avg_signal[:, None], 0.0)
+        sig_variance = np.where(n > 1, (sig_dev * sig_dev).sum(axis=1) / np.maximum(n - 1, 1), 0.0)
+
+        lats = self.lats[idx]
+        fixed = ~np.isnan(lats)
+        lat_n = fixed.sum(axis=1)
+        lat_mean = np.where(fixed, lats, 0.0).sum(axis=1) / np.maximum(lat_n, 1)
+        lat_dev = np.where(fixed, lats - lat_mean[:, None], 0.0)
+        gps_variance = np.where(lat_n > 1, (lat_dev * lat_dev).sum(axis=1) / np.maximum(lat_n - 1, 1), 0.0) * 100000
+
+        duration = now - np.where(filled, self.times[idx], np.inf).min(axis=1)
+        return mobility_rules(n, sig_variance, gps_variance, avg_signal, duration, my_speed)
+
+    def forget(self, bssids):
+        rows = [self.rows.pop(b) for b in bssids if b in self.rows]
+        if rows:
+            self.times[rows] = np.nan
+            self.signals[rows] = np.nan
+            self.lats[rows] = np.nan
+            self.head[rows] = 0
+            self.count[rows] = 0
+            self.free.extend(rows)
+
+    def clear(self):
+        self.forget(list(self.rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+def make_history(size, store=None, backend="auto"):
+    """ArrayHistory when NumPy is available (and not turned off), else WindowHistory."""
+    if np is not None and backend in ("auto", "numpy"):
+        return ArrayHistory(size)
+    return WindowHistory(size, store)
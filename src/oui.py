@@ -0,0 +1,107 @@
+import mmap
+import struct
+
+# --- COMPACT OUI INDEX ---
+# Sorted fixed-width records searched in place through mmap, so the full
+# IEEE registry (MA-L 24-bit, MA-M 28-bit, MA-S 36-bit) costs no parse time
+# and almost no resident memory.
+#
+# Layout (little endian):
+#   header  : magic (8s) | record count (I) | string table offset (I)
+#   records : key (Q) | string offset (I)     sorted by key
+#   strings : length (H) | utf-8 bytes        deduplicated vendor names
+#
+# key = (prefix left-aligned in 48 bits) << 8 | prefix length in bits
+
+MAGIC = b"CVOUI\x00\x01\x00"
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<QI")
+LENGTH = struct.Struct("<H")
+
+# Longest first, so the most specific assignment wins
+PREFIX_BITS = (36, 28, 24)
+
+def mac_to_int(mac):
+    """'AA:BB:CC:DD:EE:FF' (any separators, any case) -> (48-bit int, hex digits seen)."""
+    digits = "".join(ch for ch in mac if ch not in ":-. ")[:12]
+    if not digits:
+        return None, 0
+    try:
+        value = int(digits, 16)
+    except ValueError:
+        return None, 0
+    return value << (4 * (12 - len(digits))), len(digits)
+
+def make_key(prefix, bits):
+    """Key for a `bits`-long prefix given as a left-aligned 48-bit int."""
+    mask = ((1 << bits) - 1) << (48 - bits)
+    return ((prefix & mask) << 8) | bits
+
+def write_index(entries, path):
+    """
+    Writes `entries` ({(prefix48, bits): vendor}) as a sorted binary index.
+    Returns the number of records written.
+    """
+    strings = bytearray()
+    offsets = {}
+    records = []
+    for (prefix, bits), vendor in entries.items():
+        if vendor not in offsets:
+            raw = vendor.encode("utf-8")[:0xFFFF]
+            offsets[vendor] = len(strings)
+            strings += LENGTH.pack(len(raw)) + raw
+        records.append((make_key(prefix, bits), offsets[vendor]))
+    records.sort()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), HEADER.size + len(records) * RECORD.size))
+        for key, offset in records:
+            f.write(RECORD.pack(key, offset))
+        f.write(strings)
+    return len(records)
+
+class OUIIndex:
+    """Read-only view over an index file written by write_index()."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._strings = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: not an OUI index")
+
+    def _find(self, key):
+        lo, hi = 0, self.count
+        mm = self._mm
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k, offset = RECORD.unpack_from(mm, HEADER.size + mid * RECORD.size)
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                return offset
+        return None
+
+    def _string(self, offset):
+        pos = self._strings + offset
+        (length,) = LENGTH.unpack_from(self._mm, pos)
+        return self._mm[pos + LENGTH.size:pos + LENGTH.size + length].decode("utf-8", "replace")
+
+    def lookup(self, mac):
+        """Longest-prefix match of `mac` against the 36/28/24-bit blocks, or None."""
+        value, digits = mac_to_int(mac)
+        if value is None:
+            return None
+        for bits in PREFIX_BITS:
+            if bits > digits * 4:
+                continue
+            offset = self._find(make_key(value, bits))
+            if offset is not None:
+                return self._string(offset)
+        return None
+
+    def close(self):
+        self._mm.close()
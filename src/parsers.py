@@ -0,0 +1,121 @@
+import json
+import re
+
+# --- SCAN OUTPUT PARSERS ---
+# Every parser yields (ssid, bssid, signal_percent, band, encryption) tuples
+# in a single pass over the raw output.
+
+def normalize_rssi(dbm):
+    try:
+        val = int(dbm)
+        percentage = 2 * (val + 100)
+        return max(0, min(100, percentage))
+    except:
+        return 0
+
+def freq_to_band(freq_mhz):
+    band = "2.4G"
+    if freq_mhz > 5000: band = "5G"
+    if freq_mhz > 5925: band = "6G"
+    return band
+
+# --- nmcli -t -e yes ---
+# Terse mode separates fields with ":" and escapes ":" and "\" inside values
+# with a backslash, e.g. "Cafe\: Free:AA\:BB\:CC\:DD\:EE\:FF:72:2437 MHz:WPA2"
+
+NMCLI_FIELDS = "SSID,BSSID,SIGNAL,FREQ,SECURITY"
+
+# A field separator is a colon preceded by an even number of backslashes (none,
+# or escaped backslashes). The split keeps those pairs as separate items,
+# which belong to the field before the colon.
+_TERSE_SEP = re.compile(r"(?<!\\)((?:\\\\)*):")
+_TERSE_ESCAPE = re.compile(r"\\(.)")
+
+def _unescape(value):
+    if "\\\\" in value:
+        return _TERSE_ESCAPE.sub(r"\1", value)
+    return value.replace("\\:", ":") # the common case: only escaped colons (every BSSID)
+
+def split_terse(line):
+    """Splits one nmcli terse line on unescaped colons and unescapes the values."""
+    if "\\" not in line:
+        return line.split(":")
+    parts = _TERSE_SEP.split(line)
+    fields = [parts[i] + parts[i + 1] for i in range(0, len(parts) - 1, 2)] + [parts[-1]]
+    return [_unescape(v) if "\\" in v else v for v in fields]
+
+def _nmcli_freq(value):
+    """'2437 MHz' -> 2437 (0 if unparsable)."""
+    digits = value.split(" ", 1)[0]
+    return int(digits) if digits.isdigit() else 0
+
+def parse_nmcli(text):
+    """Parses `nmcli -t -e yes -f SSID,BSSID,SIGNAL,FREQ,SECURITY device wifi list` output."""
+    for line in text.splitlines():
+        if not line:
+            continue
+        fields = split_terse(line)
+        if len(fields) < 5:
+            continue
+        ssid, bssid, signal, freq, security = fields[0], fields[1], fields[2], fields[3], fields[4]
+        yield (ssid,
+               bssid.upper(),
+               int(signal) if signal.isdigit() else 0,
+               freq_to_band(_nmcli_freq(freq)),
+               security.strip() or "OPEN")
+
+# --- termux-wifi-scaninfo ---
+
+def parse_termux(text):
+    """Parses termux-wifi-scaninfo's JSON array of scan results."""
+    data = json.loads(text)
+    if not isinstance(data, list):
+        return
+    for net in data:
+        get = net.get
+        yield (get("ssid", ""),
+               get("bssid", "").upper(),
+               normalize_rssi(get("rssi", -100)),
+               freq_to_band(get("frequency_mhz", 0) or 0),
+               "UNK")
+
+# --- iw dev <if> scan [dump] ---
+
+_IW_BSS = re.compile(r"^BSS ([0-9a-fA-F:]{17})")
+
+def _iw_finish(bssid, ssid, signal, freq, enc):
+    return ssid, bssid, normalize_rssi(int(signal)), freq_to_band(freq), enc
+
+def parse_iw(text):
+    """Parses `iw dev <if> scan` / `scan dump` output, one BSS block at a time."""
+    bssid = None
+    for line in text.splitlines():
+        m = _IW_BSS.match(line)
+        if m:
+            if bssid:
+                yield _iw_finish(bssid, ssid, signal, freq, enc)
+            bssid, ssid, signal, freq, enc = m.group(1).upper(), "", -100.0, 0, "OPEN"
+            continue
+        if bssid is None:
+            continue
+        field = line.strip()
+        if field.startswith("SSID:"):
+            ssid = field[5:].strip()
+        elif field.startswith("signal:"):
+            try:
+                signal = float(field.split()[1])
+            except (IndexError, ValueError):
+                pass
+        elif field.startswith("freq:"):
+            try:
+                freq = int(float(field.split()[1]))
+            except (IndexError, ValueError):
+                pass
+        elif field.startswith("RSN:"):
+            enc = "WPA2"
+        elif field.startswith("WPA:") and enc != "WPA2":
+            enc = "WPA"
+        elif field.startswith("capability:") and "Privacy" in field and enc == "OPEN":
+            enc = "WEP"
+    if bssid:
+        yield _iw_finish(bssid, ssid, signal, freq, enc)
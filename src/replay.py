@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from . import scanner
+from . import gps
+from . import db
+from . import alerts
+from .config import CONFIG
+from .backends import BACKENDS
+
+# --- RECORD / REPLAY ---
+# Sessions are stored as JSON lines, one event per line:
+#   {"t": 1700000000.12, "k": "scan", "b": "nmcli", "a": true, "o": "<raw output>"}
+#   {"t": 1700000000.40, "k": "gps", "lat": 40.1, "lon": -75.2, "spd": 12.5}
+# Raw backend output is kept verbatim, so a replay exercises the parsers too.
+# A replay logs to its own database (replay_log_file), started fresh each
+# time, so recorded sightings never land in the live log a second time.
+# Alerts likewise go only to replay_alert_log (no sinks when it is empty),
+# so a replay never speaks or appends to the live alert_log.
+
+class Recorder:
+    """Appends scan and GPS events to a line-delimited session file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.events = 0
+
+    def _write(self, event):
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.f is None:
+                return
+            self.f.write(line)
+            self.events += 1
+
+    def scan(self, backend, active, out, ts):
+        self._write({"t": round(ts, 3), "k": "scan", "b": backend, "a": active, "o": out})
+
+    def fix(self, ts, lat, lon, speed):
+        self._write({"t": round(ts, 3), "k": "gps", "lat": lat, "lon": lon, "spd": speed})
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+def start_recording(path):
+    """Starts capturing every raw scan and GPS fix to `path`."""
+    recorder = Recorder(path)
+    scanner.RECORDER = recorder
+    gps.FIX_LISTENERS.append(recorder.fix)
+    return recorder
+
+def stop_recording():
+    recorder, scanner.RECORDER = scanner.RECORDER, None
+    if recorder is not None:
+        if recorder.fix in gps.FIX_LISTENERS:
+            gps.FIX_LISTENERS.remove(recorder.fix)
+        recorder.close()
+
+def use_replay_db(path):
+    """Points logging (and KML export) at a fresh database at `path` instead of the live log."""
+    if os.path.abspath(path) == os.path.abspath(db.db_path()):
+        raise ValueError(f"replay_log_file is the live log: {path}")
+    db.shutdown_writer(final=False)
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+    CONFIG["log_file"] = path
+    db.init_db(path)
+
+def use_replay_alerts(path):
+    """Sends alerts to a fresh log at `path` (no sinks if empty) instead of the live sinks."""
+    live = CONFIG.get("alert_log", "logs/alerts.log")
+    if path and os.path.abspath(path) == os.path.abspath(live):
+        raise ValueError(f"replay_alert_log is the live alert log: {path}")
+    alerts.stop_alerts() # the next raise_alert() starts a dispatcher with the replay sinks
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        CONFIG["alert_log"] = path
+        CONFIG["alert_sinks"] = ["log"]
+    else:
+        CONFIG["alert_sinks"] = []
+
+class ReplayFixes(gps.GPSProvider):
+    """Provider whose fixes are pushed by the replay, stamped with recorded times."""
+
+    source = "session"
+
+def iter_events(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+class ReplaySession:
+    """
+    Feeds a recorded session through scanner.process_scan(). speed=1 plays in
+    real time, speed=100 at 100x, speed=0 as fast as possible. All pipeline
+    timestamps come from the recording, so pacing/duration logic behaves as
+    it did on the road regardless of playback speed.
+    """
+
+    def __init__(self, path, speed=1.0, log_file=None, alert_log=None):
+        self.path = path
+        self.speed = speed
+        self.log_file = log_file or CONFIG.get("replay_log_file", "logs/replay.db")
+        self.alert_log = alert_log if alert_log is not None else CONFIG.get("replay_alert_log", "logs/replay_alerts.log")
+        self.scans = 0
+        self.networks = 0
+        self.elapsed = 0.0
+        self.recorded_span = 0.0
+
+    def run(self, publish=None):
+        """Replays the session. `publish(targets, filtered)` gets each scan's result; returning False stops early."""
+        use_replay_db(self.log_file)
+        use_replay_alerts(self.alert_log)
+        CONFIG["gps_enabled"] = True
+        fixes = ReplayFixes()
+        gps.set_provider(fixes)
+        backends = {}
+
+        first_t = prev_t = None
+        wall_start = time.perf_counter()
+        try:
+            for event in iter_events(self.path):
+                t = event.get("t")
+                if t is None:
+                    continue
+                if first_t is None:
+                    first_t = t
+                if prev_t is not None and self.speed > 0 and t > prev_t:
+                    time.sleep((t - prev_t) / self.speed)
+                prev_t = t
+
+                kind = event.get("k")
+                if kind == "gps":
+                    fixes.publish(event.get("lat"), event.get("lon"), event.get("spd", 0.0), ts=t)
+                elif kind == "scan":
+                    name = event.get("b")
+                    if name not in backends:
+                        if name not in BACKENDS:
+                            continue
+                        backends[name] = BACKENDS[name]()
+                    targets, filtered = scanner.process_scan(backends[name], event.get("o"), t)
+                    self.scans += 1
+                    self.networks += len(targets)
+                    if publish is not None and publish(targets, filtered) is False:
+                        break
+        finally:
+            self.elapsed = time.perf_counter() - wall_start
+            if first_t is not None:
+                self.recorded_span = prev_t - first_t
+
+    def summary(self):
+        rate = self.scans / self.elapsed if self.elapsed else 0.0
+        return (f"Replayed {self.scans} scans / {self.networks} sightings "
+                f"({self.recorded_span:.0f}s recorded) in {self.elapsed:.2f}s: {rate:.1f} scans/s")
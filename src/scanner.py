@@ -1,98 +1,57 @@
-import subprocess
-import json
-import random
 import math
-import shutil
 import time
-import sqlite3
 import os
-import statistics
-from datetime import datetime
+import zlib
+from collections import OrderedDict
 from .threats import classify_threat, resolve_vendor
 from .config import CONFIG
+from .gps import get_provider
+from .backends import select_backend, RescanPolicy
+from .parsers import normalize_rssi
+from .mobility import make_history
+from .db import submit_rows, init_db, to_fixed, FLAG_MOBILE, FLAG_THREAT, FLAG_PACING
+from .analyze import load_watchlist
+from .whitelist import Whitelist
+from .alerts import raise_alert, PRIORITY_PACING, PRIORITY_HIGH
+from .locate import APEstimator
 
 # --- HISTORY TRACKING FOR VELOCITY ---
-# format: {bssid: [(timestamp, signal, lat, lon), ...]}
-TARGET_HISTORY = {} 
+# The last HISTORY_MAX_LEN samples per BSSID: shared NumPy arrays when NumPy is
+# installed, otherwise {bssid: MobilityWindow} in TARGET_HISTORY
+TARGET_HISTORY = {}
 HISTORY_MAX_LEN = 20
+MOBILITY = make_history(HISTORY_MAX_LEN, TARGET_HISTORY, CONFIG.get("mobility_backend", "auto"))
 
-# --- TTS TRACKING ---
-ANNOUNCED_THREATS = set()
-LAST_ANNOUNCE_TIME = 0
-
-WHITELIST = {"ignore_ssids": [], "ignore_macs": []}
+WHITELIST = Whitelist()
 
 def load_whitelist():
-    """Loads the whitelist from config/whitelist.json."""
-    global WHITELIST
-    try:
-        whitelist_path = os.path.join(os.path.dirname(__file__), "..", "config", "whitelist.json")
-        if os.path.exists(whitelist_path):
-            with open(whitelist_path, "r") as f:
-                WHITELIST = json.load(f)
-    except Exception as e:
-        pass
+    """Picks up config/whitelist.json changes (a stat() per call; re-parsed only when it changed)."""
+    WHITELIST.refresh()
+
+# --- AP POSITION ESTIMATES ---
+# One APEstimator per BSSID, kept past target expiry so an AP that comes back
+# into range carries on from its earlier sightings instead of starting over.
+# Beyond locate_max, the estimates updated longest ago are dropped.
+ESTIMATORS = OrderedDict()
+
+# --- WATCHLIST (likely followers found by `main.py --analyze`) ---
+WATCHLIST = {}
+WATCHLIST_VERDICT = (True, "[FOLLOWER]", "MED")
+
+def preload_watchlist(path=None):
+    """Flags BSSIDs from a saved analysis as threats from the first sighting on."""
+    global WATCHLIST
+    WATCHLIST = load_watchlist(path or CONFIG.get("watchlist_file", "logs/watchlist.json"))
+    return len(WATCHLIST)
 
 def is_whitelisted(ssid, bssid):
     """Checks if a target is in the whitelist."""
-    if ssid in WHITELIST.get("ignore_ssids", []):
-        return True
-    if bssid in WHITELIST.get("ignore_macs", []):
-        return True
-    return False
-
-def init_db():
-    """Initializes the SQLite database for logging."""
-    # Ensure log_file points to a .db file
-    log_file = CONFIG.get("log_file", "logs/intercepts.csv")
-    if log_file.endswith(".csv"):
-        log_file = log_file.replace(".csv", ".db")
-        CONFIG["log_file"] = log_file
-    
-    db_path = log_file
-    directory = os.path.dirname(db_path)
-    if directory:
-        os.makedirs(directory, exist_ok=True)
-        
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS intercepts
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  ssid TEXT,
-                  bssid TEXT,
-                  vendor TEXT,
-                  signal INTEGER,
-                  freq TEXT,
-                  encryption TEXT,
-                  lat REAL,
-                  lon REAL,
-                  threat_label TEXT,
-                  confidence TEXT,
-                  is_mobile TEXT)''')
-    conn.commit()
-    conn.close()
+    return WHITELIST.match(ssid, bssid)
 
 # Initialize DB and Whitelist on import
 load_whitelist()
 init_db()
 
-def announce_threat(text):
-    """Announces a threat via TTS."""
-    global LAST_ANNOUNCE_TIME
-    now = time.time()
-    
-    # Don't overlap announcements too much
-    if now - LAST_ANNOUNCE_TIME < 3: 
-        return
-
-    if shutil.which("termux-tts-speak"):
-        try:
-            subprocess.Popen(["termux-tts-speak", text])
-            LAST_ANNOUNCE_TIME = now
-        except:
-            pass
-
 def calculate_distance(signal_strength, freq_str="2.4G"):
     """
     Log-Distance Path Loss Model
@@ -118,232 +77,277 @@ def calculate_distance(signal_strength, freq_str="2.4G"):
     except:
         return 0.0
 
+def blip_angle(bssid):
+    """Stable radar bearing for a BSSID, so a blip keeps its place across scans."""
+    return (zlib.crc32((bssid or "").encode()) / 4294967296.0) * 2 * math.pi
+
 class Target:
-    def __init__(self, ssid, bssid, signal, freq, encryption, lat=None, lon=None):
-        self.ssid = ssid or "HIDDEN"
+    __slots__ = ("ssid", "bssid", "signal", "freq", "encryption", "lat", "lon",
+                 "vendor", "classification", "dist_m", "is_threat", "threat_label", "confidence",
+                 "is_mobile", "is_pacing", "dist", "angle", "first_seen", "last_seen", "sources", "position")
+
+    def __init__(self, ssid, bssid, signal, freq, encryption, lat=None, lon=None, now=None):
         self.bssid = bssid
-        self.signal = int(signal)
-        self.freq = freq
         self.encryption = encryption
-        self.lat = lat
-        self.lon = lon
+        self.ssid = None
+        self.freq = None
+        self.signal = None
         
-        # Vendor Resolution
+        # Vendor Resolution (fixed per BSSID)
         self.vendor = resolve_vendor(bssid)
         
-        # Advanced Signal Math: Distance Estimation
-        self.dist_m = calculate_distance(self.signal, self.freq)
+        # Visuals (Stable position for radar blip)
+        self.angle = blip_angle(bssid)
+        self.first_seen = now if now is not None else time.time()
+        self.sources = () # ((source, signal, time), ...) when scans are aggregated
+        self.position = None # locate.APEstimator once seen with a GPS fix
+        self.update(ssid, signal, freq, lat, lon, now)
+
+    def update(self, ssid, signal, freq, lat=None, lon=None, now=None):
+        """Refreshes the per-scan fields in place; derived facts are recomputed only on change."""
+        ssid = ssid or "HIDDEN"
+        if ssid != self.ssid:
+            self.ssid = ssid
+            self.classification = classify_threat(self.ssid, self.bssid)
+            if not self.classification[0] and self.bssid in WATCHLIST:
+                self.classification = WATCHLIST_VERDICT
+        
+        signal = int(signal)
+        if signal != self.signal or freq != self.freq:
+            self.signal = signal
+            self.freq = freq
+            # Advanced Signal Math: Distance Estimation
+            self.dist_m = calculate_distance(self.signal, self.freq)
+            self.dist = max(0.1, 1.0 - (self.signal / 110.0))
+        
+        self.lat = lat
+        self.lon = lon
+        self.last_seen = now if now is not None else time.time()
         
-        self.is_threat, self.threat_label, self.confidence = classify_threat(self.ssid, self.bssid)
+        # Per-scan verdicts start from the cached classification
+        self.is_threat, self.threat_label, self.confidence = self.classification
         self.is_mobile = False # Will be updated by history analysis
         self.is_pacing = False
-        
-        # Visuals (Random start position for radar blip)
-        self.dist = max(0.1, 1.0 - (self.signal / 110.0))
-        self.angle = random.uniform(0, 2 * math.pi)
-        self.last_seen = 0
 
-def normalize_rssi(dbm):
-    try:
-        val = int(dbm)
-        percentage = 2 * (val + 100)
-        return max(0, min(100, percentage))
-    except:
-        return 0
+class TargetRegistry:
+    """Live Target objects keyed by BSSID, updated in place on every scan."""
+
+    def __init__(self):
+        self.targets = {}
+
+    def observe(self, ssid, bssid, signal, freq, encryption, lat=None, lon=None, now=None):
+        """Returns the Target for `bssid`, creating it on first sight."""
+        t = self.targets.get(bssid)
+        if t is None:
+            t = Target(ssid, bssid, signal, freq, encryption, lat, lon, now)
+            t.position = ESTIMATORS.get(bssid)
+            self.targets[bssid] = t
+        else:
+            t.encryption = encryption
+            t.update(ssid, signal, freq, lat, lon, now)
+        return t
+
+    def last_seen(self, bssid):
+        t = self.targets.get(bssid)
+        return t.last_seen if t else None
+
+    def expire(self, max_age, now=None):
+        """Drops targets (and their history) not seen for `max_age` seconds. Returns their BSSIDs."""
+        now = now if now is not None else time.time()
+        stale = [b for b, t in self.targets.items() if now - t.last_seen > max_age]
+        for bssid in stale:
+            del self.targets[bssid]
+        MOBILITY.forget(stale)
+        return stale
+
+    def __len__(self):
+        return len(self.targets)
+
+REGISTRY = TargetRegistry()
 
 def get_gps_location():
-    """Fetches GPS coordinates and speed via termux-location (Android) or returns None."""
+    """Returns the latest (lat, lon, speed) from the background GPS provider. Never blocks."""
     if not CONFIG.get("gps_enabled", False):
         return None, None, 0.0
     
-    if shutil.which("termux-location"):
-        try:
-            out = subprocess.check_output("termux-location", shell=True, timeout=3).decode()
-            data = json.loads(out)
-            return data.get("latitude"), data.get("longitude"), data.get("speed", 0.0)
-        except:
-            return None, None, 0.0
-    return None, None, 0.0
-
-def analyze_mobility(target, my_speed=0.0):
+    lat, lon, speed, age = get_provider().latest()
+    if age is None or age > CONFIG.get("gps_max_age", 10.0):
+        return None, None, 0.0
+    return lat, lon, speed
+
+def closest_fix(ts):
+    """Returns (lat, lon, speed) of the fix nearest in time to `ts`."""
+    if not CONFIG.get("gps_enabled", False):
+        return None, None, 0.0
+    return get_provider().closest(ts, CONFIG.get("gps_max_age", 10.0))
+
+def analyze_batch(targets, my_speed=0.0, now=None):
     """
-    Determines if a target is MOBILE or PACING based on signal/GPS variance.
-    Updates TARGET_HISTORY and sets target.is_mobile.
+    Determines which targets are MOBILE or PACING based on signal/GPS variance,
+    for a whole scan at once. Records the scan in MOBILITY and sets the flags.
     """
-    global TARGET_HISTORY, ANNOUNCED_THREATS
-    
-    now = time.time()
-    if target.bssid not in TARGET_HISTORY:
-        TARGET_HISTORY[target.bssid] = []
-    
-    # Add current point
-    history = TARGET_HISTORY[target.bssid]
-    history.append((now, target.signal, target.lat, target.lon))
-    
-    # Prune old history
-    if len(history) > HISTORY_MAX_LEN:
-        history.pop(0)
-    
-    # Need at least 5 points (~10-15s) to determine velocity
-    if len(history) < 5:
+    if not targets:
         return
-
-    # Extract series
-    signals = [x[1] for x in history]
-    lats = [x[2] for x in history if x[2] is not None]
-    
-    # Calculate Variance
-    sig_variance = statistics.variance(signals) if len(signals) > 1 else 0
-    
-    # GPS Variance (My movement)
-    gps_variance = 0
-    if len(lats) > 1:
-        gps_variance = statistics.variance(lats) * 100000 # Scale up for small deg changes
+    if now is None:
+        now = time.time()
+    enough, moving, pacing = MOBILITY.analyze(targets, now, my_speed)
     
-    # Mobility Logic
-    is_moving = False
-    if gps_variance < 0.1 and sig_variance > 20:
-        is_moving = True
-    elif gps_variance > 1.0 and sig_variance < 10:
-        is_moving = True
+    for t, has_history, is_moving, is_pacing in zip(targets, enough, moving, pacing):
+        # Need at least 5 points (~10-15s) to determine velocity
+        if not has_history:
+            continue
+        t.is_mobile = bool(is_moving)
         
-    target.is_mobile = is_moving
-    
-    # --- PACING DETECTION ---
-    # Logic: My Speed > 10mph (4.5 m/s) AND Target Signal > 60% AND Duration > 15s
-    # 15s check: First timestamp vs Now
-    duration = now - history[0][0]
-    avg_signal = sum(signals) / len(signals)
-    
-    if my_speed > 4.5 and avg_signal > 60 and duration > 15:
-        target.is_pacing = True
-        target.is_threat = True # Force threat status
-        target.threat_label = "[PACING]"
-        target.confidence = "HIGH"
-        
-        # Audio Alert for Pacing
-        if target.bssid not in ANNOUNCED_THREATS:
-            announce_threat("Alert. Pacing detected. Vehicle following.")
-            ANNOUNCED_THREATS.add(target.bssid)
-
-    # Audio Alert for High Confidence Threats
-    if target.is_threat and target.confidence == "HIGH" and target.bssid not in ANNOUNCED_THREATS:
-        clean_label = target.threat_label.replace("[", "").replace("]", "").replace(":", " ")
-        announce_threat(f"Caution: {clean_label} detected.")
-        ANNOUNCED_THREATS.add(target.bssid)
-
-def log_threats(targets):
-    """Logs detected threats to SQLite."""
-    db_path = CONFIG.get("log_file", "logs/intercepts.db")
-    
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    
+        # --- PACING DETECTION ---
+        if is_pacing:
+            t.is_pacing = True
+            t.is_threat = True # Force threat status
+            t.threat_label = "[PACING]"
+            t.confidence = "HIGH"
+            
+            # Alert for Pacing (queued; the dispatcher re-arms it after alert_rearm)
+            raise_alert("pacing", t.bssid, "Alert. Pacing detected. Vehicle following.", PRIORITY_PACING, now)
+
+        # Alert for High Confidence Threats
+        elif t.is_threat and t.confidence == "HIGH":
+            clean_label = t.threat_label.replace("[", "").replace("]", "").replace(":", " ")
+            raise_alert("threat", t.bssid, f"Caution: {clean_label} detected.", PRIORITY_HIGH, now)
+
+def locate_targets(targets):
+    """Feeds each fixed target's GPS-tagged range into its AP position estimate (O(1) per target)."""
+    limit = CONFIG.get("locate_max", 50000)
     for t in targets:
-        # Log threats, mobile targets, or everything if desired?
-        # Prompt says "visualize ALL intercepts", so let's log everything or at least threats/mobile.
-        # But heatmap usually implies mapping everything seen.
-        # Original code logged only threats/mobile.
-        # Let's log ALL for heatmap purposes, but maybe limit retention?
-        # For now, I'll log everything to support "visualize all intercepts".
-        
-        c.execute("INSERT INTO intercepts (timestamp, ssid, bssid, vendor, signal, freq, encryption, lat, lon, threat_label, confidence, is_mobile) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                  (datetime.now().isoformat(),
-                   t.ssid,
-                   t.bssid,
-                   t.vendor,
-                   t.signal,
-                   t.freq,
-                   t.encryption,
-                   t.lat,
-                   t.lon,
-                   t.threat_label,
-                   t.confidence,
-                   "YES" if t.is_mobile else "NO"))
-    conn.commit()
-    conn.close()
+        # Pacing scans are left out. is_mobile is not used: judged on latitude variance
+        # alone it also fires on fixed APs passed on an east-west road, and a
+        # transmitter that really moves ends up with a wide radius anyway. A 0% signal
+        # is clipped, so its range is only a lower bound
+        if t.is_pacing or t.lat is None or t.lon is None or t.signal <= 0 or t.dist_m <= 0:
+            continue
+        if t.position is None:
+            t.position = APEstimator(t.lat, t.lon)
+        t.position.update(t.lat, t.lon, t.dist_m)
+        ESTIMATORS[t.bssid] = t.position
+        ESTIMATORS.move_to_end(t.bssid)
+    while len(ESTIMATORS) > limit:
+        ESTIMATORS.popitem(last=False)
 
-def scan():
-    """Auto-detects platform and scans."""
-    load_whitelist() # Reload occasionally? Or just once. Done at top level for now.
-    
+def analyze_mobility(target, my_speed=0.0, now=None):
+    """Single-target form of analyze_batch()."""
+    analyze_batch([target], my_speed, now)
+
+def ap_position(t):
+    """The target's estimated AP position (locate.APPosition), or None if it has none or is pacing."""
+    if t.position is None or t.is_pacing:
+        return None
+    return t.position.position()
+
+def log_threats(targets, now=None):
+    """Queues every visible target for the background SQLite writer."""
+    now = int(now if now is not None else time.time())
+    rows = []
+    for t in targets:
+        flags = 0
+        if t.is_mobile: flags |= FLAG_MOBILE
+        if t.is_threat: flags |= FLAG_THREAT
+        if t.is_pacing: flags |= FLAG_PACING
+        ap = ap_position(t)
+        if ap is None:
+            estimate = (None, None, None, None)
+        else:
+            estimate = (to_fixed(ap.lat), to_fixed(ap.lon), int(round(ap.radius)), ap.samples)
+        rows.append((now, t.bssid, t.ssid, t.vendor, t.freq, t.encryption,
+                     t.threat_label, t.confidence, t.signal,
+                     to_fixed(t.lat), to_fixed(t.lon), flags) + estimate)
+    submit_rows(rows)
+
+BACKEND = None
+RESCAN_POLICY = RescanPolicy(CONFIG.get("active_rescan_every", 5))
+
+# Set by replay.start_recording() to capture raw scans for later replay
+RECORDER = None
+
+def get_backend():
+    """Returns the scanner backend, selecting it on first use."""
+    global BACKEND
+    if BACKEND is None:
+        BACKEND = select_backend()
+    return BACKEND
+
+def request_rescan():
+    """Makes the next scan an active radio sweep instead of a cached read."""
+    RESCAN_POLICY.request()
+
+def read_wifi():
+    """Reads the backend (active sweep or cached dump per RESCAN_POLICY). Returns (backend, finished_at, output or None)."""
+    backend = get_backend()
+    active = RESCAN_POLICY.due()
+    out = backend.read(active=active)
+    finished_at = time.time()
+    if out and RECORDER is not None:
+        RECORDER.scan(backend.name, active, out, finished_at)
+    return backend, finished_at, out
+
+def ingest(networks, scanned_at, sources=None):
+    """
+    Runs (ssid, bssid, signal, band, encryption) tuples through registry -> mobility
+    at time `scanned_at`. `sources` optionally maps bssid -> per-source readings.
+    Returns (targets, number of whitelisted networks dropped).
+    """
     raw_targets = []
-    lat, lon, speed = get_gps_location()
+    filtered = 0
     
-    # 1. Try Termux (Android)
-    if shutil.which("termux-wifi-scaninfo"):
+    # Tag the whole scan with the fix taken closest to when it completed
+    lat, lon, speed = closest_fix(scanned_at)
+    
+    # One reading per BSSID per scan (the strongest), so every history backend
+    # records each network once per scan
+    readings = {}
+    for network in networks:
         try:
-            out = subprocess.check_output("termux-wifi-scaninfo", shell=True, timeout=CONFIG.get("scan_timeout", 2)).decode()
-            data = json.loads(out)
-            for net in data:
-                ssid = net.get("ssid", "")
-                bssid = net.get("bssid", "")
-                rssi = net.get("rssi", -100)
-                freq_int = net.get("frequency_mhz", 0)
-                
-                if is_whitelisted(ssid, bssid): continue
-                
-                band = "2.4G"
-                if freq_int > 5000: band = "5G"
-                if freq_int > 6000: band = "6G"
-                
-                freq = f"{band}"
-                
-                t = Target(ssid, bssid, normalize_rssi(rssi), freq, "UNK", lat, lon)
-                analyze_mobility(t, speed)
-                raw_targets.append(t)
-        except:
-            pass
-
-    # 2. Try nmcli (Linux)
-    elif shutil.which("nmcli"):
+            ssid, bssid, signal, freq, encryption = network
+            signal = int(signal)
+            if bssid not in readings or signal > readings[bssid][2]:
+                readings[bssid] = (ssid, bssid, signal, freq, encryption)
+        except (TypeError, ValueError):
+            continue # malformed tuple or signal: skip this network only
+
+    for ssid, bssid, signal, freq, encryption in readings.values():
         try:
-            cmd = "nmcli -t -f SSID,BSSID,SIGNAL,FREQ,SECURITY device wifi list"
-            out = subprocess.check_output(cmd, shell=True, timeout=CONFIG.get("scan_timeout", 2)).decode()
-            for line in out.strip().split("\n"):
-                parts = line.split(":")
-                
-                ssid = "UNKNOWN"
-                bssid = "00:00:00:00:00:00"
-                signal = 0
-                freq = "2.4G"
-                
-                if len(parts) >= 3:
-                    for part in parts:
-                        if len(part) == 17 and part.count(":") == 5:
-                            bssid = part
-                            break
-                    
-                    ssid = parts[0].replace("\\", "")
-                    
-                    if is_whitelisted(ssid, bssid): continue
-
-                    for part in parts:
-                        if part.isdigit() and int(part) <= 100:
-                            signal = int(part)
-                            
-                    if "MHz" in line or "5" in line:
-                        freq = "UNK" 
-                        if "5180" in line or "5200" in line or "5GHz" in line: freq = "5G"
-                        else: freq = "2.4G"
-
-                t = Target(ssid, bssid, signal, freq, "WPA", lat, lon)
-                analyze_mobility(t, speed)
-                raw_targets.append(t)
-        except:
-            pass
-
-    # 3. Demo Mode (Fallback)
-    if not raw_targets:
-        for _ in range(5):
-            ssid = f"DEMO_{random.randint(100,999)}"
-            bssid = "00:00:00:00:00:00"
-            if not is_whitelisted(ssid, bssid):
-                t = Target(ssid, bssid, random.randint(20,90), "2.4", "WPA", lat, lon)
-                analyze_mobility(t, speed)
-                raw_targets.append(t)
-    
+            if is_whitelisted(ssid, bssid):
+                filtered += 1
+                continue
+            t = REGISTRY.observe(ssid, bssid, signal, freq, encryption, lat, lon, scanned_at)
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if sources is not None:
+            t.sources = sources.get(bssid, ())
+        raw_targets.append(t)
+    analyze_batch(raw_targets, speed, scanned_at)
+    locate_targets(raw_targets)
+    return raw_targets, filtered
+
+def finish_scan(raw_targets, scanned_at):
+    """Logs one scan's targets and expires the ones gone for too long."""
     if raw_targets:
-        log_threats(raw_targets)
+        log_threats(raw_targets, scanned_at)
+    
+    REGISTRY.expire(CONFIG.get("target_expiry", 300), scanned_at)
         
     return raw_targets
+
+def process_scan(backend, out, scanned_at):
+    """
+    Runs one scan's raw output through parse -> registry -> mobility -> log, at
+    time `scanned_at`. Returns (targets, number whitelisted).
+    """
+    # A failed or timed-out read is no data. Demo networks only come from the demo
+    # backend, selected for demo_mode or when no real backend is available
+    raw_targets, filtered = ingest(backend.parse(out), scanned_at) if out else ([], 0)
+    return finish_scan(raw_targets, scanned_at), filtered
+
+def scan():
+    """Reads the selected backend and updates the target registry. Returns (targets, number whitelisted)."""
+    load_whitelist()
+    
+    backend, scanned_at, out = read_wifi()
+    return process_scan(backend, out, scanned_at)
@@ -0,0 +1,184 @@
+import glob
+import json
+import shutil
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from .config import CONFIG
+
+# --- ADAPTIVE SCAN SCHEDULE ---
+# The interval between scans follows what is going on, within
+# [scan_interval_min, scan_interval_max]:
+#   PACING   a pacing candidate is in range       -> minimum interval
+#   THREAT   MED/HIGH threats, or moving ones,    -> half the base interval
+#            in range (LOW keyword hits are
+#            everywhere in a city)
+#   CHURN    the network set changed a lot        -> half the base interval
+#   MOVING   GPS speed between 1 m/s and          -> base shrinking to half of it
+#            scan_fast_speed                         at scan_fast_speed
+#   PARKED   stopped and nothing changing         -> grows 1.5x per scan up to the max
+#   LOW BATT battery at or under battery_low,     -> doubled (except PACING)
+#            not charging
+#   NO DATA  the scan returned nothing (failed    -> the base interval
+#            read, empty aggregator cycle)
+# Scans are started on deadlines (previous deadline + interval), so the time
+# a scan takes does not stretch the interval. A deadline that has already
+# passed restarts the schedule from now instead of firing a burst of scans.
+#
+# The mobility history keeps a fixed number of samples per network, so the
+# time it spans follows the interval: 20 samples are ~20 s at 1 s, 5 min when
+# parked at 15 s. The rules use the real span (pacing needs > 15 s of it),
+# so a short interval delays verdicts by samples, not by seconds.
+
+Schedule = namedtuple("Schedule", ["interval", "reason", "battery", "churn"])
+
+PARKED_SPEED = 1.0 # m/s
+PARKED_CHURN = 0.1 # below this a stopped scan counts as "nothing changing"
+
+class BatteryMonitor(threading.Thread):
+    """Polls termux-battery-status (or /sys/class/power_supply) every `every` seconds."""
+
+    def __init__(self, every=60.0):
+        threading.Thread.__init__(self, name="civops-battery", daemon=True)
+        self.every = every
+        self.percent = None # None until the first successful read / when there is no battery
+        self.plugged = False
+        self.stopping = threading.Event()
+
+    def read(self):
+        if shutil.which("termux-battery-status"):
+            try:
+                out = subprocess.run(["termux-battery-status"], capture_output=True, text=True, timeout=10).stdout
+                status = json.loads(out)
+                return status.get("percentage"), status.get("plugged", "UNPLUGGED") != "UNPLUGGED"
+            except:
+                pass
+        for path in glob.glob("/sys/class/power_supply/BAT*"):
+            try:
+                with open(path + "/capacity") as f:
+                    percent = int(f.read())
+                with open(path + "/status") as f:
+                    plugged = f.read().strip() != "Discharging"
+                return percent, plugged
+            except:
+                continue
+        return None, False
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.percent, self.plugged = self.read()
+            if self.percent is None and not shutil.which("termux-battery-status"):
+                return # nothing to poll on this machine
+            self.stopping.wait(self.every)
+
+    def low(self, threshold):
+        return self.percent is not None and not self.plugged and self.percent <= threshold
+
+    def stop(self):
+        self.stopping.set()
+
+def churn(previous, current):
+    """Share of the union of two BSSID sets that is not in both (0 = same networks, 1 = all new)."""
+    union = len(previous | current)
+    if not union:
+        return 0.0
+    return 1.0 - len(previous & current) / union
+
+class ScanScheduler:
+    def __init__(self, base=2.0, min_interval=1.0, max_interval=15.0, fast_speed=13.4,
+                 churn_high=0.3, battery_low=20, battery=None, adaptive=True):
+        self.base = base
+        self.min_interval = min(min_interval, base)
+        self.max_interval = max(max_interval, base)
+        self.fast_speed = fast_speed
+        self.churn_high = churn_high
+        self.battery_low = battery_low
+        self.battery = battery
+        self.adaptive = adaptive
+        self.seen = frozenset()
+        self.interval = base
+        self.current = Schedule(base, "FIXED" if not adaptive else "START", None, 0.0)
+        self.deadline = None
+        self.woken = threading.Event()
+
+    def update(self, targets, speed=0.0):
+        """Picks the interval to the next scan from the scan just finished. Returns the Schedule."""
+        # An empty scan is no data, not every network gone: churn is measured
+        # against the last scan that saw something (and the first one has none)
+        bssids = frozenset(t.bssid for t in targets)
+        changed = churn(self.seen, bssids) if bssids and self.seen else 0.0
+        if bssids:
+            self.seen = bssids
+        percent = self.battery.percent if self.battery is not None else None
+        if not self.adaptive:
+            self.current = Schedule(self.base, "FIXED", percent, changed)
+            return self.current
+
+        base, speed = self.base, speed or 0.0
+        if not targets:
+            interval, reason = base, "NO DATA"
+        elif any(t.is_pacing for t in targets):
+            interval, reason = self.min_interval, "PACING"
+        elif any(t.is_threat and (t.confidence in ("MED", "HIGH") or t.is_mobile) for t in targets):
+            interval, reason = base / 2, "THREAT"
+        elif changed >= self.churn_high:
+            interval, reason = base / 2, "CHURN"
+        elif speed >= PARKED_SPEED:
+            fraction = min(1.0, (speed - PARKED_SPEED) / max(0.1, self.fast_speed - PARKED_SPEED))
+            interval, reason = base * (1.0 - fraction / 2), "MOVING"
+        elif changed < PARKED_CHURN:
+            interval, reason = max(base, self.interval * 1.5), "PARKED"
+        else:
+            interval, reason = base, "IDLE"
+
+        if reason != "PACING" and self.battery is not None and self.battery.low(self.battery_low):
+            interval, reason = interval * 2, "LOW BATT"
+
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+        self.current = Schedule(self.interval, reason, percent, changed)
+        return self.current
+
+    def wait(self, started):
+        """
+        Sleeps until the next deadline (the previous one + interval) or wake().
+        `started` is when the scan just finished began. Returns False if woken.
+        """
+        if self.deadline is None:
+            self.deadline = started
+        self.deadline += self.current.interval
+        now = time.time()
+        if self.deadline < now:
+            self.deadline = now # overran: start again from now, no catch-up burst
+        woken = self.woken.wait(self.deadline - now)
+        if woken:
+            self.woken.clear()
+            self.deadline = None
+        return not woken
+
+    def wake(self):
+        """Starts the next scan right away (rescan key, shutdown)."""
+        self.woken.set()
+
+BATTERY = None
+
+def make_scheduler():
+    """Builds the scheduler from CONFIG; starts the battery monitor unless scan_adaptive is off."""
+    global BATTERY
+    adaptive = CONFIG.get("scan_adaptive", True)
+    if adaptive and BATTERY is None:
+        BATTERY = BatteryMonitor(CONFIG.get("battery_poll", 60.0))
+        BATTERY.start()
+    return ScanScheduler(base=CONFIG.get("scan_interval", 2.0),
+                         min_interval=CONFIG.get("scan_interval_min", 1.0),
+                         max_interval=CONFIG.get("scan_interval_max", 15.0),
+                         fast_speed=CONFIG.get("scan_fast_speed", 13.4),
+                         churn_high=CONFIG.get("scan_churn_high", 0.3),
+                         battery_low=CONFIG.get("battery_low", 20),
+                         battery=BATTERY, adaptive=adaptive)
+
+def stop_battery():
+    global BATTERY
+    battery, BATTERY = BATTERY, None
+    if battery is not None:
+        battery.stop()
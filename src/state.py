@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import namedtuple
+from .locate import radar_angle
+
+# --- VERSIONED SNAPSHOTS ---
+# The scan thread publishes an immutable, pre-sorted view of each scan; the
+# UI (and any other consumer) reads whole snapshots and never touches the
+# live Target objects, which the registry keeps mutating in place.
+
+TargetView = namedtuple("TargetView", [
+    "ssid", "bssid", "signal", "freq", "encryption", "lat", "lon", "vendor",
+    "dist_m", "is_threat", "threat_label", "confidence", "is_mobile", "is_pacing",
+    "dist", "angle", "first_seen", "last_seen", "sources", "ap",
+])
+
+# targets/threats/pacing are tuples sorted by signal, strongest first;
+# filtered is how many networks the whitelist dropped from that scan;
+# schedule is the scheduler.Schedule chosen after it (None when replaying)
+Snapshot = namedtuple("Snapshot", ["version", "time", "targets", "threats", "pacing", "filtered", "schedule"])
+
+EMPTY = Snapshot(0, 0.0, (), (), (), 0, None)
+
+def freeze(t):
+    """Immutable copy of a Target's display fields."""
+    # With an AP position estimate and a fix, the blip points at the AP (north up)
+    ap = None
+    if t.position is not None and not t.is_pacing:
+        ap = t.position.position()
+    angle = t.angle
+    if ap is not None and t.lat is not None and t.lon is not None:
+        angle = radar_angle(t.lat, t.lon, ap)
+    return TargetView(t.ssid, t.bssid, t.signal, t.freq, t.encryption, t.lat, t.lon, t.vendor,
+                      t.dist_m, t.is_threat, t.threat_label, t.confidence, t.is_mobile, t.is_pacing,
+                      t.dist, angle, t.first_seen, t.last_seen, t.sources, ap)
+
+class SnapshotBus:
+    """Holds the latest snapshot and wakes waiters on publish() or poke()."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.snapshot = EMPTY
+        self.pokes = 0
+
+    def publish(self, targets, now=None, filtered=0, schedule=None):
+        views = sorted((freeze(t) for t in targets), key=lambda v: v.signal, reverse=True)
+        with self.cond:
+            self.snapshot = Snapshot(self.snapshot.version + 1,
+                                     now if now is not None else time.time(),
+                                     tuple(views),
+                                     tuple(v for v in views if v.is_threat),
+                                     tuple(v for v in views if v.is_pacing),
+                                     filtered, schedule)
+            self.cond.notify_all()
+            return self.snapshot
+
+    def reschedule(self, schedule):
+        """Republishes the current targets with a new schedule (a scan that returned nothing)."""
+        with self.cond:
+            self.snapshot = self.snapshot._replace(version=self.snapshot.version + 1, schedule=schedule)
+            self.cond.notify_all()
+            return self.snapshot
+
+    def latest(self):
+        return self.snapshot
+
+    def poke(self):
+        """Wakes waiters without new data (e.g. a key press is pending)."""
+        with self.cond:
+            self.pokes += 1
+            self.cond.notify_all()
+
+    def wait(self, version, pokes, timeout):
+        """Blocks until a snapshot newer than `version`, a poke after `pokes`, or `timeout`."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.snapshot.version != version or self.pokes != pokes, timeout)
+            return self.snapshot, self.pokes
+
+BUS = SnapshotBus()
@@ -1,20 +1,52 @@
 import json
 import gzip
 import os
+import re
+import threading
+from functools import lru_cache
+from .oui import OUIIndex
 
-# --- LOAD OUI DATABASE ---
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+
+# --- OUI DATABASE ---
+# Preferred: data/oui.idx, built by tools/build_oui_index.py and mmap'd on
+# first use. Fallback: the curated 24-bit data/vendors.json.gz map.
+OUI_INDEX_PATH = os.path.join(DATA_DIR, "oui.idx")
 VENDOR_DB = {}
-try:
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vendors.json.gz")
-    if os.path.exists(db_path):
-        with gzip.open(db_path, "rt", encoding="utf-8") as f:
-            VENDOR_DB = json.load(f)
-except Exception as e:
-    pass # Fail silently, features will just be missing
 
+_OUI_INDEX = None
+_VENDORS_LOADED = False
+_VENDOR_LOCK = threading.Lock()
+
+def _load_vendors():
+    """Opens the vendor source on first use instead of at import time."""
+    global _OUI_INDEX, VENDOR_DB, _VENDORS_LOADED
+    with _VENDOR_LOCK:
+        if _VENDORS_LOADED:
+            return
+        try:
+            if os.path.exists(OUI_INDEX_PATH):
+                _OUI_INDEX = OUIIndex(OUI_INDEX_PATH)
+        except Exception:
+            _OUI_INDEX = None
+        if _OUI_INDEX is None:
+            try:
+                db_path = os.path.join(DATA_DIR, "vendors.json.gz")
+                if os.path.exists(db_path):
+                    with gzip.open(db_path, "rt", encoding="utf-8") as f:
+                        VENDOR_DB = json.load(f)
+            except Exception:
+                pass # Fail silently, features will just be missing
+        _VENDORS_LOADED = True
+
+@lru_cache(maxsize=4096)
 def resolve_vendor(mac):
-    """Resolves a MAC address to a vendor name using the compressed DB."""
+    """Resolves a MAC address to a vendor name (longest matching IEEE block)."""
     if not mac: return "UNKNOWN"
+    if not _VENDORS_LOADED:
+        _load_vendors()
+    if _OUI_INDEX is not None:
+        return _OUI_INDEX.lookup(mac) or "UNKNOWN"
     clean_mac = mac.upper().replace("-", ":")
     prefix = clean_mac[:8] # XX:XX:XX
     return VENDOR_DB.get(prefix, "UNKNOWN")
@@ -82,6 +114,72 @@ SUSPICIOUS_OUIS = {
     "90:3A:E6": ("Autel", "Drone/UAV"),
 }
 
+# --- COMPILED MATCHERS ---
+# SSID rules in priority order, highest first: the specific hardware labels,
+# then every SUSPICIOUS_SSIDS keyword in list order.
+SSID_RULES = [
+    ("axon", "[AXON BODYCAM]", "HIGH"),
+    ("watchguard", "[WATCHGUARD]", "HIGH"),
+    ("lpr", "[ALPR SYSTEM]", "HIGH"),
+    ("alpr", "[ALPR SYSTEM]", "HIGH"),
+    ("ibr", "[CRADLEPOINT]", "MED"), # Cradlepoint default (IBR1100-xxx), only with a "-"
+    ("airlink", "[SIERRA WIRELESS]", "MED"),
+]
+
+CLASSIFY_CACHE_SIZE = 4096
+
+def _trie_pattern(words):
+    """Regex source for a prefix trie of `words`; greedy, so it matches the longest word."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        end = node.get("", False)
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+def _compile_ssid_rules(rules):
+    """
+    Builds one trie-shaped regex that reports the longest keyword starting at
+    every position of the SSID. Any other keyword starting at the same position
+    is a prefix of it, so each keyword maps to the highest-priority rule among
+    its own prefixes. The best rule overall is the lowest priority index across
+    positions, which is exactly what the sequential `in` checks returned.
+    """
+    ranked = {}
+    for kw, label, confidence in rules:
+        if kw not in ranked:
+            ranked[kw] = (len(ranked), label, confidence)
+    table = {kw: min(rule for prefix, rule in ranked.items() if kw.startswith(prefix))
+             for kw in ranked}
+    return re.compile(f"(?=({_trie_pattern(ranked)}))"), table
+
+_OUI_MATCHES = {}
+_SSID_MATCHER = None      # used when the SSID contains "-"
+_SSID_MATCHER_NODASH = None
+
+def compile_rules():
+    """(Re)compiles the OUI and SSID matchers. Call again after editing the rule lists."""
+    global _OUI_MATCHES, _SSID_MATCHER, _SSID_MATCHER_NODASH
+    _OUI_MATCHES = {oui: (True, f"[{vendor}: {dev_type}]", "HIGH")
+                    for oui, (vendor, dev_type) in SUSPICIOUS_OUIS.items()}
+    keywords = [(kw, f"[{kw.upper()}]", "LOW") for kw in SUSPICIOUS_SSIDS]
+    _SSID_MATCHER = _compile_ssid_rules(SSID_RULES + keywords)
+    _SSID_MATCHER_NODASH = _compile_ssid_rules([r for r in SSID_RULES if r[0] != "ibr"] + keywords)
+    classify_threat.cache_clear()
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
 def classify_threat(ssid, bssid):
     """
     Analyzes SSID and BSSID (MAC) to determine if a target is a potential threat.
@@ -90,35 +188,27 @@ def classify_threat(ssid, bssid):
     if not ssid and not bssid:
         return False, "", "NONE"
 
-    confidence = "LOW"
-    label = ""
-    is_threat = False
-
     # 1. Analyze BSSID (MAC Address) - Strongest Signal (Hardware ID)
     if bssid:
-        mac_clean = bssid.upper().replace("-", ":")
-        for oui, (vendor, dev_type) in SUSPICIOUS_OUIS.items():
-            if mac_clean.startswith(oui):
-                return True, f"[{vendor}: {dev_type}]", "HIGH"
+        hit = _OUI_MATCHES.get(bssid[:8].upper().replace("-", ":"))
+        if hit:
+            return hit
 
     # 2. Analyze SSID - Heuristic Signal
     if ssid:
         s_lower = ssid.lower()
-        
-        # High Confidence Keywords
-        if "axon" in s_lower: return True, "[AXON BODYCAM]", "HIGH"
-        if "watchguard" in s_lower: return True, "[WATCHGUARD]", "HIGH"
-        if "lpr" in s_lower or "alpr" in s_lower: return True, "[ALPR SYSTEM]", "HIGH"
-        
-        # Hardware Pattern Matches (Cradlepoint Default: IBR1100-xxx)
-        if "ibr" in s_lower and "-" in s_lower:
-            return True, "[CRADLEPOINT]", "MED"
-        if "airlink" in s_lower:
-            return True, "[SIERRA WIRELESS]", "MED"
-            
-        # Keyword Fuzzy Match
-        for kw in SUSPICIOUS_SSIDS:
-            if kw in s_lower:
-                return True, f"[{kw.upper()}]", "LOW"
-    
+        regex, table = _SSID_MATCHER if "-" in s_lower else _SSID_MATCHER_NODASH
+
+        best = None
+        for m in regex.finditer(s_lower):
+            rule = table[m.group(1)]
+            if best is None or rule[0] < best[0]:
+                best = rule
+                if best[0] == 0:
+                    break
+        if best:
+            return True, best[1], best[2]
+
     return False, "", "NONE"
+
+compile_rules()
@@ -1,175 +1,297 @@
 import curses
 import math
+import random
 import time
+from .locate import offset_m, bearing_text
 
-def draw(stdscr, targets, radar_angle, selected_target_index=None, signal_history=None, car_mode=False):
-    if signal_history is None: signal_history = []
-    
-    stdscr.clear()
-    h, w = stdscr.getmaxyx()
-    cy, cx = h // 2, w // 2
-    max_radius = min(h, w) // 2 - 2
-
-    curses.init_pair(1, curses.COLOR_CYAN, -1)
-    curses.init_pair(2, curses.COLOR_GREEN, -1)
-    curses.init_pair(3, curses.COLOR_RED, -1)
-    curses.init_pair(4, curses.COLOR_YELLOW, -1)
-    
-    sorted_targets = sorted(targets, key=lambda x: x.signal, reverse=True)
-    active_target = None
-    if selected_target_index is not None and selected_target_index < len(sorted_targets):
-        active_target = sorted_targets[selected_target_index]
-    
-    # --- MODE: CAR (HIGH CONTRAST) ---
-    if car_mode:
-        # Find the most dangerous target
-        threats = [t for t in targets if t.is_threat]
-        pacing = [t for t in targets if getattr(t, 'is_pacing', False)]
-        
+# --- DIFFERENTIAL RENDERER ---
+# The screen is only erased when the terminal size or mode changes. Every
+# other frame each region (sweep + blips, live feed, seeker panel, car panel)
+# is compared with what was painted last time and only the difference is
+# written; noutrefresh/doupdate then push a single batched update.
+
+class Renderer:
+    def __init__(self):
+        self.colors_ready = False
+        self.layout = None   # (h, w, mode) the static frame was drawn for
+        self.geometry = {}   # (h, w) -> cached layout numbers + sweep rays
+        self.cells = {}      # radar area: (y, x) -> (char, attr)
+        self.lines = {}      # text regions: region -> {y: (x, text, attr)}
+
+    def invalidate(self):
+        """Forces a full repaint on the next frame (e.g. after something else wrote to the screen)."""
+        self.layout = None
+
+    def _init_colors(self):
+        if self.colors_ready:
+            return
+        curses.init_pair(1, curses.COLOR_CYAN, -1)
+        curses.init_pair(2, curses.COLOR_GREEN, -1)
+        curses.init_pair(3, curses.COLOR_RED, -1)
+        curses.init_pair(4, curses.COLOR_YELLOW, -1)
+        self.colors_ready = True
+
+    def _geometry(self, h, w):
+        geo = self.geometry.get((h, w))
+        if geo is None:
+            cy, cx = h // 2, w // 2
+            geo = {"cy": cy, "cx": cx, "max_radius": min(h, w) // 2 - 2,
+                   "list_x": w - 35, "rays": {}}
+            geo["show_list"] = geo["list_x"] > cx + 15
+            self.geometry = {(h, w): geo} # only the current size is worth keeping
+        return geo
+
+    def _ray(self, geo, h, w, radar_angle):
+        """Sweep line cells for an angle; the rotation revisits the same angles, so cache them."""
+        key = round(radar_angle, 4)
+        cells = geo["rays"].get(key)
+        if cells is None:
+            cy, cx, max_radius = geo["cy"], geo["cx"], geo["max_radius"]
+            cos_a, sin_a = math.cos(radar_angle), math.sin(radar_angle)
+            cells = []
+            for i in range(1, int(max_radius)):
+                rx = int(cx + cos_a * i * 2)
+                ry = int(cy + sin_a * i)
+                if 0 < ry < h-1 and 0 < rx < w-1:
+                    cells.append((ry, rx))
+            if len(geo["rays"]) > 2048:
+                geo["rays"].clear()
+            geo["rays"][key] = cells
+        return cells
+
+    # --- low level painting ---
+
+    def _put(self, stdscr, y, x, text, attr=0):
+        try:
+            stdscr.addstr(y, x, text, attr)
+        except curses.error:
+            pass # bottom-right cell / terminal shrank mid-frame
+
+    def _paint_cells(self, stdscr, cells):
+        old = self.cells
+        for pos in old:
+            if pos not in cells:
+                self._put(stdscr, pos[0], pos[1], " ")
+        for pos, cell in cells.items():
+            if old.get(pos) != cell:
+                try:
+                    stdscr.addch(pos[0], pos[1], cell[0], cell[1])
+                except curses.error:
+                    pass
+        self.cells = cells
+
+    def _paint_lines(self, stdscr, region, lines):
+        """lines: {y: (x, text, attr)}. Rewrites changed rows, padding over leftovers."""
+        old = self.lines.get(region, {})
+        for y, (x, text, attr) in old.items():
+            if y not in lines:
+                self._put(stdscr, y, x, " " * len(text))
+        for y, line in lines.items():
+            prev = old.get(y)
+            if prev == line:
+                continue
+            x, text, attr = line
+            self._put(stdscr, y, x, text, attr)
+            if prev is not None:
+                px, ptext, _ = prev
+                # Blank whatever the previous, longer row left behind
+                if px < x:
+                    self._put(stdscr, y, px, " " * min(len(ptext), x - px))
+                tail = px + len(ptext) - (x + len(text))
+                if tail > 0:
+                    self._put(stdscr, y, x + len(text), " " * tail)
+        self.lines[region] = lines
+
+    # --- static frames (drawn once per layout) ---
+
+    def _draw_frame(self, stdscr, mode, h, w, geo):
+        stdscr.erase()
+        self.cells = {}
+        self.lines = {}
+        if mode == "radar":
+            stdscr.attron(curses.color_pair(1))
+            stdscr.border()
+            stdscr.attroff(curses.color_pair(1))
+            self._put(stdscr, 0, 2, " S0PHIA CIVOPS // RECON V5 ", curses.A_BOLD)
+            self._put(stdscr, h-1, 2, "[S] SEEK MODE  [R] RESCAN  [K] EXPORT KML  [Q] QUIT", curses.A_BOLD)
+            if geo["show_list"]:
+                self._put(stdscr, 1, geo["list_x"], "/// LIVE FEED ///", curses.A_UNDERLINE)
+        elif mode == "seek":
+            stdscr.attron(curses.color_pair(4) | curses.A_BOLD)
+            stdscr.border()
+            stdscr.attroff(curses.color_pair(4) | curses.A_BOLD)
+            self._put(stdscr, 0, 2, " SEEKER MODE // SIGNAL LOCK ", curses.A_REVERSE)
+            self._put(stdscr, h-2, 4, "[S] RETURN TO RADAR", curses.A_DIM)
+
+    # --- dynamic regions ---
+
+    def _draw_car(self, stdscr, snapshot, h, w, geo):
+        # Most dangerous target: pacing beats threats, both lists are strongest first
         primary_target = None
         status_color = curses.color_pair(2)
         status_text = "SECURE"
-        
-        if pacing:
-            primary_target = pacing[0]
+
+        if snapshot.pacing:
+            primary_target = snapshot.pacing[0]
             status_color = curses.color_pair(4) | curses.A_BOLD | curses.A_BLINK
             status_text = "PACING DETECTED"
-        elif threats:
-            # Sort threats by signal
-            threats.sort(key=lambda x: x.signal, reverse=True)
-            primary_target = threats[0]
+        elif snapshot.threats:
+            primary_target = snapshot.threats[0]
             status_color = curses.color_pair(3) | curses.A_BOLD
             status_text = "THREAT DETECTED"
-        
-        # Draw Big Status Bar
-        stdscr.attron(status_color)
-        stdscr.addstr(1, 2, status_text.center(w-4))
-        stdscr.attroff(status_color)
-        
+
+        # Big Status Bar
+        lines = {1: (2, status_text.center(w-4), status_color)}
+
         if primary_target:
             # Huge Signal Bar
-            sig_str = f"{primary_target.signal}%"
-            stdscr.addstr(4, 2, sig_str, curses.A_BOLD | curses.A_REVERSE)
-            
+            lines[4] = (2, f"{primary_target.signal}%", curses.A_BOLD | curses.A_REVERSE)
+
             # Info
-            stdscr.addstr(6, 2, f"SSID: {primary_target.ssid[:20]}")
-            stdscr.addstr(7, 2, f"VEND: {primary_target.vendor[:20]}")
-            stdscr.addstr(8, 2, f"TYPE: {primary_target.threat_label}")
-            
-            if getattr(primary_target, 'is_pacing', False):
-                 stdscr.addstr(10, 2, "!!! VEHICLE FOLLOWING !!!", curses.color_pair(4) | curses.A_BOLD)
+            lines[6] = (2, f"SSID: {primary_target.ssid[:20]}", 0)
+            lines[7] = (2, f"VEND: {primary_target.vendor[:20]}", 0)
+            lines[8] = (2, f"TYPE: {primary_target.threat_label}", 0)
+
+            if primary_target.is_pacing:
+                lines[10] = (2, "!!! VEHICLE FOLLOWING !!!", curses.color_pair(4) | curses.A_BOLD)
         else:
-            stdscr.addstr(cy, cx-5, "SCANNING...", curses.A_DIM)
-            
-        stdscr.refresh()
-        return
-
-    # --- MODE: SEEKER ---
-    if active_target:
-        stdscr.attron(curses.color_pair(4) | curses.A_BOLD)
-        stdscr.border()
-        stdscr.addstr(0, 2, " SEEKER MODE // SIGNAL LOCK ", curses.A_REVERSE)
-        
-        stdscr.addstr(2, 4, f"TARGET: {active_target.ssid}")
-        stdscr.addstr(3, 4, f"MAC:    {active_target.bssid}")
-        stdscr.addstr(4, 4, f"BAND:   {active_target.freq}")
-        stdscr.addstr(5, 4, f"TYPE:   {active_target.threat_label or 'UNKNOWN'}")
-        
+            lines[geo["cy"]] = (geo["cx"]-5, "SCANNING...", curses.A_DIM)
+
+        self._paint_lines(stdscr, "car", lines)
+
+    def _draw_seeker(self, stdscr, active_target, signal_history, h, w):
+        panel = curses.color_pair(4) | curses.A_BOLD
+        lines = {
+            2: (4, f"TARGET: {active_target.ssid}", panel),
+            3: (4, f"MAC:    {active_target.bssid}", panel),
+            4: (4, f"BAND:   {active_target.freq}", panel),
+            5: (4, f"TYPE:   {active_target.threat_label or 'UNKNOWN'}", panel),
+        }
+
         # Visual Audio Bar (Geiger Style)
         # Represents "clicks" - density increases with signal
-        # We'll use a random-looking pattern that regenerates based on signal intensity
         click_density = int(active_target.signal / 5) # 0-20
-        clicks = ""
-        import random
-        for _ in range(40):
-            if random.randint(0, 20) < click_density:
-                clicks += "|"
-            else:
-                clicks += " "
-        
-        stdscr.addstr(7, 4, "AUDIO: [" + clicks + "]")
+        clicks = "".join("|" if random.randint(0, 20) < click_density else " " for _ in range(40))
+        lines[7] = (4, "AUDIO: [" + clicks + "]", panel)
 
         # Main Signal Bar
         bar_width = w - 8
         fill = int((active_target.signal / 100.0) * bar_width)
-        stdscr.addstr(8, 4, f"SIGNAL: {active_target.signal}%")
-        stdscr.addstr(9, 4, "[" + "#" * fill + "-" * (bar_width - fill) + "]")
-        
+        lines[8] = (4, f"SIGNAL: {active_target.signal}%", panel)
+        lines[9] = (4, "[" + "#" * fill + "-" * (bar_width - fill) + "]", panel)
+
         # Tracked Target Persistent History
         # Simple ASCII sparkline
         hist_width = min(60, w - 20)
         recent = signal_history[-hist_width:]
-        spark = ""
-        for val in recent:
-            if val < 25: spark += "_"
-            elif val < 50: spark += "."
-            elif val < 75: spark += "-"
-            else: spark += "^"
-        
-        stdscr.addstr(10, 4, f"TRACK: {spark}")
-        
+        spark = "".join("_" if val < 25 else "." if val < 50 else "-" if val < 75 else "^" for val in recent)
+        lines[10] = (4, f"TRACK: {spark}", panel)
+
         # Distance Math
-        dist_m = getattr(active_target, 'dist_m', 0.0)
+        dist_m = active_target.dist_m
         dist_str = f"{dist_m}m" if dist_m > 0 else "CALCULATING..."
-        stdscr.addstr(12, 4, f"EST. DISTANCE: {dist_str}", curses.A_BOLD)
-        
-        stdscr.addstr(h-2, 4, "[S] RETURN TO RADAR", curses.A_DIM)
-        stdscr.refresh()
-        return
-
-    # --- MODE: RADAR ---
-    
-    stdscr.attron(curses.color_pair(1))
-    stdscr.border()
-    stdscr.addstr(0, 2, " S0PHIA CIVOPS // RECON V5 ", curses.A_BOLD)
-    stdscr.addstr(h-1, 2, "[S] SEEK MODE  [K] EXPORT KML  [Q] QUIT", curses.A_BOLD)
-    
-    lx = int(cx + math.cos(radar_angle) * max_radius * 2)
-    ly = int(cy + math.sin(radar_angle) * max_radius)
-    for i in range(1, int(max_radius)):
-        rx = int(cx + math.cos(radar_angle) * i * 2)
-        ry = int(cy + math.sin(radar_angle) * i)
-        if 0 < ry < h-1 and 0 < rx < w-1:
-            stdscr.addch(ry, rx, '.', curses.color_pair(2))
-
-    for t in targets:
-        tx = int(cx + math.cos(t.angle) * t.dist * max_radius * 2)
-        ty = int(cy + math.sin(t.angle) * t.dist * max_radius)
-        
-        if 0 < ty < h-1 and 0 < tx < w-1:
-            color = curses.color_pair(2)
-            char = 'O'
-            if t.freq == "5G": char = '+' 
-            
-            if t.is_threat:
-                color = curses.color_pair(3) | curses.A_BOLD
-                if t.confidence == "HIGH": color = color | curses.A_BLINK
-                char = '!'
-            
-            stdscr.addch(ty, tx, char, color)
-            
-            angle_diff = abs((radar_angle - t.angle + math.pi) % (2*math.pi) - math.pi)
-            if angle_diff < 0.3:
-                label = t.ssid[:10]
-                if t.is_threat: label = f"{t.threat_label} {t.ssid}"
-                stdscr.addstr(ty, tx+1, label, color)
-
-    list_x = w - 35
-    if list_x > cx + 15:
-        stdscr.addstr(1, list_x, "/// LIVE FEED ///", curses.A_UNDERLINE)
-        for i, t in enumerate(sorted_targets[:h-4]):
-            color = curses.color_pair(2)
-            prefix = "   "
-            if t.is_threat:
-                color = curses.color_pair(3) | curses.A_BOLD
-                prefix = "!  "
-            if selected_target_index == i:
-                prefix = "-> "
-                color = color | curses.A_REVERSE
-            
-            band_mk = "5G" if t.freq == "5G" else "2G"
-            
-            row_str = f"{prefix}[{band_mk}] {t.signal}% {t.ssid[:12]}"
-            stdscr.addstr(2+i, list_x, row_str, color)
-
-    stdscr.refresh()
+        lines[12] = (4, f"EST. DISTANCE: {dist_str}", curses.A_BOLD)
+
+        # Where the AP itself sits, from every GPS-tagged sighting so far
+        ap = active_target.ap
+        if ap is not None and active_target.lat is not None and active_target.lon is not None:
+            east, north = offset_m(active_target.lat, active_target.lon, ap.lat, ap.lon)
+            lines[13] = (4, f"AP POSITION:   {math.hypot(east, north):.0f}m {bearing_text(east, north)} "
+                            f"+/-{ap.radius:.0f}m ({ap.samples} fixes)", curses.A_BOLD)
+
+        self._paint_lines(stdscr, "seek", lines)
+
+    def _draw_radar(self, stdscr, targets, radar_angle, h, w, geo):
+        cy, cx, max_radius = geo["cy"], geo["cx"], geo["max_radius"]
+        label_limit = geo["list_x"] - 1 if geo["show_list"] else w - 1
+
+        # Layers, back to front: sweep, blips, labels
+        sweep = curses.color_pair(2)
+        cells = {pos: ('.', sweep) for pos in self._ray(geo, h, w, radar_angle)}
+
+        for t in targets:
+            tx = int(cx + math.cos(t.angle) * t.dist * max_radius * 2)
+            ty = int(cy + math.sin(t.angle) * t.dist * max_radius)
+
+            if 0 < ty < h-1 and 0 < tx < w-1:
+                color = curses.color_pair(2)
+                char = 'O'
+                if t.freq == "5G": char = '+'
+
+                if t.is_threat:
+                    color = curses.color_pair(3) | curses.A_BOLD
+                    if t.confidence == "HIGH": color = color | curses.A_BLINK
+                    char = '!'
+
+                cells[(ty, tx)] = (char, color)
+
+                angle_diff = abs((radar_angle - t.angle + math.pi) % (2*math.pi) - math.pi)
+                if angle_diff < 0.3:
+                    label = t.ssid[:10]
+                    if t.is_threat: label = f"{t.threat_label} {t.ssid}"
+                    for i, ch in enumerate(label[:max(0, label_limit - tx - 1)]):
+                        cells[(ty, tx + 1 + i)] = (ch, color)
+
+        self._paint_cells(stdscr, cells)
+
+        if geo["show_list"]:
+            lines = {}
+            for i, t in enumerate(targets[:h-4]):
+                color = curses.color_pair(2)
+                prefix = "   "
+                if t.is_threat:
+                    color = curses.color_pair(3) | curses.A_BOLD
+                    prefix = "!  "
+
+                band_mk = "5G" if t.freq == "5G" else "2G"
+
+                text = f"{prefix}[{band_mk}] {t.signal}% {t.ssid[:12]}"
+                if t.ap is not None and t.lat is not None and t.lon is not None:
+                    east, north = offset_m(t.lat, t.lon, t.ap.lat, t.ap.lon)
+                    text = f"{text:<25}{math.hypot(east, north):>6.0f}m"[:33]
+                lines[2+i] = (geo["list_x"], text, color)
+            self._paint_lines(stdscr, "feed", lines)
+
+    def _draw_status(self, stdscr, snapshot, h, w):
+        # Right end of the top border, clear of the title
+        text = f" FILTERED {snapshot.filtered} "
+        schedule = snapshot.schedule
+        if schedule:
+            battery = f" BAT {schedule.battery}%" if schedule.battery is not None else ""
+            text = f" SCAN {schedule.interval:.1f}s {schedule.reason}{battery} |{text}"
+        lines = {}
+        if w - len(text) - 2 > 32:
+            lines[0] = (w - len(text) - 2, text, curses.color_pair(1))
+        self._paint_lines(stdscr, "status", lines)
+
+    def draw(self, stdscr, snapshot, radar_angle, seek_target=None, signal_history=None, car_mode=False):
+        """Renders a state.Snapshot; its target lists arrive sorted, so nothing is sorted here."""
+        if signal_history is None: signal_history = []
+        self._init_colors()
+
+        h, w = stdscr.getmaxyx()
+        geo = self._geometry(h, w)
+
+        mode = "car" if car_mode else ("seek" if seek_target else "radar")
+        if self.layout != (h, w, mode):
+            self._draw_frame(stdscr, mode, h, w, geo)
+            self.layout = (h, w, mode)
+
+        if mode == "car":
+            self._draw_car(stdscr, snapshot, h, w, geo)
+        elif mode == "seek":
+            self._draw_seeker(stdscr, seek_target, signal_history, h, w)
+        else:
+            self._draw_radar(stdscr, snapshot.targets, radar_angle, h, w, geo)
+        self._draw_status(stdscr, snapshot, h, w)
+
+        stdscr.noutrefresh()
+        curses.doupdate()
+
+RENDERER = Renderer()
+
+def draw(stdscr, snapshot, radar_angle, seek_target=None, signal_history=None, car_mode=False):
+    RENDERER.draw(stdscr, snapshot, radar_angle, seek_target, signal_history, car_mode)
+
+def invalidate():
+    RENDERER.invalidate()
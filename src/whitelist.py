@@ -0,0 +1,105 @@
+import fnmatch
+import json
+import os
+import re
+
+# --- WHITELIST ---
+# config/whitelist.json:
+#   {"ignore_ssids": ["HomeNet", "Office-*", "FLEET-??"],
+#    "ignore_macs":  ["AA:BB:CC:DD:EE:FF", "00:11:22:*", "00-11-23", "001124A*"]}
+# Plain SSIDs and full MACs go into sets. SSIDs with * ? [ ] wildcards are
+# joined into one regex. MACs with fewer than 12 hex digits (or a trailing *)
+# are prefixes and go into a nibble trie, so OUI and MA-M/MA-S ranges
+# each cost one walk of at most 12 steps.
+# The file is only re-read when its mtime/size changes.
+
+WHITELIST_PATH = os.path.join(os.path.dirname(__file__), "..", "config", "whitelist.json")
+
+_END = "" # trie terminal marker
+_HEX = set("0123456789ABCDEF")
+
+def _mac_hex(entry):
+    """'aa:bb-cc.dd*' -> ('AABBCCDD', True). Returns (None, False) for junk."""
+    text = str(entry).strip().upper()
+    prefix = text.endswith("*")
+    digits = text.rstrip("*").replace(":", "").replace("-", "").replace(".", "")
+    if not digits or len(digits) > 12 or not set(digits) <= _HEX:
+        return None, False
+    return digits, prefix or len(digits) < 12
+
+def _trie_add(trie, digits):
+    node = trie
+    for ch in digits:
+        node = node.setdefault(ch, {})
+    node[_END] = True
+
+def _trie_match(trie, digits):
+    node = trie
+    for ch in digits:
+        if _END in node:
+            return True
+        node = node.get(ch)
+        if node is None:
+            return False
+    return _END in node
+
+class Whitelist:
+    def __init__(self, path=WHITELIST_PATH):
+        self.path = path
+        self.stamp = None
+        self.ssids = frozenset()
+        self.macs = frozenset()
+        self.prefixes = {}
+        self.ssid_pattern = None
+        self.rules = 0
+
+    def refresh(self):
+        """Recompiles the rules if the file changed since the last call. Returns True if it did."""
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp == self.stamp:
+            return False
+        self.stamp = stamp
+        data = {}
+        if stamp is not None:
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except:
+                return False # keep the previous rules on a half-written/broken file
+        self.compile(data)
+        return True
+
+    def compile(self, data):
+        ssids, wildcards = set(), []
+        for entry in data.get("ignore_ssids", []):
+            entry = str(entry)
+            if any(ch in entry for ch in "*?["):
+                wildcards.append(fnmatch.translate(entry))
+            else:
+                ssids.add(entry)
+        macs, prefixes, n_prefixes = set(), {}, 0
+        for entry in data.get("ignore_macs", []):
+            digits, prefix = _mac_hex(entry)
+            if digits is None:
+                continue
+            if prefix:
+                _trie_add(prefixes, digits)
+                n_prefixes += 1
+            else:
+                macs.add(":".join(digits[i:i+2] for i in range(0, 12, 2)))
+        self.ssids = frozenset(ssids)
+        self.macs = frozenset(macs)
+        self.prefixes = prefixes
+        self.ssid_pattern = re.compile("|".join(wildcards)) if wildcards else None
+        self.rules = len(ssids) + len(wildcards) + len(macs) + n_prefixes
+
+    def match(self, ssid, bssid):
+        if ssid in self.ssids or bssid in self.macs:
+            return True
+        if self.prefixes and _trie_match(self.prefixes, bssid.replace(":", "")):
+            return True
+        return self.ssid_pattern is not None and self.ssid_pattern.match(ssid or "") is not None
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.config import CONFIG
+
+# src.scanner creates the log DB on import: point it at a scratch file, and
+# keep alerts off the speaker and GPS off, before any test module imports it.
+CONFIG["log_file"] = os.path.join(tempfile.mkdtemp(prefix="civops-tests-"), "intercepts.db")
+CONFIG["alert_sinks"] = []
+CONFIG["gps_enabled"] = False
@@ -0,0 +1,96 @@
+import json
+import socket
+import time
+
+import pytest
+
+from src import scanner
+from src.aggregator import Aggregator
+
+A = "AA:BB:CC:DD:EE:01"
+B = "AA:BB:CC:DD:EE:02"
+
+def test_collect_merges_strongest_reading():
+    agg = Aggregator()
+    agg.submit("usb24", [("cam", A, 40, "2.4G", "WPA2"), ("home", B, 70, "2.4G", "WPA2")], 100.0)
+    agg.submit("usb5", [("", A, 80, "5G", "WPA2")], 101.0)
+    [(nets, sources, scanned_at)] = agg.collect()
+    assert scanned_at == 101.0
+    # Strongest wins; the SSID only the weaker radio decoded is kept
+    assert sorted(nets) == [("cam", A, 80, "5G", "WPA2"), ("home", B, 70, "2.4G", "WPA2")]
+    assert sources == {A: (("usb24", 40, 100.0), ("usb5", 80, 101.0)), B: (("usb24", 70, 100.0),)}
+    assert agg.collect() == []
+
+def test_weaker_reading_does_not_replace_ssid():
+    agg = Aggregator()
+    agg.submit("a", [("", A, 80, "5G", "WPA2")], 100.0)
+    agg.submit("b", [("cam", A, 30, "2.4G", "WPA2")], 100.0)
+    [(nets, _, _)] = agg.collect()
+    assert nets == [("", A, 80, "5G", "WPA2")]
+
+def test_earlier_scans_of_a_source_are_kept(monkeypatch):
+    agg = Aggregator()
+    agg.backlog = 3
+    for i in range(5):
+        agg.submit("fast", [("cam", A, 50 + i, "2.4G", "WPA2")], 100.0 + i)
+    agg.submit("slow", [("home", B, 60, "2.4G", "WPA2")], 102.5)
+    batches = agg.collect()
+    # The two oldest fell out of the backlog; the rest are ingested oldest first
+    assert [b[2] for b in batches] == [102.0, 103.0, 104.0]
+    assert batches[0][0] == [("cam", A, 52, "2.4G", "WPA2")]
+    assert sorted(n[1] for n in batches[-1][0]) == [A, B]
+
+@pytest.fixture
+def clean_registry():
+    scanner.REGISTRY.targets.clear()
+    scanner.MOBILITY.clear()
+    yield scanner.REGISTRY
+    scanner.REGISTRY.targets.clear()
+    scanner.MOBILITY.clear()
+
+def test_scan_ingests_every_scan_at_its_own_time(clean_registry, monkeypatch):
+    logged = []
+    monkeypatch.setattr(scanner, "log_threats", lambda targets, now: logged.append((now, [t.bssid for t in targets])))
+    monkeypatch.setattr(scanner, "load_whitelist", lambda: None)
+    monkeypatch.setattr(scanner, "is_whitelisted", lambda ssid, bssid: ssid == "ignored")
+    agg = Aggregator()
+    assert agg.scan() == ([], 0)
+    now = time.time()
+    for i in range(3):
+        agg.submit("fast", [("cam", A, 50, "2.4G", "WPA2"), ("ignored", B, 50, "2.4G", "WPA2")], now + i)
+    targets, filtered = agg.scan()
+    assert [t.bssid for t in targets] == [A] and filtered == 1
+    assert logged == [(now, [A]), (now + 1, [A]), (now + 2, [A])]
+    assert clean_registry.last_seen(A) == now + 2
+
+def send_lines(agg, lines):
+    with socket.create_connection(agg.server.server_address[:2], timeout=5) as sock:
+        sock.sendall("".join(line + "\n" for line in lines).encode())
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        with agg.lock:
+            if sum(len(s) for s in agg.pending.values()) >= 2:
+                return
+        time.sleep(0.01)
+
+def test_node_lines(monkeypatch):
+    agg = Aggregator()
+    agg.listen("127.0.0.1:0")
+    agg.start()
+    try:
+        termux = json.dumps([{"bssid": "aa:bb:cc:dd:ee:03", "frequency_mhz": 5200, "rssi": -45, "ssid": "van"}])
+        send_lines(agg, [
+            "not json",
+            json.dumps({"node": "rear", "nets": [["cam", "aa:bb:cc:dd:ee:01"]]}), # too short
+            json.dumps({"node": "rear", "b": "nosuch", "o": "x"}),
+            json.dumps({"node": "rear", "nets": [["cam", "aa:bb:cc:dd:ee:01", "72", "5G", "WPA2"]]}),
+            json.dumps({"node": "side", "b": "termux", "o": termux}),
+        ])
+        with agg.lock:
+            pending = {source: [nets for _, nets in scans] for source, scans in agg.pending.items()}
+    finally:
+        agg.stop()
+    assert pending == {
+        "node:rear": [[("cam", A, 72, "5G", "WPA2")]],
+        "node:side": [[("van", "AA:BB:CC:DD:EE:03", 100, "5G", "UNK")]],
+    }
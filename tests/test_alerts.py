@@ -0,0 +1,121 @@
+import os
+import time
+
+from src.alerts import (AlertDispatcher, Alert, LogSink, Message, TTSSink, coalesce,
+                        PRIORITY_PACING, PRIORITY_HIGH, PRIORITY_OTHER)
+
+class SlowSink:
+    """Records messages, taking `delay` seconds per message like a TTS utterance."""
+
+    name = "slow"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.messages = []
+
+    def emit(self, message):
+        self.messages.append(message)
+        time.sleep(self.delay)
+
+    def close(self):
+        pass
+
+def wait_for(sink, n, timeout=5.0):
+    deadline = time.time() + timeout
+    while len(sink.messages) < n and time.time() < deadline:
+        time.sleep(0.01)
+    return sink.messages
+
+def alert(seq, kind, key, text, priority=PRIORITY_OTHER, t=100.0):
+    return Alert(priority, seq, kind, key, text, t + seq)
+
+def test_coalesce_texts_and_order():
+    messages = coalesce([
+        alert(1, "watch", "W0", "Watchlisted network nearby."),
+        alert(2, "threat", "T0", "Caution: threat 0.", PRIORITY_HIGH),
+        alert(3, "watch", "W1", "Watchlisted network nearby."),
+        alert(4, "pacing", "P0", "Pacing.", PRIORITY_PACING),
+        alert(5, "threat", "T1", "Caution: threat 1.", PRIORITY_HIGH),
+        alert(6, "pacing", "P1", "Pacing.", PRIORITY_PACING),
+    ])
+    assert [(m.kind, m.count, m.text, m.keys) for m in messages] == [
+        ("pacing", 2, "Alert. Pacing detected. 2 vehicles following.", ("P0", "P1")),
+        ("threat", 2, "Caution: 2 threats nearby.", ("T0", "T1")),
+        ("watch", 2, "Watchlisted network nearby. And 1 more.", ("W0", "W1")),
+    ]
+    assert messages[0].time == 106.0
+
+def test_coalesce_single_alert_keeps_text():
+    [message] = coalesce([alert(1, "threat", "T0", "Caution: threat 0.", PRIORITY_HIGH)])
+    assert (message.count, message.text) == (1, "Caution: threat 0.")
+
+def test_burst_coalesced_and_pacing_overtakes():
+    sink = SlowSink(0.3)
+    dispatcher = AlertDispatcher([sink], rearm=600.0, coalesce_delay=0.05)
+    dispatcher.start()
+    try:
+        now = time.time()
+        for i in range(3):
+            dispatcher.raise_alert("threat", f"T{i}", f"Caution: threat {i} detected.", PRIORITY_HIGH, now)
+        wait_for(sink, 1)
+        # While the first message "plays": low priority first, then a pacer
+        dispatcher.raise_alert("watch", "W0", "Watchlisted network nearby.", PRIORITY_OTHER, now)
+        dispatcher.raise_alert("watch", "W1", "Watchlisted network nearby.", PRIORITY_OTHER, now)
+        dispatcher.raise_alert("pacing", "P0", "Alert. Pacing detected. Vehicle following.", PRIORITY_PACING, now)
+        got = [(m.kind, m.count) for m in wait_for(sink, 3)]
+    finally:
+        dispatcher.stop()
+    assert got == [("threat", 3), ("pacing", 1), ("watch", 2)]
+    assert sink.messages[0].text == "Caution: 3 threats nearby."
+
+def test_rearm_timeout():
+    dispatcher = AlertDispatcher([], rearm=600.0)
+    assert dispatcher.raise_alert("threat", "T0", "x", PRIORITY_HIGH, 1000.0)
+    assert not dispatcher.raise_alert("threat", "T0", "x", PRIORITY_HIGH, 1599.0)
+    assert dispatcher.raise_alert("threat", "T1", "x", PRIORITY_HIGH, 1599.0) # other key
+    assert dispatcher.raise_alert("pacing", "T0", "x", PRIORITY_PACING, 1599.0) # other kind
+    assert dispatcher.raise_alert("threat", "T0", "x", PRIORITY_HIGH, 1601.0)
+    assert dispatcher.suppressed == 1
+
+def test_dropped_alert_is_armed_again():
+    dispatcher = AlertDispatcher([], rearm=600.0, queue_size=2)
+    assert dispatcher.raise_alert("threat", "T0", "x", PRIORITY_HIGH, 1000.0)
+    assert dispatcher.raise_alert("watch", "W0", "x", PRIORITY_OTHER, 1000.0)
+    # Full: the watch alert is the least urgent and goes
+    assert dispatcher.raise_alert("pacing", "P0", "x", PRIORITY_PACING, 1001.0)
+    assert dispatcher.dropped == 1
+    assert [a.key for a in sorted(dispatcher.pending)] == ["P0", "T0"]
+    # ...so it can fire again right away, while the queued ones stay quiet
+    assert not dispatcher.raise_alert("threat", "T0", "x", PRIORITY_HIGH, 1002.0)
+    assert not dispatcher.raise_alert("watch", "W1", "x", PRIORITY_OTHER, 1002.0) # dropped itself
+    assert dispatcher.dropped == 2
+    assert ("watch", "W1") not in dispatcher.fired
+    dispatcher.clear()
+    assert dispatcher.raise_alert("watch", "W0", "x", PRIORITY_OTHER, 1003.0)
+
+def test_log_sink(tmp_path):
+    path = tmp_path / "alerts" / "alerts.log"
+    sink = LogSink(str(path))
+    t = time.mktime((2026, 1, 2, 3, 4, 5, 0, 0, -1))
+    sink.emit(Message(PRIORITY_HIGH, "threat", "Caution: 2 threats nearby.", 2, ("T0", "T1"), t))
+    assert path.read_text() == "2026-01-02 03:04:05\tthreat\t2\tCaution: 2 threats nearby.\tT0,T1\n"
+
+def test_tts_children_are_reaped():
+    sink = TTSSink(timeout=5.0)
+    sink.cmd = "true" # stands in for termux-tts-speak
+    dispatcher = AlertDispatcher([sink], coalesce_delay=0.0)
+    dispatcher.start()
+    for i in range(20):
+        dispatcher.raise_alert("threat", f"R{i}", "x", PRIORITY_HIGH)
+        time.sleep(0.005)
+    deadline = time.time() + 5.0
+    while (dispatcher.pending or not dispatcher.sent) and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1) # let the last run finish
+    dispatcher.stop()
+    assert dispatcher.sent >= 1
+    try:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+    except ChildProcessError:
+        pid = 0
+    assert pid == 0, "unreaped TTS child"
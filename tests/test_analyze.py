@@ -0,0 +1,47 @@
+import sqlite3
+
+from src.analyze import FollowerAnalysis
+from src.db import init_db, to_fixed
+
+DAY = 86400
+START = 1700000000 - 1700000000 % DAY
+
+def build(path, tracks):
+    """tracks: {bssid: [(day, lat, lon), ...]}; a few sightings per entry."""
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    for i, (bssid, points) in enumerate(tracks.items(), 1):
+        conn.execute("INSERT INTO networks (id, bssid, ssid) VALUES (?, ?, ?)", (i, bssid, bssid[-2:]))
+        conn.executemany("INSERT INTO sightings (time, network_id, signal, lat, lon) VALUES (?, ?, 50, ?, ?)",
+                         [(START + day * DAY + 3600 + k * 60, i, to_fixed(lat), to_fixed(lon))
+                          for day, lat, lon in points for k in range(3)])
+    conn.commit()
+    conn.close()
+    return path
+
+HOME = [(day, 40.0012, -75.0012) for day in range(30)]               # every day, one cell
+FOLLOWER = [(day, 40.0 + 0.02 * (day + k), -75.0) for day in (2, 9, 16, 23) for k in range(3)]
+TOUR_BUS = [(5, 40.0 + 0.02 * k, -75.0) for k in range(8)]          # many cells, one day
+NEIGHBOUR = [(day, 40.0012 + 0.01 * (day % 2), -75.0012) for day in range(20)] # two cells
+
+def test_stationary_ap_is_not_ranked(tmp_path):
+    path = build(str(tmp_path / "log.db"), {"AA:00:00:00:00:01": HOME, "AA:00:00:00:00:02": NEIGHBOUR})
+    assert FollowerAnalysis(path).run().rank(min_cells=4, min_days=3) == []
+
+def test_following_ap_is_ranked_first(tmp_path):
+    path = build(str(tmp_path / "log.db"), {"AA:00:00:00:00:01": HOME, "AA:00:00:00:00:02": NEIGHBOUR,
+                                            "AA:00:00:00:00:03": FOLLOWER, "AA:00:00:00:00:04": TOUR_BUS})
+    analysis = FollowerAnalysis(path).run()
+    ranked = analysis.rank(min_cells=4, min_days=3)
+    assert [r["bssid"] for r in ranked] == ["AA:00:00:00:00:03"]
+    assert (ranked[0]["cells"], ranked[0]["days"], ranked[0]["sightings"]) == (12, 4, 36)
+    assert analysis.sightings == 3 * (len(HOME) + len(NEIGHBOUR) + len(FOLLOWER) + len(TOUR_BUS))
+
+def test_cells_outweigh_days(tmp_path):
+    wide = [(day, 40.0 + 0.02 * k, -75.0) for day in range(3) for k in range(8)]  # 8 cells, 3 days
+    daily = [(day, 40.0 + 0.02 * (day % 4), -75.0) for day in range(12)]         # 4 cells, 12 days
+    path = build(str(tmp_path / "log.db"), {"AA:00:00:00:00:01": daily, "AA:00:00:00:00:02": wide})
+    ranked = FollowerAnalysis(path).run().rank(min_cells=4, min_days=3)
+    assert [(r["bssid"], r["cells"], r["days"]) for r in ranked] == [
+        ("AA:00:00:00:00:02", 8, 3), ("AA:00:00:00:00:01", 4, 12)]
@@ -0,0 +1,39 @@
+import pytest
+
+from src import backends
+from src.backends import select_backend
+from src.config import CONFIG
+
+@pytest.fixture
+def tools(monkeypatch):
+    """Pretends only the given commands are installed."""
+    installed = set()
+    monkeypatch.setattr(backends.shutil, "which", lambda cmd: f"/usr/bin/{cmd}" if cmd in installed else None)
+    monkeypatch.setitem(CONFIG, "demo_mode", False)
+    monkeypatch.setitem(CONFIG, "scan_backend", "auto")
+    monkeypatch.setitem(CONFIG, "scan_interface", "")
+    return installed
+
+def test_auto_prefers_nmcli_without_interface(tools):
+    tools.update({"nmcli", "iw"})
+    assert select_backend().name == "nmcli"
+
+def test_auto_prefers_iw_with_interface(tools):
+    tools.update({"nmcli", "iw"})
+    CONFIG["scan_interface"] = "wlan1"
+    backend = select_backend()
+    assert (backend.name, backend.interface) == ("iw", "wlan1")
+
+def test_interface_without_iw_falls_back(tools):
+    tools.add("nmcli")
+    CONFIG["scan_interface"] = "wlan1"
+    assert select_backend().name == "nmcli"
+
+def test_named_backend_wins(tools):
+    tools.update({"nmcli", "iw"})
+    CONFIG["scan_interface"] = "wlan1"
+    CONFIG["scan_backend"] = "nmcli"
+    assert select_backend().name == "nmcli"
+
+def test_nothing_available_is_demo(tools):
+    assert select_backend().name == "demo"
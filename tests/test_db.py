@@ -0,0 +1,201 @@
+import random
+import sqlite3
+import threading
+import time
+
+from src import db
+from src.config import CONFIG
+from src.db import (init_db, compact_db, Retention, to_fixed, NO_CELL,
+                    FLAG_MOBILE, FLAG_THREAT, FLAG_PACING)
+
+def test_bssid_case_duplicates_are_merged(tmp_path):
+    path = str(tmp_path / "log.db")
+    init_db(path)
+    conn = sqlite3.connect(path)
+    with conn:
+        # The same AP as logged by termux (lower case) and by nmcli (upper case)
+        conn.execute("""INSERT INTO networks (id, bssid, ssid, first_seen, last_seen, est_samples, est_lat)
+                        VALUES (1, 'AA:BB:CC:DD:EE:FF', 'cam', 200, 300, 3, 10)""")
+        conn.execute("""INSERT INTO networks (id, bssid, ssid, first_seen, last_seen, est_samples, est_lat)
+                        VALUES (2, 'aa:bb:cc:dd:ee:ff', 'cam', 100, 250, 9, 20)""")
+        conn.execute("INSERT INTO networks (id, bssid, ssid) VALUES (3, '11:22:33:44:55:6a', 'solo')")
+        conn.executemany("INSERT INTO sightings (time, network_id, signal) VALUES (?, ?, ?)",
+                         [(100, 2, 40), (200, 1, 50), (300, 1, 60), (150, 3, 70)])
+        conn.executemany("""INSERT INTO sightings_hourly
+                            (network_id, hour, cell_lat, cell_lon, count, min_signal, max_signal, sum_signal)
+                            VALUES (?, 0, 0, 0, ?, ?, ?, ?)""",
+                         [(1, 2, 30, 50, 80), (2, 3, 20, 40, 90)])
+        conn.execute("PRAGMA user_version = 4")
+    conn.close()
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] >= 5
+        assert conn.execute("SELECT id, bssid FROM networks ORDER BY id").fetchall() == [
+            (1, "AA:BB:CC:DD:EE:FF"), (3, "11:22:33:44:55:6A")]
+        assert conn.execute("SELECT first_seen, last_seen, est_samples, est_lat FROM networks WHERE id = 1").fetchone() == (
+            100, 300, 9, 20)
+        assert conn.execute("SELECT network_id, COUNT(*) FROM sightings GROUP BY network_id").fetchall() == [
+            (1, 3), (3, 1)]
+        assert conn.execute("SELECT network_id, count, min_signal, max_signal, sum_signal FROM sightings_hourly").fetchall() == [
+            (1, 5, 20, 50, 170)]
+    finally:
+        conn.close()
+
+def build_log(path, rows, days, now, rng):
+    """`rows` sightings spread over `days` up to `now`, on 50 mostly-fixed networks."""
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF") # scratch file: no fsync per retention step
+    conn.executemany("INSERT INTO networks (bssid, ssid) VALUES (?, ?)",
+                     [("%012X" % i, f"net{i}") for i in range(50)])
+    start = now - days * 86400
+    conn.executemany("INSERT INTO sightings (time, network_id, signal, lat, lon, flags) VALUES (?, ?, ?, ?, ?, 0)",
+                     [(start + i * days * 86400 // rows, rng.randrange(50) + 1, rng.randint(0, 100),
+                       *((None, None) if rng.random() < 0.05 else
+                         (to_fixed(40.0 + rng.uniform(-0.05, 0.05)), to_fixed(-75.0 + rng.uniform(-0.05, 0.05)))))
+                      for i in range(rows)])
+    conn.commit()
+    return conn
+
+def totals(conn):
+    raw = conn.execute("SELECT COUNT(*), COALESCE(SUM(signal), 0), MIN(signal), MAX(signal) FROM sightings").fetchone()
+    hourly = conn.execute("""SELECT COALESCE(SUM(count), 0), COALESCE(SUM(sum_signal), 0),
+                                    MIN(min_signal), MAX(max_signal) FROM sightings_hourly""").fetchone()
+    lows = [v for v in (raw[2], hourly[2]) if v is not None]
+    highs = [v for v in (raw[3], hourly[3]) if v is not None]
+    return raw[0] + hourly[0], raw[1] + hourly[1], min(lows), max(highs)
+
+def drain(conn, retention, now):
+    for _ in range(10000):
+        if not retention.step(conn, now):
+            return
+    raise AssertionError("retention never finished")
+
+def test_retention_rollup_keeps_counts_and_sums(tmp_path):
+    now = 1700000000
+    conn = build_log(str(tmp_path / "log.db"), 20000, 6, now, random.Random(7))
+    try:
+        before = totals(conn)
+        retention = Retention(raw_hours=72, chunk=1000)
+        drain(conn, retention, now)
+        assert totals(conn) == before
+        assert conn.execute("SELECT COUNT(*) FROM sightings WHERE time < ?", (now - 72 * 3600,)).fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM sightings").fetchone()[0] > 0 # the raw window stays raw
+        assert retention.rows_rolled_up > 0
+        # Sightings without a fix are kept apart, in NO_CELL
+        assert conn.execute("SELECT COUNT(*) FROM sightings_hourly WHERE cell_lat = ?", (NO_CELL,)).fetchone()[0] > 0
+    finally:
+        conn.close()
+
+def test_retention_rollup_cells_floor_negative_coordinates(tmp_path):
+    now = 1700000000
+    path = str(tmp_path / "log.db")
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    try:
+        conn.execute("INSERT INTO networks (bssid) VALUES ('AA:BB:CC:DD:EE:FF')")
+        conn.execute("INSERT INTO sightings (time, network_id, signal, lat, lon) VALUES (?, 1, 50, ?, ?)",
+                     (now - 100 * 3600, to_fixed(40.0051), to_fixed(-75.0051)))
+        drain(conn, Retention(raw_hours=72, cell_deg=0.01), now)
+        assert conn.execute("SELECT cell_lat, cell_lon FROM sightings_hourly").fetchall() == [
+            (to_fixed(40.0), to_fixed(-75.01))]
+    finally:
+        conn.close()
+
+def test_retention_size_cap(tmp_path):
+    now = 1700000000
+    conn = build_log(str(tmp_path / "log.db"), 20000, 6, now, random.Random(7))
+    try:
+        retention = Retention(raw_hours=72, chunk=1000)
+        drain(conn, retention, now)
+        full = retention.used_bytes(conn)
+        capped = Retention(raw_hours=72, max_mb=full / 3 / 1048576, chunk=1000)
+        drain(conn, capped, now)
+        assert capped.rows_evicted > 0
+        assert capped.used_bytes(conn) <= capped.max_bytes
+        assert capped.pages_vacuumed > 0 # new files are auto_vacuum=INCREMENTAL
+        # The oldest history goes first
+        oldest = conn.execute("SELECT MIN(hour) FROM sightings_hourly").fetchone()[0]
+        assert oldest is None or oldest * 3600 > now - 6 * 86400
+    finally:
+        conn.close()
+
+V1_SCHEMA = """CREATE TABLE intercepts
+               (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, ssid TEXT, bssid TEXT, vendor TEXT,
+                signal INTEGER, freq TEXT, encryption TEXT, lat REAL, lon REAL,
+                threat_label TEXT, confidence TEXT, is_mobile TEXT)"""
+
+def test_v1_file_is_migrated(tmp_path):
+    path = str(tmp_path / "intercepts.db")
+    conn = sqlite3.connect(path)
+    conn.execute(V1_SCHEMA)
+    # termux logged lower-case BSSIDs, nmcli upper-case: the same AP twice
+    conn.executemany("""INSERT INTO intercepts (timestamp, ssid, bssid, vendor, signal, freq, encryption,
+                                                lat, lon, threat_label, confidence, is_mobile)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", [
+        ("2024-03-01T10:00:00.250000", "IBR900-1a2", "00:30:44:aa:bb:cc", "Cradlepoint", 60, "5G", "UNK",
+         40.1234567, -75.7654321, "[CRADLEPOINT]", "MED", "NO"),
+        ("2024-03-01T10:00:02", "IBR900-1a2", "00:30:44:AA:BB:CC", "Cradlepoint", 70, "5G", "WPA2",
+         40.1234568, -75.7654322, "[CRADLEPOINT]", "MED", "YES"),
+        ("2024-03-01T10:00:04", "home", "11:22:33:44:55:66", "UNKNOWN", 80, "2.4G", "WPA2",
+         None, None, "", "NONE", "NO"),
+        ("2024-03-02T09:00:00", "home", "11:22:33:44:55:66", "UNKNOWN", 75, "2.4G", "WPA2",
+         40.0, -75.0, "[PACING]", "HIGH", "YES"),
+    ])
+    conn.commit()
+    conn.close()
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] >= 5
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'intercepts'").fetchone() is None
+        epoch = lambda ts: int(time.mktime(time.strptime(ts, "%Y-%m-%dT%H:%M:%S")))
+        assert conn.execute("SELECT bssid, ssid, first_seen FROM networks ORDER BY bssid").fetchall() == [
+            ("00:30:44:AA:BB:CC", "IBR900-1a2", epoch("2024-03-01T10:00:00")),
+            ("11:22:33:44:55:66", "home", epoch("2024-03-01T10:00:04"))]
+        rows = conn.execute("""SELECT n.bssid, s.time, s.signal, s.lat, s.lon, s.flags
+                               FROM sightings s JOIN networks n ON n.id = s.network_id ORDER BY s.id""").fetchall()
+        assert rows == [
+            ("00:30:44:AA:BB:CC", epoch("2024-03-01T10:00:00"), 60, 401234567, -757654321, FLAG_THREAT),
+            ("00:30:44:AA:BB:CC", epoch("2024-03-01T10:00:02"), 70, 401234568, -757654322, FLAG_THREAT | FLAG_MOBILE),
+            ("11:22:33:44:55:66", epoch("2024-03-01T10:00:04"), 80, None, None, 0),
+            ("11:22:33:44:55:66", epoch("2024-03-02T09:00:00"), 75, 400000000, -750000000,
+             FLAG_THREAT | FLAG_MOBILE | FLAG_PACING)]
+        # No VACUUM at startup: the file keeps its mode until --vacuum
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert compact_db(path) == 0
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    finally:
+        conn.close()
+
+def test_rows_after_shutdown_are_written_without_a_thread(tmp_path, monkeypatch):
+    path = str(tmp_path / "log.db")
+    monkeypatch.setitem(CONFIG, "log_file", path)
+    monkeypatch.setattr(db, "WRITER", None)
+    monkeypatch.setattr(db, "CLOSED", False)
+    init_db(path)
+    row = (1700000000, "02:00:00:00:00:01", "Net", "", "2.4G", "WPA2", "", "", 60,
+           None, None, 0, None, None, None, None)
+    assert db.submit_rows([row])
+    db.shutdown_writer()
+
+    # A scan that finishes after shutdown: committed at once, no writer restarted
+    assert db.submit_rows([(1700000002,) + row[1:]])
+    assert db.get_writer() is None
+    assert not [t for t in threading.enumerate() if t.name == "civops-db-writer"]
+    conn = sqlite3.connect(path)
+    try:
+        assert [r[0] for r in conn.execute("SELECT time FROM sightings ORDER BY time")] == [1700000000, 1700000002]
+    finally:
+        conn.close()
+
+    db.shutdown_writer(final=False) # does not reopen a closed log
+    assert db.get_writer() is None
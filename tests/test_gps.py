@@ -0,0 +1,48 @@
+import json
+import time
+
+from src.gps import ReplayGPSProvider, TermuxGPSProvider, iter_json_objects
+
+class CountingReplay(ReplayGPSProvider):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.published = []
+
+    def publish(self, lat, lon, speed=0.0, ts=None):
+        self.published.append((time.monotonic(), lat, lon))
+
+def run_for(provider, seconds):
+    provider.start()
+    time.sleep(seconds)
+    provider.stop()
+    return provider.published
+
+def test_replay_without_timestamps_is_rate_limited(tmp_path):
+    # termux-location output: no "time" field
+    path = tmp_path / "gps.json"
+    path.write_text("".join(json.dumps({"latitude": 40.0 + i * 1e-4, "longitude": -75.0, "speed": 3.0}) + "\n"
+                            for i in range(3)))
+    published = run_for(CountingReplay(str(path), loop=True, interval=0.05), 0.5)
+    assert 5 <= len(published) <= 12
+    assert [p[1] for p in published[:4]] == [40.0, 40.0001, 40.0002, 40.0] # looped
+
+def test_replay_single_fix_loop_is_rate_limited(tmp_path):
+    path = tmp_path / "gps.json"
+    path.write_text(json.dumps({"latitude": 40.0, "longitude": -75.0, "time": 1}))
+    assert len(run_for(CountingReplay(str(path), loop=True, interval=0.05), 0.3)) <= 8
+
+def test_replay_paces_by_time_field(tmp_path):
+    path = tmp_path / "gps.json"
+    path.write_text("".join(json.dumps({"latitude": 40.0, "longitude": -75.0, "time": t}) + "\n"
+                            for t in (0, 10, 20)))
+    published = run_for(CountingReplay(str(path), speed=100.0, interval=5.0), 0.4)
+    assert len(published) == 3
+    gaps = [b[0] - a[0] for a, b in zip(published, published[1:])]
+    assert all(0.08 <= g < 0.3 for g in gaps)
+
+def test_iter_json_objects_mixed_layouts():
+    lines = ['{"a": 1}\n', '{\n', '  "b": 2\n', '}\n', '[1, 2]\n', '{"c": 3} {"d": 4}\n']
+    assert list(iter_json_objects(iter(lines))) == [{"a": 1}, {"b": 2}, {"c": 3}, {"d": 4}]
+
+def test_termux_provider_takes_no_interval_flag():
+    assert TermuxGPSProvider(interval_ms=2000).cmd == ["termux-location", "-p", "gps", "-r", "updates"]
@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from src import kml
+from src.config import CONFIG
+from src.db import init_db, Retention, to_fixed
+from src.kml import export_kml
+
+NOW = 1700000000
+
+@pytest.fixture
+def log_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "log.db")
+    monkeypatch.setitem(CONFIG, "log_file", path)
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("INSERT INTO networks (id, bssid, ssid, threat_label) VALUES (1, 'AA:BB:CC:DD:EE:01', 'old', 'IBR900')")
+    conn.execute("INSERT INTO networks (id, bssid, ssid, threat_label) VALUES (2, 'AA:BB:CC:DD:EE:02', 'new', '')")
+    # A week-old network, rolled up by retention, and one seen in the raw window
+    conn.executemany("INSERT INTO sightings (time, network_id, signal, lat, lon, flags) VALUES (?, ?, ?, ?, ?, 0)",
+                     [(NOW - 7 * 86400 + i, 1, 40 + i, to_fixed(40.001), to_fixed(-75.001)) for i in range(5)] +
+                     [(NOW - 60, 2, 80, to_fixed(40.2), to_fixed(-75.2))])
+    conn.commit()
+    while Retention(raw_hours=72).step(conn, NOW):
+        pass
+    assert conn.execute("SELECT COUNT(*) FROM sightings WHERE network_id = 1").fetchone()[0] == 0
+    conn.close()
+    return path
+
+def export(tmp_path, **kwargs):
+    out = str(tmp_path / "map.kml")
+    ok, msg = export_kml(out, **kwargs)
+    assert ok, msg
+    with open(out, encoding="utf-8") as f:
+        return msg, f.read()
+
+def test_aggregate_includes_rolled_up_history(log_db, tmp_path):
+    msg, kml = export(tmp_path, aggregate=True)
+    assert msg.startswith("Exported 2 networks")
+    assert "<name>old</name>" in kml and "Sightings: 5" in kml
+    assert "THREAT: IBR900" in kml
+    # Centre of the 0.01 degree cell the roll-up landed in
+    assert "-75.005,40.005,0" in kml
+
+def test_heat_includes_rolled_up_history(log_db, tmp_path):
+    _, kml = export(tmp_path, aggregate=True, heat_cell=0.01)
+    assert "Sightings: 5\nAvg Signal: 42%" in kml
+    assert "Sightings: 1\nAvg Signal: 80%" in kml
+
+def test_sightings_export_is_raw_only(log_db, tmp_path):
+    msg, kml = export(tmp_path)
+    assert msg.startswith("Exported 1 points")
+    assert "<name>new</name>" in kml and "<name>old</name>" not in kml
+
+def add_sighting(path, network_id, t):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO sightings (time, network_id, signal, lat, lon, flags) VALUES (?, ?, 60, ?, ?, 0)",
+                 (t, network_id, to_fixed(40.3), to_fixed(-75.3)))
+    conn.commit()
+    conn.close()
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    path = str(tmp_path / "export_state.json")
+    monkeypatch.setattr(kml, "STATE_PATH", path)
+    return path
+
+def outputs(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("map"))
+
+def test_incremental_exports_only_new_rows(log_db, tmp_path, state, monkeypatch):
+    stamps = iter(["20260101-000001", "20260101-000002", "20260101-000003"])
+    monkeypatch.setattr(kml, "_increment_path", lambda p: p.replace(".kml", f"-{next(stamps)}.kml"))
+    out = str(tmp_path / "map.kml")
+    assert export_kml(out, incremental=True) == (True, f"Exported 1 points to {tmp_path}/map-20260101-000001.kml")
+    assert export_kml(out, incremental=True) == (True, "No new points since last export")
+    add_sighting(log_db, 1, NOW)
+    ok, msg = export_kml(out, incremental=True)
+    assert msg == f"Exported 1 points to {tmp_path}/map-20260101-000003.kml"
+    with open(tmp_path / "map-20260101-000003.kml", encoding="utf-8") as f:
+        assert "<name>old</name>" in f.read()
+    # The full map is never overwritten by a delta
+    assert outputs(tmp_path) == ["map-20260101-000001.kml", "map-20260101-000003.kml"]
+
+def test_full_export_by_default(log_db, tmp_path, state):
+    assert not CONFIG["kml_incremental"]
+    out = str(tmp_path / "map.kml")
+    assert export_kml(out, incremental=True)[0]
+    add_sighting(log_db, 1, NOW)
+    assert export_kml(out) == (True, f"Exported 2 points to {out}")
+
+def test_watermarks_are_per_database(log_db, tmp_path, state, monkeypatch):
+    out = str(tmp_path / "map.kml")
+    assert export_kml(out, incremental=True)[1].startswith("Exported 1 points")
+    # A replay DB has its own (overlapping) sighting ids
+    replay = str(tmp_path / "replay.db")
+    init_db(replay)
+    conn = sqlite3.connect(replay)
+    conn.execute("INSERT INTO networks (id, bssid, ssid) VALUES (1, 'AA:BB:CC:DD:EE:09', 'replayed')")
+    conn.commit()
+    conn.close()
+    for t in (NOW - 30, NOW - 20):
+        add_sighting(replay, 1, t)
+    monkeypatch.setitem(CONFIG, "log_file", replay)
+    assert export_kml(out, incremental=True)[1].startswith("Exported 2 points")
+    monkeypatch.setitem(CONFIG, "log_file", log_db)
+    assert export_kml(out, incremental=True) == (True, "No new points since last export")
+    with open(state) as f:
+        assert json.load(f) == {os.path.abspath(log_db): {out: 6}, os.path.abspath(replay): {out: 2}}
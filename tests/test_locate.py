@@ -0,0 +1,145 @@
+import math
+import random
+import sqlite3
+import statistics
+
+import pytest
+
+from src import scanner
+from src.db import init_db, UPSERT_NETWORK
+from src.locate import APEstimator, offset_m, _solve3, M_PER_DEG_LAT, M_PER_DEG_LON, MIN_SAMPLES
+
+LAT0, LON0 = 40.0, -75.0
+PATH_LOSS_N = 2.5 # calculate_distance's 2.4 GHz exponent
+MAX_RANGE = 300.0
+
+def to_latlon(x, y):
+    return LAT0 + y / M_PER_DEG_LAT, LON0 + x / (M_PER_DEG_LON * math.cos(math.radians(LAT0)))
+
+def corner(step=15):
+    return [(x, 0) for x in range(-400, 1, step)] + [(0, y) for y in range(step, 401, step)]
+
+def loop(step=15):
+    # Out along y=0, back along y=200
+    return ([(x, 0) for x in range(-400, 401, step)] + [(400, y) for y in range(step, 200, step)] +
+            [(x, 200) for x in range(400, -401, -step)])
+
+def sightings(ap, points, sigma, rng):
+    for x, y in points:
+        d = math.hypot(ap[0] - x, ap[1] - y)
+        if d <= MAX_RANGE:
+            yield x, y, d * 10 ** (rng.gauss(0, sigma) / (10 * PATH_LOSS_N))
+
+def batch_least_squares(history):
+    """Normal equations rebuilt from every sighting."""
+    m = [[0.0] * 3 for _ in range(3)]
+    v = [0.0] * 3
+    for x, y, r in history:
+        r = max(1.0, r)
+        w = 1.0 / r ** 2
+        a = (-2 * x, -2 * y, 1.0)
+        b = r ** 2 - x * x - y * y
+        for i in range(3):
+            v[i] += w * a[i] * b
+            for j in range(3):
+                m[i][j] += w * a[i] * a[j]
+    return _solve3(m, v)[0]
+
+def test_running_sums_match_batch_solve():
+    est, history = None, []
+    for x, y, r in sightings((80, 60), corner(), 4, random.Random(1)):
+        lat, lon = to_latlon(x, y)
+        if est is None:
+            est = APEstimator(lat, lon)
+        est.update(lat, lon, r)
+        # Same local frame the estimator uses (origin at its first sighting)
+        history.append(offset_m(est.lat0, est.lon0, lat, lon) + (r,))
+    fit = est._least_squares()
+    ref = batch_least_squares(history)
+    assert len(history) > 20
+    assert math.hypot(fit[0] - ref[0], fit[1] - ref[1]) < 1e-6
+
+def test_no_position_before_min_samples():
+    est = APEstimator(LAT0, LON0)
+    for i in range(MIN_SAMPLES - 1):
+        est.update(*to_latlon(i * 20, 0), 50)
+        assert est.position() is None
+    est.update(*to_latlon(100, 0), 50)
+    assert est.position().samples == MIN_SAMPLES
+
+def test_loop_accuracy():
+    rng = random.Random(7)
+    errors, inside = [], 0
+    for _ in range(50):
+        ap = (rng.uniform(-200, 200), rng.uniform(20, 150))
+        est = None
+        for x, y, r in sightings(ap, loop(), 2, rng):
+            lat, lon = to_latlon(x, y)
+            if est is None:
+                est = APEstimator(lat, lon)
+            est.update(lat, lon, r)
+        pos = est.position()
+        err = math.hypot(*(a - b for a, b in zip(offset_m(LAT0, LON0, pos.lat, pos.lon), ap)))
+        errors.append(err)
+        inside += err <= pos.radius
+    assert statistics.median(errors) < 20
+    assert inside >= 40
+
+@pytest.fixture
+def registry():
+    scanner.REGISTRY.targets.clear()
+    scanner.ESTIMATORS.clear()
+    yield scanner.REGISTRY
+    scanner.REGISTRY.targets.clear()
+    scanner.ESTIMATORS.clear()
+
+def drive_past(registry, bssid, start, count):
+    for i in range(start, start + count):
+        lat, lon = to_latlon(i * 15 - 200, 0)
+        t = registry.observe("cam", bssid, 60, "2.4G", "WPA2", lat, lon, 1000.0 + i * 2)
+        scanner.locate_targets([t])
+    return t
+
+def test_estimate_survives_target_expiry(registry):
+    t = drive_past(registry, "02:00:00:00:00:01", 0, 20)
+    estimator = t.position
+    assert estimator.n == 20
+    registry.expire(300, now=1000.0 + 20 * 2 + 301)
+    assert "02:00:00:00:00:01" not in registry.targets
+    t = drive_past(registry, "02:00:00:00:00:01", 20, 3)
+    assert t.position is estimator
+    assert estimator.n == 23
+
+def test_estimates_evicted_beyond_locate_max(registry, monkeypatch):
+    monkeypatch.setitem(scanner.CONFIG, "locate_max", 2)
+    for i in range(3):
+        drive_past(registry, f"02:00:00:00:00:0{i}", 0, 1)
+    drive_past(registry, "02:00:00:00:00:00", 1, 1) # most recently updated again
+    assert list(scanner.ESTIMATORS) == ["02:00:00:00:00:02", "02:00:00:00:00:00"]
+
+def test_skips_pacing_and_unfixed(registry):
+    t = registry.observe("cam", "02:00:00:00:00:01", 60, "2.4G", "WPA2", None, None, 1000.0)
+    scanner.locate_targets([t])
+    t = registry.observe("cam", "02:00:00:00:00:01", 60, "2.4G", "WPA2", LAT0, LON0, 1002.0)
+    t.is_pacing = True
+    scanner.locate_targets([t])
+    assert t.position is None and not scanner.ESTIMATORS
+
+def test_upsert_keeps_better_estimate(tmp_path):
+    path = init_db(str(tmp_path / "log.db"))
+    conn = sqlite3.connect(path)
+
+    def upsert(samples, lat):
+        estimate = (None, None, None, None) if samples is None else (lat, 0, 10, samples)
+        with conn:
+            conn.execute(UPSERT_NETWORK, ("AA:BB:CC:DD:EE:FF", "cam", "?", "2.4G", "WPA2", "UNK", "LOW", 1, 1) + estimate)
+        return conn.execute("SELECT est_samples, est_lat FROM networks").fetchone()
+
+    try:
+        assert upsert(None, 0) == (None, None)
+        assert upsert(23, 1) == (23, 1)
+        assert upsert(4, 2) == (23, 1)   # fresh estimator after a restart
+        assert upsert(None, 0) == (23, 1)
+        assert upsert(30, 3) == (30, 3)
+    finally:
+        conn.close()
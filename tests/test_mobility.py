@@ -0,0 +1,135 @@
+import random
+import statistics
+
+import pytest
+
+from src.mobility import MobilityWindow, WindowHistory, ArrayHistory, mobility_rules, MIN_SAMPLES, np
+
+SIZE = 20
+
+def reference(history):
+    """What analyze_mobility() computed from its plain list history."""
+    signals = [s for _, s, _ in history]
+    lats = [lat for _, _, lat in history if lat is not None]
+    sig_variance = statistics.variance(signals) if len(signals) > 1 else 0
+    lat_variance = statistics.variance(lats) if len(lats) > 1 else 0
+    return sum(signals) / len(signals), sig_variance, len(lats), lat_variance, history[0][0]
+
+def drive(rng, samples):
+    t, lat = 1700000000.0, 40.0
+    for i in range(samples):
+        t += rng.uniform(1.8, 2.6)
+        if rng.random() < 0.7:
+            lat += rng.uniform(0, 4e-4)
+        yield t, rng.randint(0, 100), None if rng.random() < 0.15 else lat
+
+@pytest.mark.parametrize("seed", range(5))
+def test_window_matches_list_history(seed):
+    rng = random.Random(seed)
+    window, history = MobilityWindow(SIZE), []
+    for t, signal, lat in drive(rng, 300):
+        window.push(t, signal, lat)
+        history.append((t, signal, lat))
+        del history[:-SIZE]
+        mean, sig_variance, lat_count, lat_variance, oldest = reference(history)
+        assert len(window) == len(history)
+        assert window.signal_mean() == mean
+        assert window.signal_variance() == sig_variance # integer sums: exact
+        assert window.lat_count() == lat_count
+        assert window.lat_variance() == pytest.approx(lat_variance, rel=1e-9, abs=1e-18)
+        assert window.oldest_time() == oldest
+
+def test_window_without_fixes():
+    window = MobilityWindow(4)
+    for i in range(10):
+        window.push(float(i), 50 + i, None)
+    assert window.lat_count() == 0
+    assert window.lat_variance() == 0
+    assert window.oldest_time() == 6.0
+    assert window.signal_variance() == statistics.variance([56, 57, 58, 59])
+
+def test_window_single_sample():
+    window = MobilityWindow(SIZE)
+    window.push(1.0, 70, 40.0)
+    assert window.signal_variance() == 0
+    assert window.lat_variance() == 0
+    assert window.signal_mean() == 70
+
+class FakeTarget:
+    def __init__(self, bssid, signal, lat):
+        self.bssid, self.signal, self.lat = bssid, signal, lat
+
+def expected_verdict(history, now, my_speed):
+    mean, sig_variance, lat_count, lat_variance, oldest = reference(history)
+    gps_variance = lat_variance * 100000 if lat_count > 1 else 0
+    return mobility_rules(len(history), sig_variance, gps_variance, mean, now - oldest, my_speed)
+
+HISTORIES = [WindowHistory,
+             pytest.param(ArrayHistory, marks=pytest.mark.skipif(np is None, reason="NumPy not installed"))]
+
+@pytest.mark.parametrize("make", HISTORIES)
+@pytest.mark.parametrize("seed", range(3))
+def test_history_matches_per_target_lists(make, seed):
+    rng = random.Random(seed)
+    # Small initial capacity so ArrayHistory has to grow and reuse rows
+    history = make(SIZE) if make is WindowHistory else make(SIZE, capacity=4)
+    bssids = [f"02:00:00:00:00:{i:02X}" for i in range(12)]
+    lists = {}
+    t, lat, speed = 1700000000.0, 40.0, 0.0
+    for scan in range(200):
+        t += rng.uniform(1.8, 2.6)
+        speed = max(0.0, speed + rng.uniform(-3, 3))
+        if speed > 1:
+            lat += rng.uniform(0, 4e-4)
+        fix = None if rng.random() < 0.1 else lat
+        targets = [FakeTarget(b, rng.randint(0, 100), fix) for b in bssids if rng.random() < 0.8]
+        if not targets:
+            continue
+        enough, moving, pacing = history.analyze(targets, t, speed)
+        for i, target in enumerate(targets):
+            samples = lists.setdefault(target.bssid, [])
+            samples.append((t, target.signal, target.lat))
+            del samples[:-SIZE]
+            e, m, p = expected_verdict(samples, t, speed)
+            assert bool(enough[i]) == e
+            if e:
+                assert (bool(moving[i]), bool(pacing[i])) == (bool(m), bool(p))
+        if scan % 25 == 24:
+            gone = rng.sample(bssids, 3)
+            history.forget(gone)
+            for b in gone:
+                lists.pop(b, None)
+        assert len(history) == len(lists)
+
+@pytest.mark.parametrize("make", HISTORIES)
+def test_history_forget_starts_over(make):
+    history = make(SIZE)
+    target = FakeTarget("02:00:00:00:00:01", 80, 40.0)
+    for i in range(MIN_SAMPLES):
+        enough, _, _ = history.analyze([target], float(i), 0.0)
+    assert bool(enough[0])
+    history.forget([target.bssid, "02:00:00:00:00:99"])
+    assert len(history) == 0
+    enough, _, _ = history.analyze([target], 100.0, 0.0)
+    assert not bool(enough[0])
+    history.clear()
+    assert len(history) == 0
+
+@pytest.mark.parametrize("make", HISTORIES)
+def test_ingest_records_duplicate_bssid_once(make, monkeypatch):
+    from src import scanner
+    history = make(SIZE)
+    monkeypatch.setattr(scanner, "MOBILITY", history)
+    monkeypatch.setattr(scanner, "REGISTRY", scanner.TargetRegistry())
+    bssid = "02:00:00:00:01:01"
+    for i in range(MIN_SAMPLES - 2):
+        # Same BSSID twice in one scan (e.g. listed per band), plus a malformed entry
+        targets, _ = scanner.ingest([("Dup", bssid, 30, "2.4G", "WPA2"),
+                                     ("Dup", bssid, 80, "5G", "WPA2"),
+                                     ("Bad", "02:00:00:00:01:02", None, "2.4G", "WPA2"),
+                                     ("Short", "02:00:00:00:01:03")], 1000.0 + 2 * i)
+        assert [(t.bssid, t.signal) for t in targets] == [(bssid, 80)]
+    # One sample per scan: the next one is still short of MIN_SAMPLES
+    enough, _, _ = history.analyze([FakeTarget(bssid, 80, None)], 1100.0, 0.0)
+    assert not bool(enough[0])
+    assert len(history) == 1
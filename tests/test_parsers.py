@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from src.parsers import parse_nmcli, parse_termux, parse_iw, split_terse, normalize_rssi, freq_to_band
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def test_nmcli_fixture():
+    assert list(parse_nmcli(fixture("nmcli.txt"))) == [
+        ("Home Net", "AA:BB:CC:DD:EE:01", 72, "2.4G", "WPA2"),
+        ("Cafe: Free", "AA:BB:CC:DD:EE:02", 40, "5G", "OPEN"),
+        ("back\\slash", "AA:BB:CC:DD:EE:03", 100, "6G", "WPA2 WPA3"),
+        ("", "AA:BB:CC:DD:EE:04", 15, "2.4G", "WPA1"),
+        ("ends\\", "AA:BB:CC:DD:EE:05", 50, "2.4G", "WPA2"),
+        ("tail\\:", "AA:BB:CC:DD:EE:06", 50, "2.4G", "WPA2"),
+    ]
+
+def test_termux_fixture():
+    assert list(parse_termux(fixture("termux.json"))) == [
+        ("IBR900-123", "00:30:44:AA:BB:CC", 100, "5G", "UNK"),
+        ("", "11:22:33:44:55:66", 20, "2.4G", "UNK"),
+    ]
+
+def test_iw_fixture():
+    assert list(parse_iw(fixture("iw.txt"))) == [
+        ("IBR900-1a2", "00:30:44:AA:BB:CC", 100, "5G", "WPA2"),
+        ("Home Net", "11:22:33:44:55:66", 58, "2.4G", "OPEN"),
+        ("oldcam", "22:33:44:55:66:77", 80, "2.4G", "WEP"),
+    ]
+
+@pytest.mark.parametrize("line, fields", [
+    ("a:b:c", ["a", "b", "c"]),
+    ("a\\:b:c", ["a:b", "c"]),
+    ("a\\\\:b", ["a\\", "b"]),
+    ("a\\\\\\:b:c", ["a\\:b", "c"]),
+    ("a\\\\\\\\:b", ["a\\\\", "b"]),
+    ("::", ["", "", ""]),
+    ("end\\\\", ["end\\"]),
+    # SSIDs are arbitrary bytes: control characters must come through untouched
+    ("x\x00\x01y\\:z:q", ["x\x00\x01y:z", "q"]),
+    ("\x01\\\\\x00:b", ["\x01\\\x00", "b"]),
+])
+def test_split_terse(line, fields):
+    assert split_terse(line) == fields
+
+def test_nmcli_skips_short_and_blank_lines():
+    assert list(parse_nmcli("\nonly:two\nNet:AA\\:BB\\:CC\\:DD\\:EE\\:FF:x:? MHz: \n")) == [
+        ("Net", "AA:BB:CC:DD:EE:FF", 0, "2.4G", "OPEN"),
+    ]
+
+def test_termux_non_list():
+    assert list(parse_termux('{"error": "location disabled"}')) == []
+
+@pytest.mark.parametrize("dbm, percent", [(-100, 0), (-75, 50), (-50, 100), (-20, 100), ("junk", 0)])
+def test_normalize_rssi(dbm, percent):
+    assert normalize_rssi(dbm) == percent
+
+@pytest.mark.parametrize("mhz, band", [(2412, "2.4G"), (5180, "5G"), (5925, "5G"), (5955, "6G")])
+def test_freq_to_band(mhz, band):
+    assert freq_to_band(mhz) == band
@@ -0,0 +1,71 @@
+import json
+import time
+
+import pytest
+
+from src import alerts, db, gps
+from src.config import CONFIG
+from src.replay import ReplaySession, use_replay_alerts
+
+def nmcli_line(ssid, bssid, signal):
+    return f"{ssid}:{bssid.replace(':', chr(92) + ':')}:{signal}:2437 MHz:WPA2"
+
+def write_session(path, scans):
+    t0 = 1700000000.0
+    with open(path, "w") as f:
+        for i in range(scans):
+            out = "\n".join([nmcli_line("Axon Body 3", "0C:00:13:00:00:01", 60 + i),
+                             nmcli_line("Home Net", "0C:00:13:00:00:02", 70)]) + "\n"
+            f.write(json.dumps({"t": t0 + i * 2, "k": "scan", "b": "nmcli", "a": False, "o": out}) + "\n")
+
+@pytest.fixture
+def isolated(tmp_path, monkeypatch):
+    live_alerts = tmp_path / "alerts.log"
+    monkeypatch.setitem(CONFIG, "alert_sinks", ["log"])
+    monkeypatch.setitem(CONFIG, "alert_log", str(live_alerts))
+    monkeypatch.setitem(CONFIG, "log_file", CONFIG["log_file"])
+    monkeypatch.setitem(CONFIG, "gps_enabled", False)
+    alerts.stop_alerts()
+    yield live_alerts
+    alerts.stop_alerts()
+    gps.stop_gps()
+    db.shutdown_writer(final=False)
+    db.init_db(CONFIG["log_file"])
+
+def wait_sent(n, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        dispatcher = alerts.DISPATCHER
+        if dispatcher is not None and dispatcher.sent >= n:
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_replay_alerts_go_to_replay_log(tmp_path, isolated):
+    session = tmp_path / "drive.jsonl"
+    write_session(str(session), 8)
+    replay_alerts = tmp_path / "replay_alerts.log"
+    replay_alerts.write_text("stale\n")
+    live_db = CONFIG["log_file"]
+
+    replay = ReplaySession(str(session), speed=0, log_file=str(tmp_path / "replay.db"),
+                           alert_log=str(replay_alerts))
+    replay.run()
+    assert replay.scans == 8
+    assert wait_sent(1)
+
+    assert [s.name for s in alerts.DISPATCHER.sinks] == ["log"]
+    lines = replay_alerts.read_text().splitlines()
+    assert lines and "AXON" in lines[0] and "stale" not in lines[0]
+    assert not isolated.exists()
+    assert CONFIG["log_file"] != live_db
+
+def test_replay_without_alert_log_has_no_sinks(isolated):
+    use_replay_alerts("")
+    assert CONFIG["alert_sinks"] == []
+    assert alerts.get_dispatcher().sinks == []
+
+def test_replay_alert_log_must_not_be_live(isolated):
+    with pytest.raises(ValueError):
+        use_replay_alerts(str(isolated))
+    assert CONFIG["alert_sinks"] == ["log"]
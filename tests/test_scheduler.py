@@ -0,0 +1,103 @@
+import time
+from collections import namedtuple
+
+import pytest
+
+from src.scheduler import ScanScheduler, churn
+
+Net = namedtuple("Net", ["bssid", "is_threat", "is_pacing", "confidence", "is_mobile"])
+
+def nets(n, start=0):
+    return [Net("%012X" % i, False, False, "NONE", False) for i in range(start, start + n)]
+
+def threat(confidence, mobile=False, pacing=False):
+    return Net("003044010203", True, pacing, confidence, mobile)
+
+class FakeBattery:
+    def __init__(self, percent=80, plugged=False):
+        self.percent = percent
+        self.plugged = plugged
+
+    def low(self, threshold):
+        return not self.plugged and self.percent <= threshold
+
+def test_churn():
+    assert churn(set(), set()) == 0.0
+    assert churn({"a", "b"}, {"a", "b"}) == 0.0
+    assert churn({"a", "b"}, {"c"}) == 1.0
+    assert churn({"a", "b", "c"}, {"a", "b", "d"}) == 0.5
+
+def test_pacing_uses_minimum():
+    s = ScanScheduler(base=2.0, min_interval=1.0, battery=FakeBattery(10))
+    s.update(nets(20))
+    assert s.update(nets(20) + [threat("HIGH", pacing=True)], 20.0)[:2] == (1.0, "PACING")
+
+@pytest.mark.parametrize("confidence, mobile, reason", [
+    ("LOW", False, "PARKED"), # keyword hits are everywhere in a city
+    ("LOW", True, "THREAT"),
+    ("MED", False, "THREAT"),
+    ("HIGH", False, "THREAT"),
+])
+def test_threat_gate(confidence, mobile, reason):
+    s = ScanScheduler(base=2.0)
+    s.update(nets(20) + [threat(confidence, mobile)])
+    schedule = s.update(nets(20) + [threat(confidence, mobile)])
+    assert schedule.reason == reason
+    if reason == "THREAT":
+        assert schedule.interval == 1.0
+
+def test_churn_halves_interval():
+    s = ScanScheduler(base=2.0, churn_high=0.3)
+    s.update(nets(20))
+    schedule = s.update(nets(20, start=10))
+    assert schedule.reason == "CHURN" and schedule.interval == 1.0
+
+def test_empty_scan_is_no_data_not_churn():
+    s = ScanScheduler(base=2.0)
+    s.update(nets(20))
+    schedule = s.update([])
+    assert schedule[1:] == ("NO DATA", None, 0.0) and schedule.interval == 2.0
+    # The next real scan is compared with the last one that saw something
+    assert s.update(nets(20)).churn == 0.0
+
+def test_parked_grows_to_max_and_moving_shrinks():
+    s = ScanScheduler(base=2.0, max_interval=15.0, fast_speed=13.4)
+    intervals = [s.update(nets(20)).interval for _ in range(8)]
+    assert intervals[:3] == [3.0, 4.5, 6.75] # the first scan is not churn either
+    assert intervals[-1] == 15.0
+    assert s.update(nets(20), 7.2)[:2] == (pytest.approx(1.5), "MOVING")
+    assert s.update(nets(20), 30.0).interval == 1.0
+
+def test_low_battery_doubles_except_pacing():
+    battery = FakeBattery(15)
+    s = ScanScheduler(base=2.0, battery_low=20, battery=battery)
+    s.update(nets(20))
+    assert s.update(nets(20), 30.0)[:3] == (2.0, "LOW BATT", 15)
+    battery.plugged = True
+    assert s.update(nets(20), 30.0).reason == "MOVING"
+
+def test_fixed_when_not_adaptive():
+    s = ScanScheduler(base=2.0, adaptive=False)
+    assert s.update(nets(5) + [threat("HIGH", pacing=True)])[:2] == (2.0, "FIXED")
+
+def test_deadlines_do_not_drift():
+    interval = 0.05
+    s = ScanScheduler(base=interval, adaptive=False)
+    s.update([])
+    starts = []
+    started = time.time()
+    for i in range(20):
+        starts.append(started)
+        time.sleep(interval * 0.6 * (i % 3) / 2) # the scan itself
+        assert s.wait(started)
+        started = time.time()
+    periods = [b - a for a, b in zip(starts, starts[1:])]
+    assert sum(periods) / len(periods) == pytest.approx(interval, rel=0.1)
+
+def test_wake_cuts_wait_short():
+    s = ScanScheduler(base=10.0, adaptive=False)
+    s.update([])
+    s.wake()
+    start = time.time()
+    assert not s.wait(start)
+    assert time.time() - start < 1.0
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from src.whitelist import Whitelist
+
+RULES = {
+    "ignore_ssids": ["HomeNet", "Office-*", "FLEET-??", "cam[0-9]", ""],
+    "ignore_macs": ["AA:BB:CC:DD:EE:FF", "00:11:22:*", "00-11-23", "001124A*", "12:34:56:78:9a:bc", "not-a-mac"],
+}
+
+@pytest.fixture
+def whitelist():
+    w = Whitelist("/nonexistent")
+    w.compile(RULES)
+    return w
+
+@pytest.mark.parametrize("ssid, bssid, expected", [
+    ("HomeNet", "02:00:00:00:00:01", True),
+    ("homenet", "02:00:00:00:00:01", False), # SSIDs are case-sensitive
+    ("Office-3F", "02:00:00:00:00:01", True),
+    ("Office", "02:00:00:00:00:01", False),
+    ("FLEET-07", "02:00:00:00:00:01", True),
+    ("FLEET-007", "02:00:00:00:00:01", False),
+    ("cam4", "02:00:00:00:00:01", True),
+    ("camX", "02:00:00:00:00:01", False),
+    ("", "02:00:00:00:00:01", True),
+    ("x", "AA:BB:CC:DD:EE:FF", True),
+    ("x", "AA:BB:CC:DD:EE:FE", False),
+    ("x", "12:34:56:78:9A:BC", True), # full MACs are upper-cased like scanned BSSIDs
+    ("x", "00:11:22:33:44:55", True), # trailing *
+    ("x", "00:11:23:00:00:00", True), # short entry with - separators
+    ("x", "00:11:24:A0:00:00", True), # MA-M style nibble prefix
+    ("x", "00:11:24:B0:00:00", False),
+    ("x", "00:11:25:00:00:00", False),
+])
+def test_match(whitelist, ssid, bssid, expected):
+    assert whitelist.match(ssid, bssid) is expected
+
+def test_rule_count_skips_junk(whitelist):
+    assert whitelist.rules == 10
+
+def test_empty_whitelist_matches_nothing():
+    w = Whitelist("/nonexistent")
+    assert not w.refresh() # no file and nothing loaded yet: nothing to do
+    assert not w.match("HomeNet", "AA:BB:CC:DD:EE:FF")
+
+def test_refresh_only_rereads_changed_file(tmp_path):
+    path = tmp_path / "whitelist.json"
+    path.write_text(json.dumps({"ignore_ssids": ["HomeNet"]}))
+    w = Whitelist(str(path))
+    assert w.refresh()
+    assert not w.refresh()
+    assert w.match("HomeNet", "02:00:00:00:00:01")
+
+    path.write_text(json.dumps({"ignore_ssids": ["Cafe"]}))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000)) # coarse mtime filesystems
+    assert w.refresh()
+    assert w.match("Cafe", "02:00:00:00:00:01")
+    assert not w.match("HomeNet", "02:00:00:00:00:01")
+
+def test_broken_file_keeps_previous_rules(tmp_path):
+    path = tmp_path / "whitelist.json"
+    path.write_text(json.dumps({"ignore_macs": ["00:11:22"]}))
+    w = Whitelist(str(path))
+    w.refresh()
+    path.write_text('{"ignore_macs": [')
+    assert not w.refresh()
+    assert w.match("x", "00:11:22:33:44:55")
@@ -0,0 +1,70 @@
+"""
+Builds data/oui.idx, the compact vendor index used by resolve_vendor().
+
+    python tools/build_oui_index.py [oui.csv mam.csv oui36.csv ...] [-o data/oui.idx]
+
+Inputs are the IEEE registry CSV exports (MA-L, MA-M, MA-S; columns
+Registry,Assignment,Organization Name,...), downloadable from
+https://standards-oui.ieee.org/. The curated short names in
+data/vendors.json.gz are always merged in and win over the IEEE names,
+so the HUD keeps "Axon" rather than "Axon Enterprise, Inc.".
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.oui import mac_to_int, write_index
+
+def read_ieee_csv(path, entries):
+    """Adds every assignment in an IEEE registry CSV; block size comes from the hex length."""
+    added = 0
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            assignment = (row.get("Assignment") or "").strip()
+            vendor = (row.get("Organization Name") or "").strip()
+            if not assignment or not vendor:
+                continue
+            bits = len(assignment) * 4
+            if bits not in (24, 28, 36):
+                continue
+            prefix, _ = mac_to_int(assignment)
+            if prefix is None:
+                continue
+            entries[(prefix, bits)] = vendor
+            added += 1
+    return added
+
+def read_vendors_json(path, entries):
+    """Adds the curated {"XX:XX:XX": "Vendor"} map shipped with the app."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    for oui, vendor in data.items():
+        prefix, digits = mac_to_int(oui)
+        if prefix is not None and digits == 6:
+            entries[(prefix, 24)] = vendor
+    return len(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the CivOps OUI index")
+    parser.add_argument("csv", nargs="*", help="IEEE MA-L / MA-M / MA-S CSV files")
+    parser.add_argument("-o", "--output", default=os.path.join(ROOT, "data", "oui.idx"))
+    parser.add_argument("--vendors", default=os.path.join(ROOT, "data", "vendors.json.gz"))
+    args = parser.parse_args()
+
+    entries = {}
+    for path in args.csv:
+        print(f"{path}: {read_ieee_csv(path, entries)} assignments")
+    if os.path.exists(args.vendors):
+        print(f"{args.vendors}: {read_vendors_json(args.vendors, entries)} curated names")
+
+    count = write_index(entries, args.output)
+    print(f"Wrote {count} records to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+if __name__ == "__main__":
+    main()